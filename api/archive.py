@@ -0,0 +1,123 @@
+import datetime
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api.models import ArchivedItem, Item, ShoppingList
+
+# archived shopping lists, the items of a list that is archived are
+# moved to the archived item table so that the item table only holds
+# the items of the active lists, which every item query scans
+
+
+def include_archived(request):
+    """
+    True if a request asked for the archived lists and items too
+    with ?include_archived=1
+    """
+    return request.query_params.get('include_archived') in ('1', 'true')
+
+
+def item_values(request, fields, order=(), **filters):
+    """
+    Values of the items the logged in user can access, the items of
+    the archived lists are only read with ?include_archived=1
+
+    :param request: DRF request
+    :param fields: item fields fetched
+    :param order: fields the items are ordered by
+    :param filters: filters of the items
+    :return: values queryset
+    """
+    active = Item.objects.accessible_by(request.user).filter(**filters)
+    if not include_archived(request):
+        return active.order_by(*order).values(*fields)
+    # a union is ordered by columns it selects
+    columns = tuple(dict.fromkeys(tuple(order) + tuple(fields)))
+    archived = ArchivedItem.objects.accessible_by(request.user).filter(
+        **filters
+    )
+    return active.values(*columns).union(
+        archived.values(*columns), all=True
+    ).order_by(*order)
+
+
+def move_items(source, target, list_id):
+    # copy the items of a list to the other table, then delete the
+    # copied rows only, an item added meanwhile stays where it is
+    columns = ', '.join(
+        connection.ops.quote_name(field.column)
+        for field in Item._meta.concrete_fields
+    )
+    source_table = source._meta.db_table
+    target_table = target._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "insert into {target} ({columns}) select {columns} "
+            "from {source} where the_list_id=%s".format(
+                target=target_table, source=source_table, columns=columns),
+            [list_id]
+        )
+        cursor.execute(
+            "delete from {source} where id in (select id from {target} "
+            "where the_list_id=%s)".format(
+                target=target_table, source=source_table),
+            [list_id]
+        )
+
+
+def archive_list(list_id):
+    """
+    Archive a shopping list and move its items to the archived
+    item table in one transaction
+
+    :param list_id: id of the shopping list
+    :return: True if the list was archived, False if there is no
+        active list with that id
+    """
+    with transaction.atomic():
+        # the UPDATE locks the list until the items are moved
+        if not ShoppingList.objects.filter(
+                id=list_id, archived_on__isnull=True,
+                deleted_on__isnull=True
+        ).update(archived_on=timezone.now()):
+            return False
+        move_items(Item, ArchivedItem, list_id)
+    return True
+
+
+def unarchive_list(list_id):
+    """
+    Move the items of an archived shopping list back to the item
+    table and make the list active again
+
+    :param list_id: id of the shopping list
+    :return: True if the list was restored, False if there is no
+        archived list with that id
+    """
+    with transaction.atomic():
+        if not ShoppingList.objects.filter(
+                id=list_id, archived_on__isnull=False,
+                deleted_on__isnull=True
+        ).update(archived_on=None, updated_on=timezone.now()):
+            return False
+        move_items(ArchivedItem, Item, list_id)
+    return True
+
+
+def inactive_lists(days=None):
+    """
+    Active shopping lists that were not changed for ARCHIVE
+    AFTER_DAYS days, nor any of their items
+
+    :return: queryset of the ids of the lists
+    """
+    days = settings.ARCHIVE['AFTER_DAYS'] if days is None else days
+    since = timezone.now() - datetime.timedelta(days=days)
+    return ShoppingList.objects.filter(
+        archived_on__isnull=True, deleted_on__isnull=True,
+        updated_on__lt=since
+    ).exclude(
+        item__updated_on__gte=since
+    ).values_list('id', flat=True)
@@ -0,0 +1,246 @@
+import bisect
+import collections
+import heapq
+import json
+import threading
+import time
+
+from django.conf import settings
+
+from api import feed
+from api.models import ChangeEvent, Item
+
+# item name autocomplete, every process keeps an index of the item
+# names of the users that asked for suggestions recently, so that a
+# keystroke is answered from memory instead of scanning api_item
+
+
+def normalize(name):
+    return ' '.join(name.split()).casefold()
+
+
+class NameIndex:
+    """
+    The item names of a user in a sorted array, a prefix is looked up
+    with bisect and its names are ranked by how often they were used
+    """
+    __slots__ = (
+        'keys', 'names', 'counts', 'items', 'top', 'built_on',
+        'checked_on', 'watermark'
+    )
+
+    # suggestions of prefixes up to this length are memoized, they
+    # match the most names
+    MEMO_LENGTH = 2
+
+    def __init__(self, items=(), watermark=None):
+        # normalized names in order, per normalized name the name first
+        # seen and the number of items with it, and per item id its
+        # normalized name, so that a renamed or deleted item is found
+        self.names = {}
+        self.counts = collections.Counter()
+        self.items = {}
+        for item_id, name in items:
+            key = normalize(name)
+            if key:
+                self.names.setdefault(key, name.strip())
+                self.counts[key] += 1
+                self.items[item_id] = key
+        self.keys = sorted(self.names)
+        self.top = {}
+        self.built_on = self.checked_on = time.monotonic()
+        # last change event of the user applied to the index
+        self.watermark = watermark
+
+    def update(self, item_id, name):
+        """
+        Change the name of an item in the index
+
+        :param item_id: id of the item
+        :param name: its new name, None when the item was deleted
+        """
+        key = normalize(name or '')
+        old = self.items.pop(item_id, None)
+        if key == old:
+            # e.g bought or moved, the name is the same
+            self.items[item_id] = key
+            return
+        if old is not None:
+            self.counts[old] -= 1
+            if not self.counts[old]:
+                del self.counts[old]
+                del self.names[old]
+                del self.keys[bisect.bisect_left(self.keys, old)]
+        if key:
+            if key not in self.names:
+                bisect.insort(self.keys, key)
+                self.names[key] = name.strip()
+            self.counts[key] += 1
+            self.items[item_id] = key
+        self.top.clear()
+
+    def suggest(self, prefix, limit):
+        """
+        Names starting with a prefix, the most used first
+
+        :param prefix: text typed by the user
+        :param limit: number of names returned
+        :return: list of names
+        """
+        prefix = normalize(prefix)
+        memo = len(prefix) <= self.MEMO_LENGTH
+        if memo and (prefix, limit) in self.top:
+            return self.top[prefix, limit]
+        start = bisect.bisect_left(self.keys, prefix)
+        # every key starting with the prefix sorts before this one
+        end = bisect.bisect_left(self.keys, prefix + '\U0010ffff', start)
+        best = heapq.nsmallest(
+            limit, self.keys[start:end],
+            key=lambda key: (-self.counts[key], key)
+        )
+        names = [self.names[key] for key in best]
+        if memo:
+            self.top[prefix, limit] = names
+        return names
+
+
+def last_change(user):
+    """
+    Id of the last change event of a user, every change to the items
+    or the memberships of their lists publishes one, through any
+    process, read from the (user, id) index of the change events
+
+    :return: id, None when the user has no events
+    """
+    return ChangeEvent.objects.filter(user=user).order_by(
+        '-id'
+    ).values_list('id', flat=True).first()
+
+
+# list events after which the items a user can access changed, the
+# index is built again, a created or renamed list changes no names
+REBUILD_LIST_ACTIONS = ('shared', 'unshared', 'deleted', 'archived',
+                        'restored')
+
+
+def changed_items(events):
+    """
+    Items whose names may have changed in a series of change events
+
+    :param events: data of the change events, in order
+    :return: dict of item id to its last action, None when an event
+        changed the items of a whole list
+    """
+    items = {}
+    for data in events:
+        event = json.loads(data)
+        if event.get('type') == 'item':
+            items[event['id']] = event['action']
+        elif event.get('type') == 'list' and \
+                event.get('action') in REBUILD_LIST_ACTIONS:
+            return None
+    return items
+
+
+class Autocomplete:
+    """
+    Thread safe store of the name indexes of the most recently active
+    users, an index is built with one query the first time a user asks
+    for suggestions. Every few seconds at most, the change events the
+    user got since, from any process, are applied to it, only the
+    names of the items they name are read again
+    """
+
+    # more events than this and the index is built again
+    MAX_EVENTS = 100
+
+    def __init__(self, max_users=10000, ttl=3600, check_interval=5):
+        self.lock = threading.Lock()
+        self.indexes = collections.OrderedDict()
+        self.max_users = max_users
+        # seconds an index is used at most before it is built again
+        self.ttl = ttl
+        # seconds between two looks at the change events of a user
+        self.check_interval = check_interval
+
+    def index(self, user):
+        now = time.monotonic()
+        with self.lock:
+            index = self.indexes.get(user.id)
+            if index is not None and now - index.built_on < self.ttl:
+                self.indexes.move_to_end(user.id)
+                if now - index.checked_on < self.check_interval:
+                    return index
+                # the other requests of the user do not check too
+                index.checked_on = now
+            else:
+                index = None
+        if index is not None and self.catch_up(user, index):
+            return index
+        # the change events of the user are published for as long as
+        # the index is used
+        feed.feed.follow(user.id, self.ttl)
+        watermark = last_change(user)
+        # built without the lock, the other users are not kept waiting
+        index = NameIndex(
+            Item.objects.accessible_by(user).order_by().values_list(
+                'id', 'name'
+            ),
+            watermark=watermark
+        )
+        with self.lock:
+            self.indexes[user.id] = index
+            self.indexes.move_to_end(user.id)
+            while len(self.indexes) > self.max_users:
+                self.indexes.popitem(last=False)
+        return index
+
+    def catch_up(self, user, index):
+        """
+        Apply the change events of a user newer than its index
+
+        :return: False when the index has to be built again
+        """
+        watermark = index.watermark
+        events = list(ChangeEvent.objects.filter(
+            user=user, id__gt=watermark or 0
+        ).order_by('id').values_list('id', 'data')[:self.MAX_EVENTS + 1])
+        if not events:
+            return True
+        if len(events) > self.MAX_EVENTS:
+            return False
+        items = changed_items(data for _, data in events)
+        if items is None:
+            return False
+        # a deleted item is removed, the others are read by id
+        read = [
+            item_id for item_id, action in items.items()
+            if action != 'deleted'
+        ]
+        names = dict(Item.objects.accessible_by(user).filter(
+            id__in=read
+        ).values_list('id', 'name')) if read else {}
+        with self.lock:
+            # unless another request applied them meanwhile
+            if index.watermark == watermark:
+                for item_id in items:
+                    index.update(item_id, names.get(item_id))
+                index.watermark = events[-1][0]
+        return True
+
+    def suggest(self, user, prefix, limit):
+        index = self.index(user)
+        with self.lock:
+            return index.suggest(prefix, limit)
+
+    def clear(self):
+        with self.lock:
+            self.indexes.clear()
+
+
+# name indexes of this process
+names = Autocomplete(
+    max_users=settings.AUTOCOMPLETE['MAX_USERS'],
+    ttl=settings.AUTOCOMPLETE['TTL'],
+    check_interval=settings.AUTOCOMPLETE['CHECK_INTERVAL']
+)
@@ -0,0 +1,197 @@
+import io
+import json
+import logging
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.urls import Resolver404, resolve
+from rest_framework.exceptions import ValidationError
+
+# batch requests, the sub-requests of a batch are dispatched in-process
+# to the views of api/urls.py with the user of the batch request and
+# in one database transaction
+
+logger = logging.getLogger('api.batch')
+
+# methods a sub-request can use
+METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+# routes a batch can not contain, another batch or the change feed
+# which would keep the batch waiting
+EXCLUDED_URL_NAMES = (
+    'shop-list-api-batch',
+    'shop-list-api-changes',
+    'shop-list-api-changes-stream',
+)
+
+# request headers that are not copied to the sub-requests, they
+# carry their own body, are never compressed and conditions of the
+# batch request do not apply to them
+SKIPPED_HEADERS = (
+    'HTTP_ACCEPT_ENCODING',
+    'HTTP_CONTENT_ENCODING',
+    'HTTP_IF_MATCH',
+    'HTTP_IF_NONE_MATCH',
+    'HTTP_IF_MODIFIED_SINCE',
+    'HTTP_IF_UNMODIFIED_SINCE',
+)
+
+
+def parse_batch(data, max_requests):
+    """
+    Validate the body of a batch request
+
+    :param data: parsed body, a list of sub-requests such as
+        {"method": "GET", "url": "shoppinglists/1/", "body": {...},
+        "headers": {...}}
+    :param max_requests: maximum number of sub-requests
+    :return: list of (method, url, body, headers)
+    """
+    if not isinstance(data, list) or not data:
+        raise ValidationError('expected a non empty list of requests')
+    if len(data) > max_requests:
+        raise ValidationError(
+            'a batch can hold at most {} requests'.format(max_requests)
+        )
+    requests = []
+    for index, sub_request in enumerate(data):
+        if not isinstance(sub_request, dict):
+            raise ValidationError({index: 'expected an object'})
+        method = str(sub_request.get('method', 'GET')).upper()
+        if method not in METHODS:
+            raise ValidationError({index: 'unsupported method {}'.format(
+                method)})
+        url = sub_request.get('url')
+        if not isinstance(url, str) or not url:
+            raise ValidationError({index: 'url is required'})
+        headers = sub_request.get('headers') or {}
+        if not isinstance(headers, dict):
+            raise ValidationError({index: 'headers must be an object'})
+        requests.append((method, url, sub_request.get('body'), headers))
+    return requests
+
+
+def sub_request_environ(request, method, path, query, body, headers):
+    """
+    Build the WSGI environ of a sub-request from the batch request
+
+    :param request: the batch HttpRequest
+    :param method: http method of the sub-request
+    :param path: path of the sub-request
+    :param query: query string of the sub-request
+    :param body: data sent as json, or None
+    :param headers: extra headers of the sub-request
+    :return: environ dict
+    """
+    environ = {
+        key: value for key, value in request.META.items()
+        if key not in SKIPPED_HEADERS
+    }
+    payload = json.dumps(body).encode() if body is not None else b''
+    environ.update({
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(payload)),
+        'HTTP_ACCEPT': 'application/json',
+        'wsgi.input': io.BytesIO(payload),
+    })
+    for name, value in headers.items():
+        environ['HTTP_' + name.upper().replace('-', '_')] = str(value)
+    return environ
+
+
+def error(status, detail):
+    return {'status': status, 'headers': {}, 'body': {'detail': detail}}
+
+
+def dispatch(request, method, url, body, headers):
+    """
+    Run a sub-request through the view of its route
+
+    :param request: the authenticated batch request
+    :param method: http method of the sub-request
+    :param url: url of the sub-request, either a full path such as
+        /v1/shoppinglists/ or a path relative to the version of the
+        batch request such as shoppinglists/
+    :param body: data of the sub-request
+    :param headers: extra headers of the sub-request
+    :return: dict with the status, headers and body of the response
+    """
+    path, _, query = url.partition('?')
+    if not path.startswith('/'):
+        path = '/{}/{}'.format(request.version, path)
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return error(404, 'Not found.')
+    if match.namespace != 'shop_list_api' \
+            or match.url_name in EXCLUDED_URL_NAMES:
+        return error(404, 'Not found.')
+
+    sub_request = WSGIRequest(sub_request_environ(
+        request._request, method, path, query, body, headers
+    ))
+    sub_request.resolver_match = match
+    # the batch request was authenticated once, the sub-requests
+    # reuse its user instead of decoding the token again
+    sub_request._force_auth_user = request.user
+    sub_request._force_auth_token = request.auth
+
+    response = match.func(sub_request, *match.args, **match.kwargs)
+    if hasattr(response, 'data'):
+        data = response.data
+    elif response.content:
+        try:
+            data = json.loads(response.content.decode())
+        except ValueError:
+            data = response.content.decode(errors='replace')
+    else:
+        data = None
+    return {
+        'status': response.status_code,
+        'headers': {
+            name: value for name, value in response.items()
+            if name not in ('Content-Type', 'Vary', 'Allow')
+        },
+        'body': data,
+    }
+
+
+def run_sub_request(request, method, url, body, headers):
+    try:
+        return dispatch(request, method, url, body, headers)
+    except Exception:
+        logger.exception('batch request %s %s failed', method, url)
+        return error(500, 'A server error occurred.')
+
+
+def run_batch(request, sub_requests):
+    """
+    Dispatch the sub-requests of a batch in order
+
+    A batch that changes data runs in one transaction, every
+    sub-request in a savepoint that is rolled back when it fails, so
+    a failed sub-request leaves no changes behind while the changes
+    of the others are committed together. A batch of GET requests
+    runs without a transaction or savepoints, like separate requests
+
+    :param request: the authenticated batch request
+    :param sub_requests: list of (method, url, body, headers)
+    :return: list of responses, see dispatch
+    """
+    if all(sub_request[0] == 'GET' for sub_request in sub_requests):
+        return [
+            run_sub_request(request, *sub_request)
+            for sub_request in sub_requests
+        ]
+    responses = []
+    with transaction.atomic():
+        for sub_request in sub_requests:
+            with transaction.atomic():
+                response = run_sub_request(request, *sub_request)
+                if response['status'] >= 400:
+                    transaction.set_rollback(True)
+            responses.append(response)
+    return responses
@@ -0,0 +1,717 @@
+import http.client
+import io
+import json
+import math
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework_jwt.settings import api_settings
+
+from api import compression, parsers, renderers, throttling
+from api.models import UserProfile, ShoppingList, Item, ListMembership
+from api.serializers import ItemsSerializer
+
+# load testing harness that drives the api through the WSGI app
+
+jwt_payload_handler = api_settings.JWT_PAYLOAD_HANDLER
+jwt_encode_handler = api_settings.JWT_ENCODE_HANDLER
+
+# password shared by all the seeded users
+BENCH_PASSWORD = 'bench-password'
+# api version used for all the benchmarked routes
+BENCH_VERSION = 'v1'
+
+
+class QueryCounter:
+    """
+    Database execute wrapper that counts the queries run
+    on the connection of the current thread
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class SerializedApplication:
+    """
+    WSGI application wrapper that handles one request at a time,
+    the way a single sync worker does, queued requests wait for
+    the one in flight to finish
+    """
+
+    def __init__(self, application):
+        self.application = application
+        self.lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        with self.lock:
+            response = self.application(environ, start_response)
+            try:
+                return list(response)
+            finally:
+                if hasattr(response, 'close'):
+                    response.close()
+
+
+class RemoteApplication:
+    """
+    WSGI application stand-in that forwards the requests over HTTP
+    to a running server, e.g gunicorn, so that the server itself is
+    part of what is measured
+    """
+
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+
+    def __call__(self, environ, start_response):
+        path = self.prefix + environ['PATH_INFO']
+        if environ.get('QUERY_STRING'):
+            path += '?' + environ['QUERY_STRING']
+        headers = {'Content-Type': environ['CONTENT_TYPE']}
+        if 'HTTP_AUTHORIZATION' in environ:
+            headers['Authorization'] = environ['HTTP_AUTHORIZATION']
+        body = environ['wsgi.input'].read() or None
+        http_connection = http.client.HTTPConnection(
+            self.host, self.port, timeout=self.timeout
+        )
+        try:
+            http_connection.request(
+                environ['REQUEST_METHOD'], path, body=body, headers=headers
+            )
+            response = http_connection.getresponse()
+            content = response.read()
+            start_response(
+                '{} {}'.format(response.status, response.reason),
+                response.getheaders()
+            )
+            return [content]
+        finally:
+            http_connection.close()
+
+
+class BenchUser:
+    """
+    A seeded user and the objects it owns
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.username = user.username
+        self.list_ids = []
+        self.item_ids = []
+        # objects reserved for the routes that delete them
+        self.spare_list_ids = []
+        self.spare_item_ids = []
+
+    @property
+    def token(self):
+        # tokens are short lived, issue a fresh one for each request
+        return jwt_encode_handler(jwt_payload_handler(self.user))
+
+
+def seed(users=10, lists=5, items=20, spares=0):
+    """
+    This function seeds the database with users, shopping lists
+    and items. The first user is an admin user.
+
+    :param users: number of users
+    :param lists: number of shopping lists per user
+    :param items: number of items per shopping list
+    :param spares: number of lists and items per user to set aside
+    for the routes that delete them
+    :return: list of BenchUser
+    """
+    # hashing is slow, hash the password once for every user
+    password = make_password(BENCH_PASSWORD)
+    run_id = uuid.uuid4().hex[:8]
+    User.objects.bulk_create([
+        User(
+            username='bench_{}_{}'.format(run_id, i),
+            email='bench_{}@mail.com'.format(i),
+            password=password,
+            first_name='bench',
+            last_name='user {}'.format(i),
+            is_staff=i == 0,
+            is_superuser=i == 0
+        ) for i in range(users)
+    ])
+    seeded = list(User.objects.filter(
+        username__startswith='bench_{}_'.format(run_id)
+    ).order_by('id'))
+    UserProfile.objects.bulk_create([
+        UserProfile(description='benchmark user', user=user)
+        for user in seeded
+    ])
+
+    bench_users = []
+    for user in seeded:
+        bench_user = BenchUser(user)
+        ShoppingList.objects.bulk_create([
+            ShoppingList(
+                name='list {}'.format(i),
+                description='benchmark list',
+                user=user
+            ) for i in range(lists + spares)
+        ])
+        list_ids = list(ShoppingList.objects.filter(
+            user=user
+        ).order_by('id').values_list('id', flat=True))
+        # bulk_create sends no post_save, the owners are added here
+        ListMembership.objects.bulk_create([
+            ListMembership(
+                user=user, shopping_list_id=list_id,
+                role=ListMembership.OWNER
+            ) for list_id in list_ids
+        ])
+        bench_user.list_ids = list_ids[:lists]
+        bench_user.spare_list_ids = list_ids[lists:]
+        Item.objects.bulk_create([
+            Item(
+                name='item {}'.format(i),
+                description='benchmark item',
+                the_list_id=list_id
+            ) for list_id in list_ids for i in range(items)
+        ])
+        if bench_user.list_ids:
+            Item.objects.bulk_create([
+                Item(
+                    name='spare item {}'.format(i),
+                    the_list_id=bench_user.list_ids[0]
+                ) for i in range(spares)
+            ])
+            item_ids = list(Item.objects.filter(
+                the_list_id__in=bench_user.list_ids
+            ).order_by('id').values_list('id', flat=True))
+            bench_user.spare_item_ids = item_ids[len(item_ids) - spares:]
+            bench_user.item_ids = item_ids[:len(item_ids) - spares]
+        bench_users.append(bench_user)
+    return bench_users
+
+
+def url(name, **kwargs):
+    """
+    Reverse a route in api/urls.py
+    """
+    kwargs['version'] = BENCH_VERSION
+    return reverse('shop_list_api:' + name, kwargs=kwargs)
+
+
+def pick(ids, i):
+    """
+    Cycle through a list of ids
+    """
+    return ids[i % len(ids)]
+
+
+# every route in api/urls.py, a scenario builds the request for the
+# i-th call made by a user and returns (method, path, body, auth)
+SCENARIOS = [
+    ('register', lambda u, i: (
+        'POST', url('shop-list-api-register-user'), {
+            'username': 'new_{}'.format(uuid.uuid4().hex),
+            'password': BENCH_PASSWORD,
+            'email': 'new@mail.com',
+            'first_name': 'new',
+            'last_name': 'user',
+            'description': 'new user'
+        }, False)),
+    ('login', lambda u, i: (
+        'POST', url('shop-list-api-login-user'), {
+            'username': u.username,
+            'password': BENCH_PASSWORD
+        }, False)),
+    ('reset-password', lambda u, i: (
+        'PUT', url('shop-list-api-reset-password'), {
+            'password': BENCH_PASSWORD
+        }, True)),
+    ('logout', lambda u, i: (
+        'GET', url('shop-list-api-logout-user'), None, True)),
+    ('all-users', lambda u, i: (
+        'GET', url('shop-list-api-all-users'), None, True)),
+    ('user-detail', lambda u, i: (
+        'GET', url('shop-list-api-user', username=u.username), None, True)),
+    ('user-update', lambda u, i: (
+        'PUT', url('shop-list-api-user', username=u.username), {
+            'description': 'updated {}'.format(i)
+        }, True)),
+    ('lists', lambda u, i: (
+        'GET', url('shop-list-api-shopping-lists'), None, True)),
+    ('list-create', lambda u, i: (
+        'POST', url('shop-list-api-shopping-lists'), {
+            'name': 'new list {}'.format(i),
+            'description': 'created by the benchmark'
+        }, True)),
+    ('list-search', lambda u, i: (
+        'GET', url('shopping-lists-search') + '?q=list+1', None, True)),
+    ('list-detail', lambda u, i: (
+        'GET', url('shop-list-api-shopping-lists-detail',
+                   pk=pick(u.list_ids, i)), None, True)),
+    ('list-update', lambda u, i: (
+        'PUT', url('shop-list-api-shopping-lists-detail',
+                   pk=pick(u.list_ids, i)), {
+            'name': 'list {}'.format(i),
+            'description': 'updated by the benchmark'
+        }, True)),
+    ('list-delete', lambda u, i: (
+        'DELETE', url('shop-list-api-shopping-lists-detail',
+                      pk=u.spare_list_ids.pop()), None, True)),
+    ('all-items', lambda u, i: (
+        'GET', url('shopping-lists-all-items'), None, True)),
+    ('list-items', lambda u, i: (
+        'GET', url('shopping-lists-items',
+                   list_id=pick(u.list_ids, i)), None, True)),
+    ('item-create', lambda u, i: (
+        'POST', url('shopping-lists-items', list_id=pick(u.list_ids, i)), {
+            'name': 'new item {}'.format(i),
+            'description': 'created by the benchmark'
+        }, True)),
+    ('item-detail', lambda u, i: (
+        'GET', url('shopping-lists-items-detail',
+                   item_id=pick(u.item_ids, i)), None, True)),
+    ('item-update', lambda u, i: (
+        'PUT', url('shopping-lists-items-detail',
+                   item_id=pick(u.item_ids, i)), {
+            'name': 'item {}'.format(i),
+            'description': 'updated by the benchmark',
+            'bought': i % 2 == 0
+        }, True)),
+    ('item-delete', lambda u, i: (
+        'DELETE', url('shopping-lists-items-detail',
+                      item_id=u.spare_item_ids.pop()), None, True)),
+    ('item-search', lambda u, i: (
+        'GET', url('shopping-lists-items-search') + '?q=item+1',
+        None, True)),
+    # the reads of a list screen in one round trip
+    ('batch', lambda u, i: (
+        'POST', url('shop-list-api-batch'), [
+            {'url': url('shop-list-api-shopping-lists-detail',
+                        pk=pick(u.list_ids, i))},
+            {'url': url('shopping-lists-items',
+                        list_id=pick(u.list_ids, i))},
+            {'url': url('shop-list-api-user', username=u.username)},
+        ], True)),
+]
+
+
+def build_environ(method, path, body=None, token=None):
+    """
+    Build a WSGI environ for a request
+
+    :param method: http method
+    :param path: path with an optional query string
+    :param body: data to send as json
+    :param token: jwt token of the user making the request
+    :return: environ dict
+    """
+    path, _, query = path.partition('?')
+    payload = json.dumps(body).encode() if body is not None else b''
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(payload)),
+        'wsgi.input': io.BytesIO(payload),
+    }
+    if token is not None:
+        environ['HTTP_AUTHORIZATION'] = 'Bearer ' + token
+    setup_testing_defaults(environ)
+    return environ
+
+
+# query count reported in the Server-Timing header
+SERVER_TIMING_QUERIES = re.compile(r'db;desc="(\d+) queries"')
+
+
+def call(application, environ):
+    """
+    Call the WSGI application and consume the response
+
+    The queries are counted on the connection of the current thread,
+    when the application runs elsewhere, e.g RemoteApplication, the
+    count reported in the Server-Timing header is used instead
+
+    :return: (status code, latency in seconds, query count)
+    """
+    status_holder = []
+    reported = []
+
+    def start_response(status, headers, exc_info=None):
+        status_holder.append(int(status.split(' ', 1)[0]))
+        for name, value in headers:
+            if name.lower() == 'server-timing':
+                match = SERVER_TIMING_QUERIES.search(value)
+                if match:
+                    reported.append(int(match.group(1)))
+
+    counter = QueryCounter()
+    started = time.perf_counter()
+    with connection.execute_wrapper(counter):
+        response = application(environ, start_response)
+        try:
+            for _ in response:
+                pass
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+    elapsed = time.perf_counter() - started
+    queries = counter.count
+    if not queries and reported:
+        queries = reported[0]
+    return status_holder[0], elapsed, queries
+
+
+def percentile(values, percent):
+    """
+    Nearest rank percentile of a list of numbers
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = int(math.ceil(percent / 100.0 * len(ordered)))
+    return ordered[max(rank, 1) - 1]
+
+
+def summarize(name, samples, elapsed):
+    """
+    Compute the statistics of a route
+
+    :param name: scenario name
+    :param samples: list of (status, latency, queries)
+    :param elapsed: wall clock time taken by all the samples
+    :return: dict
+    """
+    latencies = [latency * 1000 for _, latency, _ in samples]
+    count = len(samples)
+    return {
+        'route': name,
+        'requests': count,
+        'errors': sum(1 for code, _, _ in samples if code >= 500),
+        'req_per_sec': round(count / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'queries_per_request': round(
+            sum(queries for _, _, queries in samples) / count, 2
+        ) if count else 0.0,
+    }
+
+
+def run_scenario(application, name, scenario, users, requests, clients):
+    """
+    Drive one route with concurrent clients
+
+    :param application: WSGI application
+    :param name: scenario name
+    :param scenario: callable building the requests
+    :param users: list of BenchUser
+    :param requests: total number of requests to make
+    :param clients: number of concurrent clients
+    :return: dict with the route statistics
+    """
+    # build all the requests up front so that only the calls are timed
+    environs = []
+    for i in range(requests):
+        user = users[i % len(users)]
+        method, path, body, auth = scenario(user, i // len(users))
+        environs.append(build_environ(
+            method, path, body, user.token if auth else None
+        ))
+
+    def worker(client):
+        return [
+            call(application, environ)
+            for environ in environs[client::clients]
+        ]
+
+    started = time.perf_counter()
+    if clients == 1:
+        # stay on the calling thread and its database connection
+        samples = worker(0)
+    else:
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            samples = [
+                sample
+                for chunk in executor.map(worker, range(clients))
+                for sample in chunk
+            ]
+    elapsed = time.perf_counter() - started
+    return summarize(name, samples, elapsed)
+
+
+# ways of serving the WSGI app that can be benchmarked
+SERVING_MODES = ('threaded', 'sync')
+
+
+def run(users=10, lists=5, items=20, requests=100, clients=4,
+        routes=None, application=None, serving='threaded'):
+    """
+    Seed the database and benchmark the routes
+
+    Throttling is switched off while the routes are benchmarked in
+    process, the rate limits would otherwise be what is measured
+
+    :param users: number of users to seed
+    :param lists: number of lists per user
+    :param items: number of items per list
+    :param requests: number of requests per route
+    :param clients: number of concurrent clients
+    :param routes: names of the routes to run, all routes by default
+    :param application: WSGI application, django's by default
+    :param serving: 'threaded' to serve the concurrent clients in
+    parallel threads like a gthread worker, 'sync' to serve them one
+    at a time like a single sync worker
+    :return: list of dicts with the statistics of each route
+    """
+    application = application or WSGIHandler()
+    if serving == 'sync':
+        application = SerializedApplication(application)
+    spares = int(math.ceil(requests / float(users)))
+    bench_users = seed(users, lists, items, spares)
+    throttling.buckets.enabled = False
+    try:
+        results = run_scenarios(
+            application, bench_users, requests, spares, clients, routes
+        )
+    finally:
+        throttling.buckets.enabled = True
+    return results
+
+
+def run_scenarios(application, bench_users, requests, spares, clients,
+                  routes=None):
+    """
+    Benchmark the routes with the seeded users
+
+    :return: list of dicts with the statistics of each route
+    """
+    results = []
+    for name, scenario in SCENARIOS:
+        if routes and name not in routes:
+            continue
+        # only the admin user may list all users
+        scenario_users = bench_users[:1] \
+            if name == 'all-users' else bench_users
+        if name in ('list-delete', 'item-delete'):
+            # each user can only delete its spare objects once
+            count = min(requests, spares * len(scenario_users))
+        else:
+            count = requests
+        results.append(run_scenario(
+            application, name, scenario, scenario_users, count, clients
+        ))
+    return results
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Compare benchmark results with a baseline
+
+    A route regresses when its p95 latency is slower or its request
+    rate is lower than the baseline by more than the tolerance, or
+    when it runs more queries per request than the baseline
+
+    :param results: list of route statistics
+    :param baseline: list of route statistics to compare against
+    :param tolerance: allowed relative slow down
+    :return: list of regression messages
+    """
+    expected = {entry['route']: entry for entry in baseline}
+    regressions = []
+    for result in results:
+        base = expected.get(result['route'])
+        if base is None:
+            continue
+        if result['queries_per_request'] > base['queries_per_request']:
+            regressions.append(
+                '{route}: {queries_per_request} queries per request, '
+                'baseline {base}'.format(
+                    base=base['queries_per_request'], **result)
+            )
+        if result['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(
+                '{route}: p95 {p95_ms}ms, baseline {base}ms'.format(
+                    base=base['p95_ms'], **result)
+            )
+        if result['req_per_sec'] < base['req_per_sec'] * (1 - tolerance):
+            regressions.append(
+                '{route}: {req_per_sec} req/s, baseline {base}'.format(
+                    base=base['req_per_sec'], **result)
+            )
+    return regressions
+
+
+def compare_serving(sync_results, threaded_results):
+    """
+    Compare the request rates of the sync and threaded serving modes
+
+    :return: list of dicts with the request rates of each route
+    """
+    threaded = {entry['route']: entry for entry in threaded_results}
+    rows = []
+    for result in sync_results:
+        other = threaded.get(result['route'])
+        if other is None:
+            continue
+        rows.append({
+            'route': result['route'],
+            'sync_req_per_sec': result['req_per_sec'],
+            'threaded_req_per_sec': other['req_per_sec'],
+            'sync_p95_ms': result['p95_ms'],
+            'threaded_p95_ms': other['p95_ms'],
+            'speedup': round(
+                other['req_per_sec'] / result['req_per_sec'], 2
+            ) if result['req_per_sec'] else 0.0,
+        })
+    return rows
+
+
+def format_table(results, columns=None):
+    """
+    Format the benchmark results as a text table
+    """
+    columns = columns or (
+        'route', 'requests', 'errors', 'req_per_sec',
+        'p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request'
+    )
+    rows = [columns] + [
+        tuple(str(result[column]) for column in columns)
+        for result in results
+    ]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+    return '\n'.join(
+        '  '.join(cell.ljust(width) for cell, width in zip(row, widths))
+        for row in rows
+    )
+
+
+def item_payload(items=1000):
+    """
+    Serialized items, the payload of the item list endpoints
+
+    :param items: number of items
+    :return: ItemsSerializer data
+    """
+    now = timezone.now()
+    return ItemsSerializer([
+        Item(
+            id=i, name='item {}'.format(i),
+            description='description of item {} on the list'.format(i),
+            bought=i % 2 == 0, created_on=now, updated_on=now
+        )
+        for i in range(1, items + 1)
+    ], many=True).data
+
+
+def available_codecs():
+    """
+    Return the (name, renderer, parser) pairs that can be benchmarked,
+    the optional ones need their package to be installed
+    """
+    codecs = [('json', JSONRenderer(), JSONParser())]
+    if renderers.orjson is not None:
+        codecs.append(
+            ('orjson', renderers.FastJSONRenderer(), parsers.FastJSONParser())
+        )
+    if renderers.msgpack is not None:
+        codecs.append((
+            'msgpack', renderers.MessagePackRenderer(),
+            parsers.MessagePackParser()
+        ))
+    return codecs
+
+
+def run_codecs(items=1000, repeat=20):
+    """
+    Time rendering and parsing an item list payload with
+    every available renderer and parser
+
+    :param items: number of items in the payload
+    :param repeat: number of times each codec is timed
+    :return: one result per codec, with median timings
+    """
+    payload = item_payload(items)
+    results = []
+    for name, renderer, parser in available_codecs():
+        render_times, parse_times = [], []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            body = renderer.render(payload, renderer.media_type)
+            render_times.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            parser.parse(io.BytesIO(body), parser.media_type)
+            parse_times.append(time.perf_counter() - started)
+        results.append({
+            'codec': name,
+            'items': items,
+            'bytes': len(body),
+            'render_ms': round(percentile(render_times, 50) * 1000, 3),
+            'parse_ms': round(percentile(parse_times, 50) * 1000, 3),
+        })
+    return results
+
+
+def run_compression(items=1000, repeat=20, levels=None):
+    """
+    Time compressing an item list rendered as JSON with every
+    available encoding, then compressing the same body again through
+    the cache of compressed bodies
+
+    :param items: number of items in the payload
+    :param repeat: number of times each encoding is timed
+    :param levels: dict of encoding to level, COMPRESSION['LEVELS']
+        by default
+    :return: one result per encoding, with median timings
+    """
+    if levels is None:
+        levels = settings.COMPRESSION['LEVELS']
+    renderer = renderers.FastJSONRenderer()
+    content = renderer.render(item_payload(items), renderer.media_type)
+    results = []
+    for encoding in compression.CODECS:
+        level = levels[encoding]
+        compress_times, cached_times = [], []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            body = compression.compress(
+                content, encoding, level, use_cache=False
+            )
+            compress_times.append(time.perf_counter() - started)
+        # the first call stores the body, the timed ones are hits
+        compression.compress(content, encoding, level)
+        for _ in range(repeat):
+            started = time.perf_counter()
+            compression.compress(content, encoding, level)
+            cached_times.append(time.perf_counter() - started)
+        results.append({
+            'encoding': encoding,
+            'level': level,
+            'content_bytes': len(content),
+            'bytes': len(body),
+            'compress_ms': round(percentile(compress_times, 50) * 1000, 3),
+            'cached_ms': round(percentile(cached_times, 50) * 1000, 3),
+        })
+    compression.cache.clear()
+    return results
@@ -0,0 +1,160 @@
+import collections
+import hashlib
+import threading
+import zlib
+
+# response compression, the codecs are negotiated with the
+# Accept-Encoding header of the request
+
+# optional codecs, gzip is always available
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+def gzip_compress(data, level):
+    # wbits 31 writes a gzip header with a zero mtime, so the
+    # same content always compresses to the same bytes
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def brotli_compress(data, level):
+    return brotli.compress(data, quality=level)
+
+
+def zstd_compress(data, level):
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+# compress functions of the codecs installed in this process
+CODECS = {'gzip': gzip_compress}
+if brotli is not None:
+    CODECS['br'] = brotli_compress
+if zstandard is not None:
+    CODECS['zstd'] = zstd_compress
+
+
+def parse_accept_encoding(header):
+    """
+    Parse an Accept-Encoding header
+
+    :param header: e.g 'gzip, br;q=0.8, *;q=0'
+    :return: dict of encoding to quality
+    """
+    accepted = {}
+    for part in header.split(','):
+        encoding, _, params = part.strip().partition(';')
+        encoding = encoding.strip().lower()
+        if not encoding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[encoding] = quality
+    return accepted
+
+
+def negotiate(header, preferred):
+    """
+    Choose the encoding of a response
+
+    :param header: Accept-Encoding header of the request
+    :param preferred: encodings in the order the server prefers them
+    :return: the encoding with the highest quality for the client,
+        ties broken by the server preference, or None
+    """
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get('*', 0.0)
+    best, best_quality = None, 0.0
+    for encoding in preferred:
+        if encoding not in CODECS:
+            continue
+        quality = accepted.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressedCache:
+    """
+    Thread safe LRU cache of compressed response bodies, keyed by
+    the encoding and a digest of the uncompressed body, so that
+    repeated responses with the same content are compressed once
+    """
+
+    def __init__(self, max_bytes=8 * 1024 * 1024):
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            body = self.entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def set(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.entries[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+
+
+# compressed bodies of this process
+cache = CompressedCache()
+
+
+def compress(content, encoding, level, use_cache=True):
+    """
+    Compress a response body, reusing the cached bytes when the
+    same content was compressed before
+
+    :param content: uncompressed body
+    :param encoding: a key of CODECS
+    :param level: compression level of the codec
+    :param use_cache: look up and store the body in the cache
+    :return: compressed body
+    """
+    if not use_cache:
+        return CODECS[encoding](content, level)
+    # blake2b digests faster than gzip and brotli compress
+    key = (
+        encoding, level, hashlib.blake2b(content, digest_size=16).digest()
+    )
+    body = cache.get(key)
+    if body is None:
+        body = CODECS[encoding](content, level)
+        cache.set(key, body)
+    return body
@@ -0,0 +1,134 @@
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, transaction
+from django.db.models import F, sql
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+from rest_framework.views import status
+
+# optimistic concurrency, lists and items carry a version that is sent
+# as their ETag, an update sent with If-Match is only written when the
+# version in the database still matches, in the UPDATE statement itself
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The resource was changed, fetch it again.'
+    default_code = 'precondition_failed'
+
+
+def etag(version):
+    """
+    ETag header value of a version
+    """
+    return '"{}"'.format(version)
+
+
+def if_match_versions(request):
+    """
+    Versions listed in the If-Match header of a request
+
+    Weak tags match too, the compression middleware weakens the ETags
+    of the responses it compresses but the version is the same
+
+    :param request: DRF request
+    :return: None without If-Match or with If-Match: *, otherwise the
+        list of versions, empty when no tag is a version
+    """
+    header = request.META.get('HTTP_IF_MATCH')
+    if header is None or header.strip() == '*':
+        return None
+    versions = []
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        if tag.isdigit():
+            versions.append(int(tag))
+    return versions
+
+
+def check_version(version, versions):
+    """
+    Raise PreconditionFailed unless a version is one of the versions
+    of If-Match, versions is None when the request has no If-Match
+    """
+    if versions is not None and version not in versions:
+        raise PreconditionFailed
+
+
+def returns_from_update(connection):
+    """
+    True if the database returns the columns of the rows an UPDATE
+    writes, postgres and sqlite 3.35+ support UPDATE ... RETURNING
+    """
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 35, 0)
+    return False
+
+
+def update_returning_version(rows, values):
+    # UPDATE ... RETURNING the version written, the UPDATE statement
+    # is compiled by the ORM the way QuerySet.update() compiles it
+    query = rows.query.chain(sql.UpdateQuery)
+    query.add_update_values(values)
+    connection = connections[rows.db]
+    try:
+        statement, params = query.get_compiler(rows.db).as_sql()
+    except EmptyResultSet:
+        # e.g no If-Match tag is a version
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            '{} RETURNING {}'.format(
+                statement, connection.ops.quote_name('version')),
+            params
+        )
+        row = cursor.fetchone()
+    return row[0] if row is not None else None
+
+
+def update_then_read_version(rows, values, current):
+    # databases without RETURNING, the version is read back in the
+    # transaction of the UPDATE, which keeps the row locked
+    with transaction.atomic(using=rows.db):
+        if not rows.update(**values):
+            return None
+        return current.values_list('version', flat=True).first()
+
+
+def conditional_update(queryset, pk, versions, **values):
+    """
+    Write the values of a row and increment its version with a single
+    UPDATE, when versions is given the row is only written if its
+    version is still one of them, no read or lock is needed. The new
+    version is returned by the UPDATE where the database supports
+    RETURNING, and read back after it otherwise
+
+    :param queryset: queryset the row is looked up in
+    :param pk: primary key of the row
+    :param versions: versions of If-Match, or None to always write
+    :param values: column values to write
+    :return: the new version of the row, returned by the UPDATE, or
+        None if the row does not exist, raises PreconditionFailed if
+        its version did not match
+    """
+    rows = queryset.filter(pk=pk)
+    if versions is not None:
+        rows = rows.filter(version__in=versions)
+    values.setdefault('updated_on', timezone.now())
+    values['version'] = F('version') + 1
+    if returns_from_update(connections[rows.db]):
+        version = update_returning_version(rows, values)
+    else:
+        version = update_then_read_version(
+            rows, values, queryset.filter(pk=pk)
+        )
+    if version is not None:
+        return version
+    if versions is not None and queryset.filter(pk=pk).exists():
+        # the row was updated by another request
+        raise PreconditionFailed
+    return None
@@ -0,0 +1,456 @@
+import collections
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+from rest_framework.views import status
+
+from api.models import ChangeEvent, FeedListener, ListMembership
+from api.renderers import encode_default
+
+# change feed, the writes to shopping lists and items publish events
+# to the users they concern, clients wait for them with a long-poll
+# or a server-sent events stream instead of polling the item lists
+
+logger = logging.getLogger('api.feed')
+
+# result of waiting for the events after a cursor, reset is True when
+# events were missed and the client should fetch its lists again
+Changes = collections.namedtuple('Changes', 'cursor events reset')
+
+# a cursor that is never valid, the client is reset
+RESET_CURSOR = 'reset'
+
+
+class FeedBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many clients are waiting for changes, retry later.'
+    default_code = 'feed_busy'
+
+    def __init__(self, wait):
+        super().__init__()
+        # sent back in the Retry-After header
+        self.wait = wait
+
+
+def release_connection():
+    # a waiting client needs no database connection, give it back
+    # unless a transaction is open, e.g in a batch or in the tests
+    if not connection.in_atomic_block:
+        connection.close()
+
+
+class ChangeFeed:
+    """
+    Change events shared by all the server processes through the
+    change event table, a cursor is the id of an event so that it is
+    valid on any process
+
+    A client reads the events of its user after its cursor with one
+    indexed query and then waits without a database connection. It
+    is woken at once by an event published by its own process, and
+    by a poller thread per process that reads the ids of the events
+    of the other processes every poll_interval seconds while clients
+    wait, whatever their number
+
+    A waiting client holds a server thread, at most max_waiters wait
+    at a time in a process, the others are asked to retry after
+    retry_after seconds. The events of a user are only published
+    while the user is followed, for listen_ttl seconds after their
+    last request to the feed
+    """
+
+    def __init__(self, max_events=100, poll_interval=1.0, max_waiters=2,
+                 retry_after=5, listen_ttl=600):
+        self.max_events = max_events
+        self.poll_interval = poll_interval
+        self.max_waiters = max_waiters
+        self.retry_after = retry_after
+        self.listen_ttl = listen_ttl
+        self.after_fork()
+
+    def after_fork(self):
+        # the threads of the parent do not run in a forked process,
+        # called by the gunicorn post_fork hook and on the first wait
+        # in another process
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        # events set when an event of a user is published, per user id
+        self.waiters = {}
+        # True while a poller thread runs
+        self.polling = False
+        # clients waiting, long-polls and streams
+        self.waiting = 0
+        # per user id, the time their events are published until, as
+        # last written by this process
+        self.listening = {}
+
+    def reserve(self):
+        """
+        Take one of the max_waiters waiting slots of this process
+
+        :return: raises FeedBusy when every slot is taken
+        """
+        with self.lock:
+            if self.waiting >= self.max_waiters:
+                raise FeedBusy(self.retry_after)
+            self.waiting += 1
+
+    def release(self):
+        with self.lock:
+            self.waiting -= 1
+
+    def follow(self, user_id, seconds=None):
+        """
+        Publish the events of a user for the next seconds at least,
+        listen_ttl by default. The time written covers twice that, so
+        the row of the user is only written again once half of it is
+        left
+
+        :param user_id: id of the user
+        :param seconds: seconds the events are published for
+        :return: True if the events of the user were not published
+            until now, a cursor of the user may have missed some
+        """
+        seconds = self.listen_ttl if seconds is None else seconds
+        now = timezone.now()
+        with self.lock:
+            if self.pid != os.getpid():
+                self.after_fork()
+            known = self.listening.get(user_id)
+        if known is not None and \
+                known >= now + datetime.timedelta(seconds=seconds):
+            return False
+        until = now + datetime.timedelta(seconds=2 * seconds)
+        # never shortens the time written by another request
+        followed = FeedListener.objects.filter(
+            user_id=user_id, until__gt=now
+        ).update(until=Greatest(F('until'), Value(until)))
+        if not followed:
+            FeedListener.objects.update_or_create(
+                user_id=user_id, defaults={'until': until}
+            )
+        with self.lock:
+            for expired in [
+                    key for key, value in self.listening.items()
+                    if value <= now]:
+                del self.listening[expired]
+            self.listening[user_id] = max(until, known or until)
+        return not followed
+
+    def publish(self, user_ids, event):
+        """
+        Add an event to the feeds of some users and wake their clients
+        waiting on this process
+
+        :param user_ids: ids of the users the event concerns
+        :param event: json serializable dict
+        """
+        user_ids = set(user_ids)
+        if not user_ids:
+            # nobody follows the changes of the users concerned
+            return
+        data = json.dumps(event, default=encode_default)
+        ChangeEvent.objects.bulk_create([
+            ChangeEvent(user_id=user_id, data=data) for user_id in user_ids
+        ])
+        self.wake(user_ids)
+
+    def wake(self, user_ids):
+        with self.lock:
+            for user_id in user_ids:
+                for waiter in self.waiters.get(user_id, ()):
+                    waiter.set()
+
+    @staticmethod
+    def last_sequence():
+        # id of the last event published by any process, 0 when none
+        return ChangeEvent.objects.order_by('-id').values_list(
+            'id', flat=True
+        ).first() or 0
+
+    def changes(self, user_id, cursor):
+        """
+        Events of a user after a cursor, without waiting
+
+        :param user_id: id of the user
+        :param cursor: cursor returned with the previous changes, None
+            to start following the feed
+        :return: Changes
+        """
+        if cursor is None:
+            return Changes(str(self.last_sequence()), [], False)
+        if not cursor.isdigit():
+            return Changes(str(self.last_sequence()), [], True)
+        sequence = int(cursor)
+        # the event of the cursor is read with the events after it,
+        # it is missing once it expired, the events after it may have
+        # expired too
+        rows = list(ChangeEvent.objects.filter(
+            Q(user_id=user_id, id__gt=sequence) | Q(id=sequence)
+        ).order_by('id').values_list('id', 'data')[:self.max_events + 2])
+        if rows and rows[0][0] == sequence:
+            del rows[0]
+        elif sequence:
+            return Changes(str(self.last_sequence()), [], True)
+        if len(rows) > self.max_events:
+            # too far behind
+            return Changes(str(self.last_sequence()), [], True)
+        if not rows:
+            return Changes(cursor, [], False)
+        return Changes(
+            str(rows[-1][0]), [json.loads(data) for _, data in rows], False
+        )
+
+    def wait(self, user_id, cursor, timeout):
+        """
+        Wait up to timeout seconds for the events of a user after a
+        cursor
+
+        :return: Changes, empty if no event was published in time
+        """
+        if cursor is None or timeout <= 0:
+            return self.changes(user_id, cursor)
+        deadline = time.monotonic() + timeout
+        waiter = threading.Event()
+        # listen before reading, an event published in between wakes
+        # the waiter
+        self.listen(user_id, waiter)
+        try:
+            while True:
+                waiter.clear()
+                result = self.changes(user_id, cursor)
+                remaining = deadline - time.monotonic()
+                if result.events or result.reset or remaining <= 0:
+                    return result
+                cursor = result.cursor
+                release_connection()
+                waiter.wait(remaining)
+        finally:
+            self.unlisten(user_id, waiter)
+
+    def listen(self, user_id, waiter):
+        with self.lock:
+            if self.pid != os.getpid():
+                self.after_fork()
+            self.waiters.setdefault(user_id, set()).add(waiter)
+            start = not self.polling
+            self.polling = True
+        if start:
+            try:
+                # the events are polled from the last one published now
+                sequence = self.last_sequence()
+                threading.Thread(
+                    target=self.poll, args=(sequence,),
+                    name='change-feed-poller', daemon=True
+                ).start()
+            except Exception:
+                with self.lock:
+                    self.polling = False
+                raise
+
+    def unlisten(self, user_id, waiter):
+        with self.lock:
+            waiters = self.waiters.get(user_id)
+            if waiters is not None:
+                waiters.discard(waiter)
+                if not waiters:
+                    del self.waiters[user_id]
+
+    def poll(self, sequence):
+        # run by the poller thread while clients wait, reads the users
+        # of the events published since the last poll by any process
+        # and wakes their clients, one query per poll_interval
+        try:
+            while True:
+                time.sleep(self.poll_interval)
+                with self.lock:
+                    if not self.waiters:
+                        self.polling = False
+                        return
+                rows = list(ChangeEvent.objects.filter(
+                    id__gt=sequence
+                ).order_by('id').values_list('id', 'user_id'))
+                if rows:
+                    sequence = rows[-1][0]
+                    self.wake({user_id for _, user_id in rows})
+        except Exception:
+            # the next client to wait starts another poller
+            logger.exception('change feed poller failed')
+            with self.lock:
+                self.polling = False
+        finally:
+            connection.close()
+
+
+# change events of the api, this process waits for them
+feed = ChangeFeed(
+    max_events=settings.FEED['MAX_EVENTS'],
+    poll_interval=settings.FEED['POLL_INTERVAL'],
+    max_waiters=settings.FEED['MAX_WAITERS'],
+    retry_after=settings.FEED['RETRY_AFTER'],
+    listen_ttl=settings.FEED['LISTEN_TTL']
+)
+
+
+def purge_expired_events():
+    """
+    Delete the change events older than FEED TTL, a client whose
+    cursor expired is reset, and the users no longer followed
+
+    :return: number of events deleted
+    """
+    now = timezone.now()
+    expires = now - datetime.timedelta(seconds=settings.FEED['TTL'])
+    deleted, _ = ChangeEvent.objects.filter(created_on__lt=expires).delete()
+    FeedListener.objects.filter(until__lte=now).delete()
+    return deleted
+
+
+def followed(users):
+    """
+    Filter the user ids of a membership queryset down to the users
+    whose events are published
+    """
+    return users.filter(user__feedlistener__until__gt=timezone.now())
+
+
+def event(kind, action, object_id, **extra):
+    """
+    Build a change event
+
+    :param kind: 'list' or 'item'
+    :param action: 'created', 'updated' or 'deleted'
+    :param object_id: id of the list or item
+    :param extra: e.g the list_id of an item
+    :return: dict
+    """
+    data = {'type': kind, 'action': action, 'id': object_id}
+    data.update(extra)
+    return data
+
+
+def notify(user_ids, kind, action, object_id, **extra):
+    """
+    Publish a change event once the transaction that made the change
+    commits, nothing is published if it is rolled back, the events
+    are only published to the users followed, see ChangeFeed.follow
+    """
+    data = event(kind, action, object_id, **extra)
+
+    def publish():
+        users = FeedListener.objects.filter(
+            user_id__in=user_ids, until__gt=timezone.now()
+        ).values_list('user_id', flat=True)
+        feed.publish(users, data)
+
+    transaction.on_commit(publish)
+
+
+def notify_members(members, kind, action, object_id, **extra):
+    """
+    Publish a change event to the members of a shared list once the
+    transaction commits, the members are only fetched then
+
+    :param members: ListMembership queryset of the members concerned
+    """
+    data = event(kind, action, object_id, **extra)
+    transaction.on_commit(lambda: feed.publish(
+        followed(members).values_list('user_id', flat=True), data
+    ))
+
+
+def notify_item_members(item_id, action):
+    """
+    Publish a change event of an item to the members of its list once
+    the transaction commits, the members and the id of the list are
+    fetched then in one query
+
+    :param item_id: id of the item
+    :param action: 'created', 'updated' or 'deleted'
+    """
+    members = ListMembership.objects.filter(
+        shopping_list__item__id=item_id
+    )
+
+    def publish():
+        rows = list(followed(members).values_list(
+            'user_id', 'shopping_list_id'
+        ))
+        if rows:
+            feed.publish(
+                [user_id for user_id, _ in rows],
+                event('item', action, item_id, list_id=rows[0][1])
+            )
+
+    transaction.on_commit(publish)
+
+
+class Reserved:
+    """
+    Iterator over the chunks of an event stream that gives the waiting
+    slot it holds back once the server closes the response
+    """
+
+    def __init__(self, change_feed, chunks):
+        self.change_feed = change_feed
+        self.chunks = chunks
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.chunks)
+
+    def close(self):
+        if self.chunks is not None:
+            self.chunks.close()
+            self.chunks = None
+            self.change_feed.release()
+
+
+def stream_changes(user_id, cursor, duration, heartbeat):
+    """
+    Generate the server-sent events of the changes of a user
+
+    The stream ends after duration seconds, browsers reconnect with
+    the Last-Event-ID header set to the last cursor. A comment is
+    sent every heartbeat seconds so that proxies keep it open
+
+    :param user_id: id of the user
+    :param cursor: cursor to resume from, None to start
+    :param duration: seconds the stream is kept open
+    :param heartbeat: seconds between keep-alive comments
+    """
+    deadline = time.monotonic() + duration
+    if cursor is None:
+        cursor = feed.changes(user_id, None).cursor
+    yield 'retry: 1000\nid: {}\n\n'.format(cursor)
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        changes = feed.wait(user_id, cursor, min(heartbeat, remaining))
+        cursor = changes.cursor
+        if changes.reset:
+            yield 'id: {}\nevent: reset\ndata: {{}}\n\n'.format(cursor)
+        elif changes.events:
+            last = len(changes.events) - 1
+            for index, data in enumerate(changes.events):
+                # only the last event moves the cursor, a client that
+                # reconnects in between gets the batch again
+                yield '{}event: change\ndata: {}\n\n'.format(
+                    'id: {}\n'.format(cursor) if index == last else '',
+                    json.dumps(data, default=encode_default)
+                )
+        else:
+            yield ': keep-alive\n\n'
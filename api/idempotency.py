@@ -0,0 +1,126 @@
+import datetime
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.views import status
+
+from api.models import IdempotencyKey
+from api.renderers import FastJSONRenderer
+
+# idempotency keys, a create request sent with an Idempotency-Key
+# header is run once, retries with the same key get the stored
+# response back without running the request again
+
+# request header holding the key
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+
+
+def request_hash(request):
+    """
+    Digest of what a request asks for, a key can not be reused for
+    a different request
+
+    :param request: DRF request
+    :return: sha256 hex digest of the method, path and body
+    """
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256('\n'.join(
+        (request.method, request.path, body)
+    ).encode()).hexdigest()
+
+
+def expires_before():
+    # keys created before this time are expired
+    return timezone.now() - datetime.timedelta(
+        seconds=settings.IDEMPOTENCY['TTL']
+    )
+
+
+def idempotent(handler):
+    """
+    Decorator of the view methods that create objects, the request is
+    run once per Idempotency-Key of a user and its response replayed
+    to the retries
+
+    The key is stored in the transaction of the request, so either the
+    object and the key are both committed or neither is. Only
+    successful responses are stored, a failed request can be retried
+    with the same key
+    """
+    @functools.wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        key = request.META.get(HEADER)
+        if key is None:
+            return handler(view, request, *args, **kwargs)
+        if not key or len(key) > 255:
+            return Response(
+                {'detail': 'Idempotency-Key must be 1 to 255 characters.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        digest = request_hash(request)
+        stored = IdempotencyKey.objects.filter(
+            user=request.user, key=key
+        ).values('id', 'request_hash', 'status_code', 'response',
+                 'created_on').first()
+        if stored is not None and stored['created_on'] < expires_before():
+            # expired but not purged yet, the key can be used again
+            IdempotencyKey.objects.filter(id=stored['id']).delete()
+            stored = None
+        if stored is not None:
+            if stored['request_hash'] != digest:
+                return Response(
+                    {'detail': 'Idempotency-Key was used for another '
+                               'request.'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            return Response(
+                json.loads(stored['response']) if stored['response']
+                else None,
+                status=stored['status_code'],
+                headers={'Idempotent-Replayed': 'true'}
+            )
+
+        storing = False
+        try:
+            with transaction.atomic():
+                response = handler(view, request, *args, **kwargs)
+                if not status.is_success(response.status_code):
+                    return response
+                storing = True
+                IdempotencyKey.objects.create(
+                    user=request.user,
+                    key=key,
+                    request_hash=digest,
+                    status_code=response.status_code,
+                    response=FastJSONRenderer().render(
+                        response.data).decode()
+                )
+        except IntegrityError:
+            if not storing:
+                raise
+            # a concurrent request with the same key was committed
+            # first, this one is rolled back and can be retried
+            return Response(
+                {'detail': 'A request with this Idempotency-Key is in '
+                           'progress.'},
+                status=status.HTTP_409_CONFLICT
+            )
+        return response
+    return wrapper
+
+
+def purge_expired_keys():
+    """
+    Delete the expired idempotency keys
+
+    :return: number of keys deleted
+    """
+    deleted, _ = IdempotencyKey.objects.filter(
+        created_on__lt=expires_before()
+    ).delete()
+    return deleted
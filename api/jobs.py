@@ -0,0 +1,228 @@
+import concurrent.futures
+import datetime
+import json
+import logging
+import time
+import traceback
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from api.models import Job
+
+# database backed job queue, views enqueue calls of task functions
+# and the run_worker command runs them outside of the request
+
+logger = logging.getLogger('api.jobs')
+
+
+def task(func):
+    """
+    Decorator that lets a function be enqueued as a job, its
+    arguments must be json serializable
+    """
+    func.is_job_task = True
+    func.task_name = '{}.{}'.format(func.__module__, func.__qualname__)
+    return func
+
+
+def enqueue(func, *args, **kwargs):
+    """
+    Queue a call of a task function, the job is committed with the
+    transaction that enqueues it
+
+    :param func: a function decorated with task
+    :param args: positional arguments of the call
+    :param kwargs: keyword arguments of the call
+    :return: the queued job
+    """
+    if not getattr(func, 'is_job_task', False):
+        raise ValueError('{!r} is not a task'.format(func))
+    return Job.objects.create(
+        task=func.task_name,
+        args=json.dumps(args),
+        kwargs=json.dumps(kwargs),
+        max_attempts=settings.JOBS['MAX_ATTEMPTS'],
+        run_after=timezone.now()
+    )
+
+
+def claim(limit, visibility_timeout):
+    """
+    Claim up to limit jobs that are due, including running jobs
+    whose visibility timeout expired because their worker died
+
+    Every job is claimed with a conditional UPDATE so that two
+    workers never claim the same job, on any database
+
+    :param limit: maximum number of jobs to claim
+    :param visibility_timeout: seconds a claimed job is hidden
+        from the other workers
+    :return: ids of the claimed jobs
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(
+        status__in=(Job.QUEUED, Job.RUNNING), run_after__lte=now
+    ).order_by('run_after', 'id').values(
+        'id', 'status', 'run_after', 'attempts', 'max_attempts'
+    )[:limit]
+    claimed = []
+    for job in candidates:
+        unchanged = Job.objects.filter(
+            id=job['id'], status=job['status'], run_after=job['run_after']
+        )
+        if job['attempts'] >= job['max_attempts']:
+            # the last attempt timed out
+            unchanged.update(
+                status=Job.FAILED, last_error='visibility timeout expired',
+                updated_on=now
+            )
+            continue
+        if unchanged.update(
+                status=Job.RUNNING, attempts=job['attempts'] + 1,
+                run_after=now + datetime.timedelta(
+                    seconds=visibility_timeout),
+                updated_on=now):
+            claimed.append(job['id'])
+    return claimed
+
+
+def claimed(job):
+    # the job while it is still claimed by this run, a run that
+    # outlived its visibility timeout must not change the job once
+    # another worker claimed it again
+    return Job.objects.filter(
+        id=job.id, status=Job.RUNNING, attempts=job.attempts
+    )
+
+
+def execute(job_id):
+    """
+    Run a claimed job, a finished job is deleted and a failed job
+    is queued again after a delay or failed for good once it used
+    up its attempts
+
+    :param job_id: id of a claimed job
+    :return: True if the job finished
+    """
+    try:
+        job = Job.objects.get(id=job_id)
+    except Job.DoesNotExist:
+        return False
+    try:
+        func = import_string(job.task)
+        if not getattr(func, 'is_job_task', False):
+            # only run what was enqueued with enqueue()
+            raise ValueError('{} is not a task'.format(job.task))
+    except (ImportError, ValueError):
+        fail(job, traceback.format_exc(), retry=False)
+        return False
+    try:
+        func(*json.loads(job.args), **json.loads(job.kwargs))
+    except Exception:
+        logger.exception('job %s %s failed', job.id, job.task)
+        fail(job, traceback.format_exc())
+        return False
+    claimed(job).delete()
+    return True
+
+
+def fail(job, error, retry=True):
+    """
+    Record a failed attempt of a job
+
+    :param job: the job that failed
+    :param error: the error of the attempt
+    :param retry: False to fail the job without retrying it
+    """
+    now = timezone.now()
+    if retry and job.attempts < job.max_attempts:
+        # back off exponentially between attempts
+        delay = settings.JOBS['RETRY_DELAY'] * 2 ** (job.attempts - 1)
+        status = Job.QUEUED
+        run_after = now + datetime.timedelta(seconds=delay)
+    else:
+        status = Job.FAILED
+        run_after = job.run_after
+    claimed(job).update(
+        status=status, run_after=run_after, last_error=error, updated_on=now
+    )
+
+
+def run_in_child(job_id):
+    # entry point of the pool processes
+    close_old_connections()
+    try:
+        return execute(job_id)
+    finally:
+        close_old_connections()
+
+
+class Worker:
+    """
+    Claims due jobs and runs them, in this process or in a pool of
+    processes
+    """
+
+    def __init__(self, processes=0, batch_size=None, visibility_timeout=None):
+        self.processes = processes
+        self.batch_size = batch_size or max(processes, 1)
+        self.visibility_timeout = \
+            visibility_timeout or settings.JOBS['VISIBILITY_TIMEOUT']
+        self.pool = None
+        self.stopping = False
+
+    def start(self):
+        if self.processes and self.pool is None:
+            # the processes must not inherit open database connections,
+            # close them and fork the processes with a no-op call
+            connections.close_all()
+            self.pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.processes
+            )
+            self.pool.submit(int).result()
+
+    def stop(self):
+        self.stopping = True
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+
+    def run_once(self):
+        """
+        Claim and run one batch of jobs
+
+        :return: number of jobs run
+        """
+        job_ids = claim(self.batch_size, self.visibility_timeout)
+        if not job_ids:
+            return 0
+        if self.pool is None:
+            for job_id in job_ids:
+                execute(job_id)
+        else:
+            futures = [
+                self.pool.submit(run_in_child, job_id) for job_id in job_ids
+            ]
+            for future, job_id in zip(futures, job_ids):
+                try:
+                    future.result()
+                except Exception:
+                    # the visibility timeout brings the job back
+                    logger.exception('worker process failed job %s', job_id)
+        return len(job_ids)
+
+    def run(self, poll_interval=1.0):
+        """
+        Run jobs until stop is called, waiting poll_interval
+        seconds whenever the queue is empty
+        """
+        self.start()
+        try:
+            while not self.stopping:
+                if not self.run_once():
+                    time.sleep(poll_interval)
+        finally:
+            self.stop()
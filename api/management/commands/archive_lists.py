@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api import archive
+
+
+class Command(BaseCommand):
+    """
+    Archive the shopping lists that were not changed for a number of
+    days, run it periodically e.g from cron
+
+    usage:
+        python manage.py archive_lists --days 180
+    """
+    help = 'Archive the shopping lists that were not used for a while'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='days without changes before a list is '
+                                 'archived, defaults to ARCHIVE AFTER_DAYS')
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+        archived = 0
+        # every list is moved in its own short transaction
+        for list_id in list(archive.inactive_lists(options['days'])):
+            if archive.archive_list(list_id):
+                archived += 1
+        self.stdout.write('archived {} lists'.format(archived))
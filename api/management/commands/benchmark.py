@@ -0,0 +1,125 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api import benchmark
+
+
+class Command(BaseCommand):
+    """
+    Load test every api route through the WSGI app
+
+    By default the data is seeded into a throwaway test database
+    that is destroyed when the benchmark is done
+
+    usage:
+        python manage.py benchmark --requests 200 --clients 8
+        python manage.py benchmark --output benchmarks/baseline.json
+        python manage.py benchmark --baseline benchmarks/baseline.json
+        python manage.py benchmark --clients 32 --serving both
+        python manage.py benchmark --use-existing-db \\
+            --url http://127.0.0.1:8000
+    """
+    help = 'Benchmark the throughput and latency of the api routes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10,
+                            help='number of users to seed')
+        parser.add_argument('--lists', type=int, default=5,
+                            help='number of shopping lists per user')
+        parser.add_argument('--items', type=int, default=20,
+                            help='number of items per shopping list')
+        parser.add_argument('--requests', type=int, default=100,
+                            help='number of requests per route')
+        parser.add_argument('--clients', type=int, default=4,
+                            help='number of concurrent clients')
+        parser.add_argument('--routes', nargs='*',
+                            help='names of the routes to benchmark')
+        parser.add_argument('--output',
+                            help='write the results to this json file')
+        parser.add_argument('--baseline',
+                            help='compare the results with this json file')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='allowed relative slow down, '
+                                 'defaults to 0.2')
+        parser.add_argument('--serving', default='threaded',
+                            choices=benchmark.SERVING_MODES + ('both',),
+                            help='serve the clients in parallel threads, '
+                                 'one at a time like a sync worker, or '
+                                 'compare both, defaults to threaded')
+        parser.add_argument('--url',
+                            help='benchmark the server running at this '
+                                 'url instead of calling the WSGI app '
+                                 'in-process, it must use the configured '
+                                 'database, see --use-existing-db')
+        parser.add_argument('--use-existing-db', action='store_true',
+                            help='seed the configured database instead '
+                                 'of a throwaway test database')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('--users must be at least 1')
+        if options['clients'] < 1:
+            raise CommandError('--clients must be at least 1')
+        if options['url'] and not options['use_existing_db']:
+            raise CommandError(
+                '--url needs --use-existing-db, the server can not see '
+                'data seeded into a throwaway database'
+            )
+        old_name = None
+        if not options['use_existing_db']:
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False
+            )
+        serving = benchmark.SERVING_MODES \
+            if options['serving'] == 'both' else (options['serving'],)
+        runs = {}
+        try:
+            for mode in serving:
+                runs[mode] = benchmark.run(
+                    users=options['users'],
+                    lists=options['lists'],
+                    items=options['items'],
+                    requests=options['requests'],
+                    clients=options['clients'],
+                    routes=options['routes'],
+                    application=benchmark.RemoteApplication(
+                        options['url']) if options['url'] else None,
+                    serving=mode
+                )
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        for mode, mode_results in runs.items():
+            self.stdout.write('{} serving'.format(mode))
+            self.stdout.write(benchmark.format_table(mode_results))
+        if len(runs) > 1:
+            self.stdout.write('sync vs threaded serving')
+            self.stdout.write(benchmark.format_table(
+                benchmark.compare_serving(runs['sync'], runs['threaded']),
+                columns=(
+                    'route', 'sync_req_per_sec', 'threaded_req_per_sec',
+                    'sync_p95_ms', 'threaded_p95_ms', 'speedup'
+                )
+            ))
+        # the output and the baseline are for the first serving mode
+        results = runs[serving[0]]
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+                output.write('\n')
+
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                regressions = benchmark.compare(
+                    results, json.load(baseline), options['tolerance']
+                )
+            if regressions:
+                raise CommandError(
+                    'performance regressions:\n' + '\n'.join(regressions)
+                )
+            self.stdout.write('no regressions against the baseline')
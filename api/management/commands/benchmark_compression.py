@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api import benchmark
+
+
+class Command(BaseCommand):
+    """
+    Compare the response encodings on an item list payload
+
+    brotli and zstandard are only benchmarked when the brotli and
+    zstandard packages are installed
+
+    usage:
+        python manage.py benchmark_compression --items 1000 --repeat 20
+    """
+    help = 'Benchmark compressing item lists per encoding'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=1000,
+                            help='number of items in the payload')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='number of times each encoding is timed')
+
+    def handle(self, *args, **options):
+        if options['items'] < 1:
+            raise CommandError('--items must be at least 1')
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+        results = benchmark.run_compression(
+            options['items'], options['repeat']
+        )
+        self.stdout.write(benchmark.format_table(results, columns=(
+            'encoding', 'level', 'content_bytes', 'bytes', 'compress_ms',
+            'cached_ms'
+        )))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api import benchmark
+
+
+class Command(BaseCommand):
+    """
+    Compare the renderers and parsers on an item list payload
+
+    The optional codecs are only benchmarked when orjson and
+    msgpack are installed
+
+    usage:
+        python manage.py benchmark_renderers --items 1000 --repeat 50
+    """
+    help = 'Benchmark rendering and parsing item lists per codec'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=1000,
+                            help='number of items in the payload')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='number of times each codec is timed')
+
+    def handle(self, *args, **options):
+        if options['items'] < 1:
+            raise CommandError('--items must be at least 1')
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+        results = benchmark.run_codecs(options['items'], options['repeat'])
+        self.stdout.write(benchmark.format_table(results, columns=(
+            'codec', 'items', 'bytes', 'render_ms', 'parse_ms'
+        )))
@@ -0,0 +1,75 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+import api
+from api import benchmark
+
+
+class Command(BaseCommand):
+    """
+    Measure the cold start of the settings profiles
+
+    Every run starts a fresh python process that loads django and
+    serves one request, see api/startup.py
+
+    usage:
+        python manage.py benchmark_startup --runs 10
+        python manage.py benchmark_startup --profiles config.settings_api
+    """
+    help = 'Benchmark the start up time of the settings profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5,
+                            help='number of processes started per profile')
+        parser.add_argument('--profiles', nargs='*',
+                            default=['config.settings', 'config.settings_api'],
+                            help='settings modules to compare')
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1:
+            raise CommandError('--runs must be at least 1')
+        rows = []
+        for profile in options['profiles']:
+            samples = [self.start(profile) for _ in range(options['runs'])]
+            row = {'profile': profile, 'modules': samples[-1]['modules']}
+            for key in ('process_ms', 'setup_ms', 'first_request_ms'):
+                row[key] = round(benchmark.percentile(
+                    [sample[key] for sample in samples], 50), 3)
+            rows.append(row)
+        self.stdout.write('median of {} runs'.format(options['runs']))
+        self.stdout.write(benchmark.format_table(rows, columns=(
+            'profile', 'process_ms', 'setup_ms', 'first_request_ms',
+            'modules'
+        )))
+
+    @staticmethod
+    def start(profile):
+        """
+        Start a process with the settings profile and time it
+
+        :param profile: settings module
+        :return: dict with the timings of the process
+        """
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=profile)
+        started = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, '-m', 'api.startup'],
+            # the project root, so that api.startup can be imported
+            cwd=os.path.dirname(os.path.dirname(api.__file__)),
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+        elapsed = time.perf_counter() - started
+        if process.returncode != 0:
+            raise CommandError('{} failed to start:\n{}'.format(
+                profile, process.stderr.decode()))
+        sample = json.loads(process.stdout.decode())
+        # includes starting the interpreter
+        sample['process_ms'] = round(elapsed * 1000, 3)
+        return sample
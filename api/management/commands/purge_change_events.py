@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from api import feed
+
+
+class Command(BaseCommand):
+    """
+    Delete the change events older than FEED TTL, run it
+    periodically e.g from cron
+
+    usage:
+        python manage.py purge_change_events
+    """
+    help = 'Delete the expired change events'
+
+    def handle(self, *args, **options):
+        deleted = feed.purge_expired_events()
+        self.stdout.write('deleted {} expired events'.format(deleted))
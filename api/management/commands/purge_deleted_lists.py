@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api import purge
+from api.models import ShoppingList
+
+
+class Command(BaseCommand):
+    """
+    Purge the shopping lists that were deleted but still hold items,
+    e.g because the server stopped before the background purge
+    finished
+
+    usage:
+        python manage.py purge_deleted_lists --batch-size 500
+    """
+    help = 'Delete the items of deleted shopping lists and the lists'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='number of items deleted per statement, '
+                                 'defaults to LIST_PURGE BATCH_SIZE')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        list_ids = ShoppingList.objects.filter(
+            deleted_on__isnull=False
+        ).values_list('id', flat=True)
+        for list_id in list_ids:
+            items = purge.purge_shopping_list(list_id, options['batch_size'])
+            self.stdout.write(
+                'purged list {} and its {} items'.format(list_id, items)
+            )
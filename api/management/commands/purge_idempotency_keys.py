@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from api import idempotency
+
+
+class Command(BaseCommand):
+    """
+    Delete the idempotency keys older than IDEMPOTENCY TTL, run it
+    periodically e.g from cron
+
+    usage:
+        python manage.py purge_idempotency_keys
+    """
+    help = 'Delete the expired idempotency keys'
+
+    def handle(self, *args, **options):
+        deleted = idempotency.purge_expired_keys()
+        self.stdout.write('deleted {} expired keys'.format(deleted))
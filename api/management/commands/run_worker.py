@@ -0,0 +1,62 @@
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import jobs
+
+
+class Command(BaseCommand):
+    """
+    Run the background jobs queued in the database
+
+    usage:
+        python manage.py run_worker --processes 4
+        python manage.py run_worker --once
+    """
+    help = 'Run the queued background jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2,
+                            help='number of processes running jobs, 0 '
+                                 'runs them in this process')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='number of jobs claimed at a time, '
+                                 'defaults to the number of processes')
+        parser.add_argument('--visibility-timeout', type=int, default=None,
+                            help='seconds a running job is hidden from '
+                                 'the other workers, defaults to JOBS '
+                                 'VISIBILITY_TIMEOUT')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='run the due jobs and exit')
+
+    def handle(self, *args, **options):
+        if options['processes'] < 0:
+            raise CommandError('--processes can not be negative')
+        worker = jobs.Worker(
+            processes=options['processes'],
+            batch_size=options['batch_size'],
+            visibility_timeout=options['visibility_timeout']
+        )
+        if options['once']:
+            worker.start()
+            try:
+                total = 0
+                while True:
+                    count = worker.run_once()
+                    if not count:
+                        break
+                    total += count
+            finally:
+                worker.stop()
+            self.stdout.write('ran {} jobs'.format(total))
+            return
+
+        def stop(signum, frame):
+            # finish the running jobs, then exit
+            worker.stopping = True
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        worker.run(poll_interval=options['poll_interval'])
@@ -0,0 +1,215 @@
+import threading
+import time
+
+# in-process request metrics, aggregated as prometheus histograms
+
+# upper bounds of the buckets of the duration histograms, in seconds
+DURATION_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+# upper bounds of the buckets of the query count histograms
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# timings of the request being handled by the current thread
+_local = threading.local()
+
+
+class Histogram:
+    """
+    A prometheus style histogram with cumulative buckets
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """
+    Thread safe collection of histograms, keyed by metric
+    name and label values
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def observe(self, name, help_text, buckets, labels, value):
+        """
+        Record a value in a histogram
+
+        :param name: metric name
+        :param help_text: description of the metric
+        :param buckets: upper bounds of the histogram buckets
+        :param labels: tuple of (label, value) pairs
+        :param value: the observed value
+        """
+        with self.lock:
+            help_text, histograms = self.metrics.setdefault(
+                name, (help_text, {})
+            )
+            histogram = histograms.get(labels)
+            if histogram is None:
+                histogram = histograms[labels] = Histogram(buckets)
+            histogram.observe(value)
+
+    def clear(self):
+        with self.lock:
+            self.metrics = {}
+
+    def exposition(self):
+        """
+        Return the metrics in the prometheus text exposition format
+        """
+        lines = []
+        with self.lock:
+            for name in sorted(self.metrics):
+                help_text, histograms = self.metrics[name]
+                lines.append('# HELP {} {}'.format(name, help_text))
+                lines.append('# TYPE {} histogram'.format(name))
+                for labels in sorted(histograms):
+                    histogram = histograms[labels]
+                    label_text = ','.join(
+                        '{}="{}"'.format(key, escape(value))
+                        for key, value in labels
+                    )
+                    for bound, count in zip(histogram.buckets,
+                                            histogram.counts):
+                        lines.append('{}_bucket{{{},le="{}"}} {}'.format(
+                            name, label_text, float(bound), count
+                        ))
+                    lines.append('{}_bucket{{{},le="+Inf"}} {}'.format(
+                        name, label_text, histogram.count
+                    ))
+                    lines.append('{}_sum{{{}}} {}'.format(
+                        name, label_text, histogram.sum
+                    ))
+                    lines.append('{}_count{{{}}} {}'.format(
+                        name, label_text, histogram.count
+                    ))
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value):
+    """
+    Escape a label value for the exposition format
+    """
+    return str(value).replace('\\', '\\\\').replace(
+        '"', '\\"').replace('\n', '\\n')
+
+
+# metrics of this process
+registry = Registry()
+
+
+class RequestTimings:
+    """
+    Time spent in each phase of handling a request, in seconds
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view = 'unresolved'
+        self.db = 0.0
+        self.queries = 0
+        self.serialize = 0.0
+        self.render = 0.0
+        self.total = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # database execute wrapper timing every query
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    @property
+    def app(self):
+        # time not accounted for by the other phases
+        return max(self.total - self.db - self.serialize - self.render, 0.0)
+
+
+def start_request():
+    """
+    Start timing the request handled by the current thread
+    """
+    _local.timings = RequestTimings()
+    return _local.timings
+
+
+def end_request():
+    """
+    Stop timing the request handled by the current thread
+    """
+    timings = current_request()
+    _local.timings = None
+    if timings is not None:
+        timings.finish()
+    return timings
+
+
+def current_request():
+    """
+    Return the timings of the request handled by the current thread
+    or None when no request is being timed
+    """
+    return getattr(_local, 'timings', None)
+
+
+class timer:
+    """
+    Context manager that adds the time spent in its block to
+    a phase of the current request, e.g
+
+        with timer('serialize'):
+            data = serializer.data
+    """
+
+    def __init__(self, phase):
+        self.phase = phase
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        timings = current_request()
+        if timings is not None:
+            setattr(timings, self.phase, getattr(timings, self.phase)
+                    + time.perf_counter() - self.started)
+
+
+def record(timings):
+    """
+    Aggregate the timings of a finished request in the registry
+    """
+    for phase in ('total', 'app', 'db', 'serialize', 'render'):
+        registry.observe(
+            'api_request_duration_seconds',
+            'Time spent handling requests, by view and phase',
+            DURATION_BUCKETS,
+            (('view', timings.view), ('phase', phase)),
+            getattr(timings, phase)
+        )
+    registry.observe(
+        'api_request_queries',
+        'Number of SQL queries run per request, by view',
+        QUERY_BUCKETS,
+        (('view', timings.view),),
+        timings.queries
+    )
@@ -0,0 +1,178 @@
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.utils.cache import patch_vary_headers
+
+from api import compression, metrics, slow_queries
+
+logger = logging.getLogger('api.performance')
+
+
+def server_timing(timings):
+    """
+    Format request timings as a Server-Timing header value
+
+    :param timings: metrics.RequestTimings
+    :return: str
+    """
+    return ', '.join([
+        'app;dur={:.3f}'.format(timings.app * 1000),
+        'db;desc="{} queries";dur={:.3f}'.format(
+            timings.queries, timings.db * 1000),
+        'serialize;dur={:.3f}'.format(timings.serialize * 1000),
+        'render;dur={:.3f}'.format(timings.render * 1000),
+        'total;dur={:.3f}'.format(timings.total * 1000),
+    ])
+
+
+class PerformanceMiddleware:
+    """
+    Middleware that times every request
+
+    The time spent in the database, serializing and rendering is
+    recorded per view, sent back in a Server-Timing header, logged
+    to the api.performance logger and aggregated in the histograms
+    served by the /metrics/ endpoint
+
+    It should be the first middleware so that the total time covers
+    all the other middleware
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = metrics.start_request()
+        try:
+            with connection.execute_wrapper(timings):
+                response = self.get_response(request)
+        finally:
+            metrics.end_request()
+        metrics.record(timings)
+        response['Server-Timing'] = server_timing(timings)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                'view': timings.view,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'total_ms': round(timings.total * 1000, 3),
+                'db_ms': round(timings.db * 1000, 3),
+                'queries': timings.queries,
+                'serialize_ms': round(timings.serialize * 1000, 3),
+                'render_ms': round(timings.render * 1000, 3),
+            }))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = metrics.current_request()
+        if timings is not None:
+            timings.view = request.resolver_match.view_name \
+                or view_func.__name__
+
+    def process_template_response(self, request, response):
+        # this middleware is the last to see the response before
+        # it is rendered, time from here until rendering is done
+        timings = metrics.current_request()
+        if timings is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                timings.render += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+
+class SlowQueryMiddleware:
+    """
+    Middleware that records the SQL statements slower than
+    SLOW_QUERY_LOG['THRESHOLD_MS'] with the view that ran them and
+    their query plan
+
+    It is opt-in, it is removed from the middleware chain unless
+    SLOW_QUERY_LOG['ENABLED'] is set
+    """
+
+    def __init__(self, get_response):
+        options = getattr(settings, 'SLOW_QUERY_LOG', {})
+        if not options.get('ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = options.get('THRESHOLD_MS', 100) / 1000.0
+        self.capture_plan = options.get('EXPLAIN', True)
+        slow_queries.log.resize(options.get('MAX_ENTRIES', 100))
+
+    def __call__(self, request):
+        recorder = slow_queries.SlowQueryRecorder(
+            self.threshold, self.capture_plan
+        )
+        request.slow_query_recorder = recorder
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        # the plans are fetched once the request is over, outside of
+        # the wrapper so that the EXPLAIN statements are not recorded
+        recorder.flush()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.slow_query_recorder.view = \
+            request.resolver_match.view_name or view_func.__name__
+
+
+class CompressionMiddleware:
+    """
+    Middleware that compresses responses with the best encoding
+    the client accepts among gzip, br and zstd
+
+    Responses smaller than COMPRESSION['MIN_SIZE'] are sent as they
+    are, and the bodies compressed with the encodings listed in
+    COMPRESSION['CACHE'] are cached so that responses with the same
+    content are only compressed once
+
+    It must come before the middleware that set the response body,
+    e.g CommonMiddleware
+    """
+
+    def __init__(self, get_response):
+        options = getattr(settings, 'COMPRESSION', {})
+        if not options.get('ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.min_size = options.get('MIN_SIZE', 1024)
+        self.encodings = options.get('ENCODINGS', ('gzip',))
+        self.levels = options.get('LEVELS', {})
+        self.types = tuple(options.get('TYPES', ('application/json',)))
+        self.cached_encodings = options.get('CACHE', ())
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.streaming or response.has_header('Content-Encoding') \
+                or len(response.content) < self.min_size \
+                or not response.get('Content-Type', '').startswith(
+                    self.types):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = compression.negotiate(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''), self.encodings
+        )
+        if encoding is None:
+            return response
+        body = compression.compress(
+            response.content, encoding, self.levels.get(encoding, 6),
+            encoding in self.cached_encodings
+        )
+        if len(body) >= len(response.content):
+            return response
+        response.content = body
+        response['Content-Length'] = str(len(body))
+        response['Content-Encoding'] = encoding
+        # the compressed body is not byte for byte the same
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
@@ -0,0 +1,18 @@
+# Generated by Django 2.0.13 on 2026-10-19 13:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_item_bought'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='deleted_on',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
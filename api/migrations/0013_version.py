@@ -0,0 +1,23 @@
+# Generated by Django 2.0.13 on 2026-10-19 14:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
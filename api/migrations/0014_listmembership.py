@@ -0,0 +1,47 @@
+# Generated by Django 2.0.13 on 2026-10-19 14:28
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def add_owners(apps, schema_editor):
+    # the creators of the existing lists become their owners
+    ShoppingList = apps.get_model('api', 'ShoppingList')
+    ListMembership = apps.get_model('api', 'ListMembership')
+    lists = ShoppingList.objects.values_list('id', 'user_id').iterator()
+    batch = []
+    for list_id, user_id in lists:
+        batch.append(ListMembership(
+            shopping_list_id=list_id, user_id=user_id, role='owner'
+        ))
+        if len(batch) == 1000:
+            ListMembership.objects.bulk_create(batch)
+            batch = []
+    ListMembership.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0013_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListMembership',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('owner', 'owner'), ('editor', 'editor'), ('viewer', 'viewer')], default='editor', max_length=10)),
+                ('created_on', models.DateTimeField(auto_now_add=True)),
+                ('shopping_list', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='api.ShoppingList')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='listmembership',
+            unique_together={('user', 'shopping_list')},
+        ),
+        migrations.RunPython(add_owners, migrations.RunPython.noop),
+    ]
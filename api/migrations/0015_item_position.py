@@ -0,0 +1,29 @@
+# Generated by Django 2.0.13 on 2026-10-19 14:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_listmembership'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='position',
+            field=models.CharField(default='', max_length=64),
+        ),
+        # the new index replaces the index on the_list_id
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['the_list', 'position'], name='api_item_the_lis_033cd0_idx'),
+        ),
+        migrations.AlterField(
+            model_name='item',
+            name='the_list',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='api.ShoppingList'),
+        ),
+    ]
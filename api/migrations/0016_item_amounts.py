@@ -0,0 +1,28 @@
+# Generated by Django 2.0.13 on 2026-10-19 14:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_item_position'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='price',
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='quantity',
+            field=models.DecimalField(decimal_places=3, default=1, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='unit',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+    ]
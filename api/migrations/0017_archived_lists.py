@@ -0,0 +1,44 @@
+# Generated by Django 2.0.13 on 2026-10-19 14:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_item_amounts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedItem',
+            fields=[
+                ('name', models.CharField(max_length=255)),
+                ('description', models.CharField(max_length=255, null=True)),
+                ('bought', models.BooleanField(default=False)),
+                ('created_on', models.DateTimeField(auto_now_add=True)),
+                ('updated_on', models.DateTimeField(auto_now=True)),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('position', models.CharField(default='', max_length=64)),
+                ('quantity', models.DecimalField(decimal_places=3, default=1, max_digits=10)),
+                ('unit', models.CharField(blank=True, default='', max_length=20)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='archived_on',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='archiveditem',
+            name='the_list',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='api.ShoppingList'),
+        ),
+        migrations.AddIndex(
+            model_name='archiveditem',
+            index=models.Index(fields=['the_list'], name='api_archive_the_lis_01b03f_idx'),
+        ),
+    ]
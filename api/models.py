@@ -1,4 +1,16 @@
 from django.db import models
+from django.db.models import (
+    Count,
+    ExpressionWrapper,
+    F,
+    IntegerField,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value
+)
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 
 # Create your models here.
@@ -22,12 +34,95 @@ class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
 
 
+# decimal type of the item costs and list totals
+COST_FIELD = models.DecimalField(max_digits=20, decimal_places=5)
+
+
+def item_totals(prefix=''):
+    """
+    Aggregates of the number of items and of their cost, the cost of
+    an item is its quantity times its price
+
+    :param prefix: path to the items from the model queried
+    :return: dict of aggregate expressions
+    """
+    cost = ExpressionWrapper(
+        F(prefix + 'quantity') * F(prefix + 'price'),
+        output_field=COST_FIELD
+    )
+    return {
+        'item_count': Count(prefix + 'id'),
+        'total': Coalesce(Sum(cost), Value(0), output_field=COST_FIELD),
+        'bought_total': Coalesce(
+            Sum(cost, filter=Q(**{prefix + 'bought': True})), Value(0),
+            output_field=COST_FIELD
+        ),
+    }
+
+
+def list_item_totals(item_models):
+    """
+    Totals of the items of a list summed over several item models,
+    every model is aggregated in its own subquery on its list index so
+    that the item tables are not joined together
+
+    :param item_models: item models with a the_list foreign key
+    :return: dict of expressions of the totals
+    """
+    totals = {}
+    for name, aggregate in item_totals().items():
+        output_field = IntegerField() if name == 'item_count' else COST_FIELD
+        parts = [
+            Coalesce(Subquery(
+                model.objects.filter(the_list_id=OuterRef('pk')).order_by(
+                ).values('the_list_id').annotate(
+                    **{name: aggregate}
+                ).values(name),
+                output_field=output_field
+            ), Value(0), output_field=output_field)
+            for model in item_models
+        ]
+        total = parts[0]
+        for part in parts[1:]:
+            total = ExpressionWrapper(total + part, output_field=output_field)
+        totals[name] = total
+    return totals
+
+
+class ShoppingListQuerySet(models.QuerySet):
+    """
+    Query set of shopping lists
+    """
+
+    def accessible_by(self, user, roles=None, include_archived=False):
+        # lists the user is a member of, with one of the roles when
+        # given, in one join on the membership index, leaving out
+        # deleted lists whose items are still being purged and the
+        # archived lists unless they are included
+        filters = {'memberships__user': user, 'deleted_on__isnull': True}
+        if not include_archived:
+            filters['archived_on__isnull'] = True
+        if roles is not None:
+            filters['memberships__role__in'] = roles
+        return self.filter(**filters)
+
+    def with_totals(self, include_archived=False):
+        # number of items and cost of every list, computed in the
+        # same query with the items joined on their list index
+        if not include_archived:
+            return self.annotate(**item_totals('item__'))
+        # the items of an archived list are archived items, both are
+        # summed in subqueries rather than joined, which would count
+        # every item of one table once per item of the other
+        return self.annotate(**list_item_totals((Item, ArchivedItem)))
+
+
 class ShoppingList(models.Model):
     """
     Shopping List model
     """
     # explicitly set default manager
-    objects = models.Manager()
+    objects = ShoppingListQuerySet.as_manager()
     # shopping list name
     name = models.CharField(max_length=255)
     # short description about the list
@@ -36,16 +131,83 @@ class ShoppingList(models.Model):
     created_on = models.DateTimeField(auto_now_add=True)
     # when the shopping list was last updated
     updated_on = models.DateTimeField(auto_now=True)
-    # owner of the list
+    # user that created the list, its first owner, the users
+    # that can access the list are its members
     user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # when the list was deleted, set while its items are
+    # purged in the background
+    deleted_on = models.DateTimeField(null=True)
+    # when the list was archived, its items are then in the
+    # archived item table
+    archived_on = models.DateTimeField(null=True)
+    # incremented by every update, sent as the ETag of the list
+    # and checked against If-Match
+    version = models.PositiveIntegerField(default=1)
 
 
-class Item(models.Model):
+class ListMembership(models.Model):
     """
-    Shopping List Items model
+    Shopping list membership model
+    A user that can access a shared shopping list, and what they can
+    do with it
     """
+    OWNER = 'owner'
+    EDITOR = 'editor'
+    VIEWER = 'viewer'
+    ROLES = (
+        (OWNER, 'owner'),
+        (EDITOR, 'editor'),
+        (VIEWER, 'viewer'),
+    )
+    # roles that can change the list and its items
+    EDITORS = (OWNER, EDITOR)
+
     # explicitly set default manager
     objects = models.Manager()
+    # member, indexed with the list below
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    # the shared list
+    shopping_list = models.ForeignKey(
+        ShoppingList, on_delete=models.CASCADE, related_name='memberships'
+    )
+    # owners manage the members and delete the list, editors change
+    # the list and its items, viewers only read them
+    role = models.CharField(max_length=10, choices=ROLES, default=EDITOR)
+    # when the user became a member
+    created_on = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        # every list and item query joins on (user_id, shopping_list_id)
+        unique_together = ('user', 'shopping_list')
+
+
+class ItemQuerySet(models.QuerySet):
+    """
+    Query set of shopping list items
+    """
+
+    def accessible_by(self, user, roles=None):
+        # items on the lists the user is a member of, with one of the
+        # roles when given, the membership is checked with a join in
+        # the same query
+        filters = {
+            'the_list__memberships__user': user,
+            'the_list__deleted_on__isnull': True
+        }
+        if roles is not None:
+            filters['the_list__memberships__role__in'] = roles
+        return self.filter(**filters)
+
+    def totals(self):
+        # number and cost of the items in one aggregate query
+        return self.aggregate(**item_totals())
+
+
+class ItemFields(models.Model):
+    """
+    Columns of the shopping list items, shared by the items of the
+    active lists and the items of the archived lists
+    """
     # shopping list item name
     name = models.CharField(max_length=255)
     # short description about the item
@@ -56,5 +218,154 @@ class Item(models.Model):
     created_on = models.DateTimeField(auto_now_add=True)
     # when the item was last updated
     updated_on = models.DateTimeField(auto_now=True)
-    # list the item belongs to
-    the_list = models.ForeignKey(ShoppingList, on_delete=models.CASCADE)
+    # list the item belongs to, indexed with the position below
+    the_list = models.ForeignKey(
+        ShoppingList, on_delete=models.CASCADE, db_index=False
+    )
+    # incremented by every update, sent as the ETag of the item
+    # and checked against If-Match
+    version = models.PositiveIntegerField(default=1)
+    # rank of the item in its list, see api.ranking, items created
+    # before positions existed share the empty rank
+    position = models.CharField(max_length=64, default='')
+    # how much of the item to buy, in its unit, e.g 1.5 kg
+    quantity = models.DecimalField(max_digits=10, decimal_places=3, default=1)
+    unit = models.CharField(max_length=20, blank=True, default='')
+    # price of one unit, the cost of the item is quantity * price
+    price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+
+    class Meta:
+        abstract = True
+
+
+class Item(ItemFields):
+    """
+    Shopping List Items model
+    The items of the lists that are not archived
+    """
+    # explicitly set default manager
+    objects = ItemQuerySet.as_manager()
+
+    class Meta:
+        # the items of a list are fetched in order
+        indexes = [models.Index(fields=['the_list', 'position'])]
+
+
+class ArchivedItem(ItemFields):
+    """
+    Archived shopping list items model
+    The items of the archived lists, moved out of the item table so
+    that the queries of the active lists do not scan them
+    """
+    # explicitly set default manager
+    objects = ItemQuerySet.as_manager()
+    # id the item had in the item table, kept when it is moved back
+    id = models.IntegerField(primary_key=True)
+
+    class Meta:
+        # the items of an archived list are only fetched together
+        indexes = [models.Index(fields=['the_list'])]
+
+
+class Job(models.Model):
+    """
+    Background job model
+    A queued call of a task function, run by the run_worker command
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'queued'),
+        (RUNNING, 'running'),
+        (FAILED, 'failed'),
+    )
+
+    # explicitly set default manager
+    objects = models.Manager()
+    # dotted path of the task function
+    task = models.CharField(max_length=255)
+    # json encoded positional and keyword arguments of the task
+    args = models.TextField(default='[]')
+    kwargs = models.TextField(default='{}')
+    # queued, running or failed, finished jobs are deleted
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    # number of times the job was started
+    attempts = models.PositiveIntegerField(default=0)
+    # number of times the job is started before it is failed
+    max_attempts = models.PositiveIntegerField(default=3)
+    # the job is not picked up before this time, it is pushed back
+    # while the job runs (visibility timeout) and before a retry
+    run_after = models.DateTimeField()
+    # error of the last failed attempt
+    last_error = models.TextField(null=True)
+    # when the job was queued
+    created_on = models.DateTimeField(auto_now_add=True)
+    # when the job was last updated
+    updated_on = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # the workers look for jobs by status and run_after
+        indexes = [models.Index(fields=['status', 'run_after'])]
+
+
+class IdempotencyKey(models.Model):
+    """
+    Idempotency key model
+    The response of a create request sent with an Idempotency-Key
+    header, replayed when the client retries the request
+    """
+    # explicitly set default manager
+    objects = models.Manager()
+    # user that sent the request, indexed with the key below
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    # value of the Idempotency-Key header
+    key = models.CharField(max_length=255)
+    # sha256 hex digest of the method, path and body of the request
+    request_hash = models.CharField(max_length=64)
+    # status code and json body of the response
+    status_code = models.PositiveSmallIntegerField()
+    response = models.TextField()
+    # when the request was made, keys expire after IDEMPOTENCY TTL
+    created_on = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        # a key is looked up per user
+        unique_together = ('user', 'key')
+
+
+class ChangeEvent(models.Model):
+    """
+    Change event model
+    A change to a shopping list or item published to one of the users
+    it concerns, read by the change feed of every server process
+    """
+    # explicitly set default manager
+    objects = models.Manager()
+    # user the event is sent to, indexed with the id below
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    # json encoded event
+    data = models.TextField()
+    # when the event was published, events expire after FEED TTL
+    created_on = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        # the events after a cursor are looked up per user
+        indexes = [models.Index(fields=['user', 'id'])]
+
+
+class FeedListener(models.Model):
+    """
+    Feed listener model
+    A user whose changes are followed, by a client of the change feed
+    or an autocomplete index, the events of the other users are not
+    published
+    """
+    # explicitly set default manager
+    objects = models.Manager()
+    # user followed
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True
+    )
+    # the events of the user are published until then
+    until = models.DateTimeField()
@@ -0,0 +1,41 @@
+from django.conf import settings
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+
+from api import renderers
+from api.renderers import msgpack, orjson
+
+
+class FastJSONParser(parsers.JSONParser):
+    """
+    JSON parser backed by orjson, falls back to JSONParser when
+    orjson is not installed or the body is not utf-8
+    """
+    renderer_class = renderers.FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            # like the strict JSONParser, orjson rejects NaN and Infinity
+            return orjson.loads(stream.read())
+        except ValueError as exc:
+            raise ParseError('JSON parse error - {}'.format(exc))
+
+
+class MessagePackParser(parsers.BaseParser):
+    """
+    Parses request bodies sent with Content-Type: application/msgpack,
+    needs msgpack
+    """
+    media_type = 'application/msgpack'
+    renderer_class = renderers.MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except Exception as exc:
+            # msgpack raises several unrelated exception types
+            raise ParseError('MessagePack parse error - {}'.format(exc))
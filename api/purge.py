@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from api import jobs
+from api.models import ArchivedItem, ShoppingList, Item, ListMembership
+
+# background purge of deleted shopping lists with many items, the
+# list is hidden at once and its items are deleted in small batches
+# by a background job so that the request does not wait for them
+
+
+def has_many_items(list_id, user, threshold, archived=False):
+    """
+    Return True if a list the user owns holds at least threshold
+    items, without counting all of them
+
+    :param list_id: id of the shopping list
+    :param user: owner of the shopping list
+    :param threshold: number of items
+    :param archived: True if the list is archived, its items are
+        then counted in the archived items
+    :return: bool
+    """
+    model = ArchivedItem if archived else Item
+    items = model.objects.accessible_by(
+        user, (ListMembership.OWNER,)
+    ).filter(the_list_id=list_id)
+    return items.order_by()[threshold - 1:threshold].exists()
+
+
+def mark_deleted(list_id, user):
+    """
+    Hide a shopping list the user owns until its items are purged
+
+    :param list_id: id of the shopping list
+    :param user: owner of the shopping list
+    :return: True if the list was marked, False if the user
+        owns no list with that id
+    """
+    return ShoppingList.objects.accessible_by(
+        user, (ListMembership.OWNER,), include_archived=True
+    ).filter(
+        id=list_id
+    ).update(deleted_on=timezone.now()) > 0
+
+
+@jobs.task
+def purge_shopping_list(list_id, batch_size=None):
+    """
+    Delete the items of a deleted shopping list in batches, then
+    delete the list
+
+    :param list_id: id of a shopping list marked as deleted
+    :param batch_size: number of items deleted per statement
+    :return: number of items deleted
+    """
+    batch_size = batch_size or settings.LIST_PURGE['BATCH_SIZE']
+    if not ShoppingList.objects.filter(
+            id=list_id, deleted_on__isnull=False).exists():
+        # never purge a list that was not deleted
+        return 0
+    purged = 0
+    # the items of an archived list are archived items
+    for model in (Item, ArchivedItem):
+        while True:
+            # no items are added to a deleted list, so the batches
+            # need no transaction and every DELETE only holds its
+            # locks briefly
+            ids = list(model.objects.filter(
+                the_list_id=list_id
+            ).values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            # items have no dependent rows, this is a single DELETE
+            model.objects.filter(id__in=ids).delete()
+            purged += len(ids)
+    ShoppingList.objects.filter(id=list_id).delete()
+    return purged
+
+
+def delete_large_shopping_list(list_id, user):
+    """
+    Delete a shopping list of the user and queue a job that purges
+    its items, the job is committed together with the deletion
+
+    :param list_id: id of the shopping list
+    :param user: owner of the shopping list
+    :return: True if the list was deleted, False if the user
+        has no list with that id
+    """
+    with transaction.atomic():
+        if not mark_deleted(list_id, user):
+            return False
+        jobs.enqueue(purge_shopping_list, int(list_id))
+    return True
@@ -0,0 +1,153 @@
+from django.db.models import Case, Subquery, Value, When
+
+from api.models import Item
+
+# item positions, the items of a list are ordered by a rank string. A
+# rank can always be made between two others, so moving an item only
+# updates its own row. The ranks are base 36 fractions written with
+# lowercase letters and digits, which sort the same way in the C and
+# the en_US collations, and never end with a 0 so that there is room
+# below every rank
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BASE = len(DIGITS)
+# longer ranks are not made, the list is spread again instead
+MAX_LENGTH = 64
+
+
+def rank_between(before=None, after=None):
+    """
+    Make a rank that sorts between two ranks
+
+    :param before: rank to sort after, None for the start of the list
+    :param after: rank to sort before, None for the end of the list
+    :return: rank string
+    """
+    before = before or ''
+    if after is not None and after <= before:
+        raise ValueError('{!r} does not sort before {!r}'.format(
+            before, after))
+    if after is None:
+        # appending, increment the first digit that can be and drop
+        # the rest, so that ranks only grow after a run of z's
+        for index, digit in enumerate(before):
+            if digit != DIGITS[-1]:
+                return before[:index] + DIGITS[DIGITS.index(digit) + 1]
+        return before + DIGITS[BASE // 2]
+    if not before:
+        # prepending, decrement the first digit that can be
+        for index, digit in enumerate(after):
+            if DIGITS.index(digit) > 1:
+                return after[:index] + DIGITS[DIGITS.index(digit) - 1]
+    rank = []
+    for index in range(len(before) + len(after) + 1):
+        low = DIGITS.index(before[index]) if index < len(before) else 0
+        high = BASE
+        if after is not None and index < len(after):
+            high = DIGITS.index(after[index])
+        if high - low > 1:
+            rank.append(DIGITS[(low + high) // 2])
+            break
+        rank.append(DIGITS[low])
+        if high > low:
+            # the rank is now below after whatever follows
+            after = None
+    return ''.join(rank)
+
+
+def spread(count):
+    """
+    Make count evenly spaced ranks, as short as they can be
+
+    :return: list of ranks in order
+    """
+    width = 1
+    while BASE ** width <= count:
+        width += 1
+    ranks = []
+    for index in range(1, count + 1):
+        value = index * BASE ** width // (count + 1)
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        ranks.append(''.join(reversed(digits)).rstrip('0'))
+    return ranks
+
+
+def rebalance(list_id):
+    """
+    Give the items of a list evenly spaced ranks in their current
+    order, with a single UPDATE
+
+    Items created by the same requests at once, and items created
+    before they had positions, share a rank until the list is spread
+    """
+    ids = list(Item.objects.filter(the_list_id=list_id).order_by(
+        'position', 'id'
+    ).values_list('id', flat=True))
+    if ids:
+        Item.objects.filter(id__in=ids).update(position=Case(*[
+            When(id=item_id, then=Value(rank))
+            for item_id, rank in zip(ids, spread(len(ids)))
+        ]))
+
+
+def last_position(list_id):
+    """
+    Rank of a new item at the end of a list, on the (the_list_id,
+    position) index
+    """
+    last = Item.objects.filter(the_list_id=list_id).order_by(
+        '-position', '-id'
+    ).values_list('position', flat=True).first()
+    rank = rank_between(last, None)
+    if len(rank) > MAX_LENGTH:
+        rebalance(list_id)
+        return last_position(list_id)
+    return rank
+
+
+def neighbours(list_id, item_id, after_id):
+    # ranks an item moved after another one goes between, the item
+    # is left out as it moves, None when after_id is not on the list
+    items = Item.objects.filter(the_list_id=list_id).exclude(id=item_id)
+    if after_id is None:
+        first = items.order_by('position', 'id').values_list(
+            'position', flat=True
+        ).first()
+        return None, first
+    # the anchor item and the item that follows it in one query
+    rows = list(items.filter(
+        position__gte=Subquery(items.filter(id=after_id).values('position'))
+    ).order_by('position', 'id').values_list('id', 'position')[:2])
+    if not rows:
+        return None
+    if rows[0][0] != after_id:
+        # the anchor shares its rank with another item
+        return rows[0][1], rows[0][1]
+    return rows[0][1], rows[1][1] if len(rows) > 1 else None
+
+
+def position_after(list_id, item_id, after_id):
+    """
+    Rank that moves an item of a list after another one
+
+    :param list_id: id of the list of the item
+    :param item_id: id of the item moved
+    :param after_id: id of the item it is moved after, None to move
+        it to the top of the list
+    :return: rank, None if after_id is not an item of the list
+    """
+    for _ in range(2):
+        bounds = neighbours(list_id, item_id, after_id)
+        if bounds is None:
+            return None
+        before, after = bounds
+        if after is None or (before or '') < after:
+            rank = rank_between(before, after)
+            if len(rank) <= MAX_LENGTH:
+                return rank
+        # no room between the neighbours, spread the list and retry
+        rebalance(list_id)
+    raise RuntimeError('no rank between {!r} and {!r}'.format(*bounds))
@@ -0,0 +1,101 @@
+import json
+
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+# optional C extensions, the renderers fall back to the standard
+# library json when orjson is not installed
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+# encodes the types orjson and msgpack do not know about, e.g
+# decimals and lazy translations, the same way JSONRenderer does
+_encoder = encoders.JSONEncoder()
+
+
+def encode_default(obj):
+    return _encoder.default(obj)
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    JSON renderer backed by orjson, it renders the same JSON as
+    JSONRenderer, which it falls back to when orjson is not
+    installed, for indented output or for data orjson can not
+    encode such as integers larger than 64 bits
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(
+                accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            # datetimes go through encode_default so that they are
+            # formatted like JSONRenderer formats them
+            ret = orjson.dumps(
+                data, default=encode_default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME
+            )
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # keep the output a strict javascript subset like JSONRenderer
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+            b'\xe2\x80\xa9', b'\\u2029')
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """
+    Renders MessagePack, a compact binary alternative to JSON for
+    clients that send Accept: application/msgpack, needs msgpack
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return bytes()
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
+
+
+class PrometheusRenderer(renderers.BaseRenderer):
+    """
+    Renders metrics in the prometheus text exposition format
+    """
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, str):
+            return data.encode(self.charset)
+        # errors such as authentication failures are plain dicts
+        return '\n'.join(
+            '# {}: {}'.format(key, value) for key, value in data.items()
+        ).encode(self.charset)
+
+
+class EventStreamRenderer(renderers.BaseRenderer):
+    """
+    Lets clients ask for text/event-stream, the stream itself is
+    a StreamingHttpResponse, this renders the errors returned
+    instead of it as an error event
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return bytes()
+        return 'event: error\ndata: {}\n\n'.format(
+            json.dumps(data, default=encode_default)
+        ).encode(self.charset)
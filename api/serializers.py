@@ -1,9 +1,48 @@
 from rest_framework import serializers
-from api.models import ShoppingList, Item
+from api.models import ShoppingList, Item, ListMembership
+from api.metrics import timer
 # from django.contrib.auth.models import User
 
 
-class CompositeUserSerializer(serializers.Serializer):
+class TimedListSerializer(serializers.ListSerializer):
+    """
+    List serializer that records the time spent serializing
+    in the metrics of the current request
+    """
+    @property
+    def data(self):
+        with timer('serialize'):
+            return super().data
+
+
+class TimedSerializerMixin:
+    """
+    Records the time spent serializing in the metrics of the
+    current request, set Meta.list_serializer_class to
+    TimedListSerializer to time many=True as well
+    """
+    @property
+    def data(self):
+        with timer('serialize'):
+            return super().data
+
+
+class FieldSelectionMixin:
+    """
+    Takes a fields argument that limits the serialized fields to
+    the given names, e.g for the ?fields= query parameter
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class CompositeUserSerializer(FieldSelectionMixin, TimedSerializerMixin,
+                              serializers.Serializer):
     """
     This serializer combines data from django auth user
     and user profile model
@@ -15,31 +54,84 @@ class CompositeUserSerializer(serializers.Serializer):
     last_login = serializers.DateTimeField(allow_null=True)
     date_joined = serializers.DateTimeField()
 
+    class Meta:
+        list_serializer_class = TimedListSerializer
+
 
-class TokenSerializer(serializers.Serializer):
+class TokenSerializer(TimedSerializerMixin, serializers.Serializer):
     """
     This serializer serializes the token data
     """
     token = serializers.CharField(max_length=255)
 
+    class Meta:
+        list_serializer_class = TimedListSerializer
 
-class ShoppingListSerializer(serializers.ModelSerializer):
+
+class TotalsSerializer(TimedSerializerMixin, serializers.Serializer):
+    """
+    Serializer for the number and cost of the items of the lists of
+    a user, the cost of an item is its quantity times its price
+    """
+    item_count = serializers.IntegerField(read_only=True)
+    total = serializers.DecimalField(
+        max_digits=20, decimal_places=2, read_only=True
+    )
+    bought_total = serializers.DecimalField(
+        max_digits=20, decimal_places=2, read_only=True
+    )
+
+    class Meta:
+        list_serializer_class = TimedListSerializer
+
+
+class ShoppingListSerializer(FieldSelectionMixin, TimedSerializerMixin,
+                             serializers.ModelSerializer):
     """
-    Serializer for the shopping list model
+    Serializer for the shopping list model, the totals are only
+    serialized when the lists are fetched with them
     """
+    item_count = serializers.IntegerField(read_only=True)
+    total = serializers.DecimalField(
+        max_digits=20, decimal_places=2, read_only=True
+    )
+    bought_total = serializers.DecimalField(
+        max_digits=20, decimal_places=2, read_only=True
+    )
+
     class Meta:
         model = ShoppingList
+        list_serializer_class = TimedListSerializer
         # fields = '__all__'
-        exclude = ('user',)
+        exclude = ('user', 'deleted_on')
+        read_only_fields = ('version', 'archived_on')
 
 
-class ItemsSerializer(serializers.ModelSerializer):
+class ItemsSerializer(FieldSelectionMixin, TimedSerializerMixin,
+                      serializers.ModelSerializer):
     """
     Serializer for the shopping list items model
     """
     class Meta:
         model = Item
+        list_serializer_class = TimedListSerializer
         exclude = ('the_list',)
+        read_only_fields = ('version', 'position')
+
+
+class ListMembershipSerializer(TimedSerializerMixin, serializers.Serializer):
+    """
+    Serializer for the members of a shared shopping list
+    """
+    username = serializers.CharField(max_length=150)
+    role = serializers.ChoiceField(
+        choices=ListMembership.ROLES, default=ListMembership.EDITOR
+    )
+    created_on = serializers.DateTimeField(read_only=True)
+
+    class Meta:
+        list_serializer_class = TimedListSerializer
+
 
 # class UserSerializer(serializers.ModelSerializer):
 #     """
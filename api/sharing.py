@@ -0,0 +1,75 @@
+from rest_framework.exceptions import NotFound, PermissionDenied
+
+from api.models import ListMembership
+
+# shared shopping lists, the lists a user can access are the lists
+# they are a member of, with the role of their membership
+
+
+def list_roles(request):
+    """
+    Roles of the logged in user on the lists they are a member of,
+    fetched with one query on the membership index the first time
+    a request needs them and memoized on the request, the archived
+    lists are left out as they are not changed
+
+    :param request: DRF request
+    :return: dict of list id to role
+    """
+    roles = getattr(request, '_list_roles', None)
+    if roles is None:
+        roles = request._list_roles = dict(
+            ListMembership.objects.filter(
+                user=request.user, shopping_list__deleted_on__isnull=True,
+                shopping_list__archived_on__isnull=True
+            ).values_list('shopping_list_id', 'role')
+        )
+    return roles
+
+
+def forget_roles(request):
+    # the memberships of the user changed
+    request._list_roles = None
+
+
+def check_role(request, list_id, roles):
+    """
+    Check that the logged in user has one of the roles on a list
+
+    :param request: DRF request
+    :param list_id: id of the shopping list
+    :param roles: allowed roles
+    :return: the role of the user, raises NotFound if the user is
+        not a member of the list and PermissionDenied if their role
+        is not allowed
+    """
+    return check_member(list_roles(request), int(list_id), roles)
+
+
+def list_members(**filters):
+    """
+    Members of a list that is not deleted, e.g list_members(
+    shopping_list_id=1), the ids of the users to notify of a change
+    and the role checked before the change in one query
+
+    :return: dict of user id to role
+    """
+    return dict(ListMembership.objects.filter(
+        shopping_list__deleted_on__isnull=True, **filters
+    ).values_list('user_id', 'role'))
+
+
+def check_member(members, user_id, roles):
+    """
+    Check the role of a user in a dict of ids to roles
+
+    :return: the role of the user, raises NotFound if the user is
+        not in members and PermissionDenied if their role is not
+        allowed
+    """
+    role = members.get(user_id)
+    if role is None:
+        raise NotFound
+    if role not in roles:
+        raise PermissionDenied
+    return role
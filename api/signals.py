@@ -0,0 +1,35 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from api import feed
+from api.models import ShoppingList, Item, ListMembership
+
+# change events of the objects saved through the ORM. The views
+# update and delete lists and items with single UPDATE and DELETE
+# statements, which send no signals, and publish those changes
+# themselves with feed.notify
+
+
+@receiver(post_save, sender=ShoppingList)
+def shopping_list_saved(sender, instance, created, **kwargs):
+    if created:
+        # the user that creates a list is its first owner
+        ListMembership.objects.create(
+            user_id=instance.user_id, shopping_list=instance,
+            role=ListMembership.OWNER
+        )
+        feed.notify([instance.user_id], 'list', 'created', instance.id)
+    else:
+        feed.notify_members(
+            ListMembership.objects.filter(shopping_list_id=instance.id),
+            'list', 'updated', instance.id
+        )
+
+
+@receiver(post_save, sender=Item)
+def item_saved(sender, instance, created, **kwargs):
+    feed.notify_members(
+        ListMembership.objects.filter(shopping_list_id=instance.the_list_id),
+        'item', 'created' if created else 'updated',
+        instance.id, list_id=instance.the_list_id
+    )
@@ -0,0 +1,170 @@
+import collections
+import hashlib
+import re
+import threading
+import time
+
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+# slow query log, the slowest statements are kept in a bounded
+# in-memory ring buffer together with their query plan
+
+# prefix that asks each database vendor for a query plan
+EXPLAIN_PREFIXES = {
+    'postgresql': 'EXPLAIN ',
+    'mysql': 'EXPLAIN ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+
+# literals and lists of placeholders that vary between executions
+# of the same statement
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:\?|%s)\s*,?)+\)', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+
+
+def normalize(sql):
+    """
+    Normalize an SQL statement so that executions that only differ
+    by their parameters look the same
+
+    :param sql: SQL statement
+    :return: normalized SQL statement
+    """
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized_sql):
+    """
+    Short stable identifier of a normalized SQL statement
+    """
+    return hashlib.md5(normalized_sql.encode('utf-8')).hexdigest()[:16]
+
+
+class SlowQueryLog:
+    """
+    Thread safe ring buffer of the most recent slow queries
+    """
+
+    def __init__(self, max_entries=100):
+        self.lock = threading.Lock()
+        self.entries = collections.deque(maxlen=max_entries)
+
+    def resize(self, max_entries):
+        with self.lock:
+            self.entries = collections.deque(self.entries, maxlen=max_entries)
+
+    def add(self, entry):
+        with self.lock:
+            self.entries.append(entry)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def all(self):
+        """
+        Return the recorded slow queries, the most recent first
+        """
+        with self.lock:
+            return list(reversed(self.entries))
+
+
+# slow queries of this process
+log = SlowQueryLog()
+
+
+def explain(connection, sql, params):
+    """
+    Return the query plan of a SELECT statement, or None for
+    other statements and databases without EXPLAIN support
+
+    It runs once the request is over, in autocommit, unless the
+    caller is itself in a transaction
+
+    :param connection: database connection the statement ran on
+    :param sql: SQL statement with placeholders
+    :param params: the statement parameters
+    :return: query plan as text
+    """
+    prefix = EXPLAIN_PREFIXES.get(connection.vendor)
+    if prefix is None or not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    try:
+        if connection.in_atomic_block:
+            # a savepoint keeps a failing EXPLAIN from breaking the
+            # transaction of the caller
+            with transaction.atomic(using=connection.alias):
+                rows = run_explain(connection, prefix + sql, params)
+        else:
+            rows = run_explain(connection, prefix + sql, params)
+    except DatabaseError as error:
+        return 'EXPLAIN failed: {}'.format(error)
+    return '\n'.join(
+        ' '.join(str(column) for column in row) for row in rows
+    )
+
+
+def run_explain(connection, sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+class SlowQueryRecorder:
+    """
+    Database execute wrapper that records the statements of a
+    request that take longer than the threshold
+
+    The statements are only timed while the request runs, their
+    plans are fetched by flush() once the response is ready so that
+    no EXPLAIN runs while the cursor of a slow query is still open
+    """
+
+    def __init__(self, threshold, capture_plan=True, slow_query_log=None):
+        self.threshold = threshold
+        self.capture_plan = capture_plan
+        self.log = slow_query_log or log
+        self.view = 'unresolved'
+        # slow statements of the request, at most as many as the log
+        # keeps, with their parameters until their plan is fetched
+        self.pending = collections.deque(maxlen=self.log.entries.maxlen)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration = time.perf_counter() - started
+        if duration >= self.threshold:
+            self.pending.append((
+                context['connection'], sql, None if many else params,
+                many, duration, timezone.now()
+            ))
+        return result
+
+    def flush(self):
+        """
+        Add the slow statements of the request to the log, with
+        their query plans
+        """
+        while self.pending:
+            connection, sql, params, many, duration, recorded_on = \
+                self.pending.popleft()
+            normalized = normalize(sql)
+            plan = None
+            if self.capture_plan and not many:
+                plan = explain(connection, sql, params)
+            # the parameters are not kept, they may hold personal data
+            self.log.add({
+                'recorded_on': recorded_on.isoformat(),
+                'view': self.view,
+                'duration_ms': round(duration * 1000, 3),
+                'fingerprint': fingerprint(normalized),
+                'sql': normalized,
+                'plan': plan,
+            })
@@ -0,0 +1,58 @@
+"""
+Measure how long a fresh process takes to load django and serve its
+first request, run by the benchmark_startup command as
+
+    DJANGO_SETTINGS_MODULE=config.settings_api python -m api.startup
+
+It prints the timings, in milliseconds, as json
+"""
+
+import time
+
+# nothing from django may be imported before this point
+started = time.perf_counter()
+
+import io  # noqa: E402
+import json  # noqa: E402
+import sys  # noqa: E402
+from wsgiref.util import setup_testing_defaults  # noqa: E402
+
+# path of the request served first, anonymous so that no database
+# or seeded data is needed
+FIRST_REQUEST_PATH = '/v1/shoppinglists/'
+
+
+def first_request(application):
+    """
+    Serve an anonymous request through the WSGI application
+    """
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': FIRST_REQUEST_PATH,
+        'wsgi.input': io.BytesIO(b''),
+    }
+    setup_testing_defaults(environ)
+    status = []
+    response = application(
+        environ, lambda code, headers, exc_info=None: status.append(code)
+    )
+    b''.join(response)
+    response.close()
+    return status[0]
+
+
+def main():
+    from config.wsgi import application
+    loaded = time.perf_counter()
+    status = first_request(application)
+    served = time.perf_counter()
+    json.dump({
+        'setup_ms': round((loaded - started) * 1000, 3),
+        'first_request_ms': round((served - loaded) * 1000, 3),
+        'status': status,
+        'modules': len(sys.modules),
+    }, sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
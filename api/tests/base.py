@@ -1,4 +1,6 @@
+from unittest import mock
 from rest_framework.test import APITestCase, APIClient
+from api import benchmark, throttling
 from api.models import UserProfile, ShoppingList, Item
 from django.contrib.auth.models import User
 from django.urls import reverse
@@ -7,7 +9,12 @@ from api.serializers import (
     ItemsSerializer,
     CompositeUserSerializer
 )
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.signals import request_finished
+from django.db import close_old_connections, connections
+from django.db.backends.utils import CursorWrapper
 import json
+import os
 
 
 class BaseTest(APITestCase):
@@ -19,6 +26,8 @@ class BaseTest(APITestCase):
     token = ""
 
     def setUp(self):
+        # every test starts with full rate limit buckets
+        throttling.buckets.clear()
         # create a admin user
         self.user = User.objects.create_superuser(
             username='test_user',
@@ -189,3 +198,113 @@ class ItemBaseTest(ShoppingListBaseTest):
         })
         serializer.is_valid()
         return serializer.data
+
+
+class QueryBudget:
+    """
+    Context manager that counts the SQL queries run and the
+    rows fetched from the database while it is active
+    """
+
+    def __init__(self, using='default'):
+        self.connection = connections[using]
+        self.queries = 0
+        self.rows = 0
+        self.patches = []
+
+    def __call__(self, execute, sql, params, many, context):
+        # database execute wrapper
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def count_rows(self, rows):
+        self.rows += len(rows)
+        return rows
+
+    def __enter__(self):
+        budget = self
+
+        def fetchone(cursor):
+            row = cursor.cursor.fetchone()
+            if row is not None:
+                budget.rows += 1
+            return row
+
+        def fetchmany(cursor, *args, **kwargs):
+            return budget.count_rows(cursor.cursor.fetchmany(*args, **kwargs))
+
+        def fetchall(cursor):
+            return budget.count_rows(cursor.cursor.fetchall())
+
+        def iterate(cursor):
+            for row in cursor.cursor:
+                budget.rows += 1
+                yield row
+
+        # the fetch methods are proxied by CursorWrapper.__getattr__,
+        # define them on the class for as long as the budget is active
+        self.patches = [
+            mock.patch.object(CursorWrapper, 'fetchone', fetchone,
+                              create=True),
+            mock.patch.object(CursorWrapper, 'fetchmany', fetchmany,
+                              create=True),
+            mock.patch.object(CursorWrapper, 'fetchall', fetchall,
+                              create=True),
+            mock.patch.object(CursorWrapper, '__iter__', iterate),
+        ]
+        for patch in self.patches:
+            patch.start()
+        self.wrapper = self.connection.execute_wrapper(self)
+        self.wrapper.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.wrapper.__exit__(exc_type, exc_value, traceback)
+        for patch in reversed(self.patches):
+            patch.stop()
+
+
+class BudgetBaseTest(APITestCase):
+    """
+    Base Test for the query budgets of the api routes
+
+    The budgets in budgets.json declare the maximum number of SQL
+    queries run and rows fetched by each route for the dataset
+    seeded here
+    """
+
+    with open(os.path.join(os.path.dirname(__file__), 'budgets.json')) \
+            as budgets_file:
+        budgets = json.load(budgets_file)
+
+    def setUp(self):
+        # keep the test transaction open across the requests,
+        # the same way the django test client does
+        request_finished.disconnect(close_old_connections)
+        self.addCleanup(request_finished.connect, close_old_connections)
+        self.users = benchmark.seed(spares=1, **self.budgets['dataset'])
+        self.application = WSGIHandler()
+
+    def assertWithinBudget(self, route):
+        # run the route once and check it against its budget
+        scenarios = dict(benchmark.SCENARIOS)
+        user = self.users[0]
+        method, path, body, auth = scenarios[route](user, 0)
+        environ = benchmark.build_environ(
+            method, path, body, user.token if auth else None
+        )
+        with QueryBudget() as budget:
+            code, _, _ = benchmark.call(self.application, environ)
+        self.assertLess(code, 400, route)
+        limits = self.budgets['routes'][route]
+        self.assertLessEqual(
+            budget.queries, limits['queries'],
+            '{} ran {} queries, the budget is {}'.format(
+                route, budget.queries, limits['queries'])
+        )
+        self.assertLessEqual(
+            budget.rows, limits['rows'],
+            '{} fetched {} rows, the budget is {}'.format(
+                route, budget.rows, limits['rows'])
+        )
+        return budget
@@ -0,0 +1,184 @@
+import datetime
+from io import StringIO
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.views import status
+from api import archive
+from api.models import ArchivedItem, Item, ListMembership, ShoppingList
+from api.tests.base import ItemBaseTest
+
+
+class ArchivedListTest(ItemBaseTest):
+    """
+    Tests for the archived shopping lists and their items
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.list_id = self.get_a_shopping_list_id()
+        self.archive_url = reverse(
+            'shop_list_api:shopping-lists-archive',
+            kwargs={'version': 'v1', 'pk': self.list_id}
+        )
+        self.login_client('test_user', 'testing')
+
+    def url(self, name, **kwargs):
+        kwargs['version'] = 'v1'
+        return reverse('shop_list_api:' + name, kwargs=kwargs)
+
+    def ids(self, name, params=None, **kwargs):
+        response = self.client.get(self.url(name, **kwargs), params or {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = response.data
+        if isinstance(rows, dict):
+            # a paginated response
+            rows = rows['results']
+        return [row['id'] for row in rows]
+
+    def test_archive_moves_the_items(self):
+        response = self.client.post(self.archive_url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(
+            Item.objects.filter(the_list_id=self.list_id).exists()
+        )
+        archived = ArchivedItem.objects.get(the_list_id=self.list_id)
+        self.assertEqual(archived.id, self.item.id)
+        self.assertEqual(archived.name, self.item.name)
+        # assert archiving twice is a conflict
+        response = self.client.post(self.archive_url)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_restore_moves_the_items_back(self):
+        self.client.post(self.archive_url)
+        response = self.client.delete(self.archive_url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            Item.objects.get(the_list_id=self.list_id).id, self.item.id
+        )
+        self.assertFalse(ArchivedItem.objects.exists())
+        self.assertIsNone(
+            ShoppingList.objects.get(id=self.list_id).archived_on
+        )
+
+    def test_archived_data_is_only_read_when_included(self):
+        self.client.post(self.archive_url)
+        self.assertNotIn(
+            self.list_id, self.ids('shop-list-api-shopping-lists')
+        )
+        self.assertEqual(self.ids('shopping-lists-all-items'), [])
+        self.assertEqual(
+            self.ids('shopping-lists-items-search', {'q': 'test'}), []
+        )
+        included = {'include_archived': '1'}
+        self.assertIn(
+            self.list_id,
+            self.ids('shop-list-api-shopping-lists', included)
+        )
+        self.assertEqual(
+            self.ids('shopping-lists-all-items', included), [self.item.id]
+        )
+        self.assertEqual(
+            self.ids('shopping-lists-items', included, list_id=self.list_id),
+            [self.item.id]
+        )
+        included['q'] = 'test'
+        self.assertEqual(
+            self.ids('shopping-lists-items-search', included),
+            [self.item.id]
+        )
+        response = self.client.get(
+            self.url('shop-list-api-shopping-lists-detail', pk=self.list_id),
+            included
+        )
+        self.assertIsNotNone(response.data['archived_on'])
+
+    def test_active_and_archived_items_are_merged(self):
+        other_list = ShoppingList.objects.get(name='test_list_2')
+        active = Item.objects.create(name='test item 2', the_list=other_list)
+        self.client.post(self.archive_url)
+        self.assertEqual(
+            self.ids('shopping-lists-items-search',
+                     {'q': 'test', 'include_archived': '1'}),
+            [self.item.id, active.id]
+        )
+
+    def test_totals_of_archived_lists(self):
+        Item.objects.filter(id=self.item.id).update(quantity=2, price='1.25')
+        Item.objects.create(
+            name='cheese', the_list_id=self.list_id, quantity=1,
+            price='6', bought=True
+        )
+        self.client.post(self.archive_url)
+        params = {
+            'include_archived': '1',
+            'fields': 'id,item_count,total,bought_total'
+        }
+        expected = {
+            'id': self.list_id, 'item_count': 2, 'total': '8.50',
+            'bought_total': '6.00'
+        }
+        response = self.client.get(
+            self.url('shop-list-api-shopping-lists-detail', pk=self.list_id),
+            params
+        )
+        self.assertEqual(response.data, expected)
+        response = self.client.get(
+            self.url('shop-list-api-shopping-lists'), params
+        )
+        totals = {row['id']: row for row in response.data}
+        self.assertEqual(totals[self.list_id], expected)
+        # the active lists are still summed
+        other_id = ShoppingList.objects.get(name='test_list_2').id
+        self.assertEqual(totals[other_id]['item_count'], 0)
+        self.assertEqual(totals[other_id]['total'], '0.00')
+
+    def test_archived_lists_are_not_changed(self):
+        self.client.post(self.archive_url)
+        response = self.client.post(
+            self.url('shopping-lists-items', list_id=self.list_id),
+            {'name': 'milk'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.put(
+            self.url('shop-list-api-shopping-lists-detail', pk=self.list_id),
+            {'name': 'renamed'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_delete_archived_list(self):
+        self.client.post(self.archive_url)
+        response = self.client.delete(
+            self.url('shop-list-api-shopping-lists-detail', pk=self.list_id)
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(ArchivedItem.objects.exists())
+        self.assertFalse(ShoppingList.objects.filter(id=self.list_id).exists())
+
+    def test_viewers_cannot_archive(self):
+        ListMembership.objects.create(
+            user=self.other_user, shopping_list_id=self.list_id,
+            role=ListMembership.VIEWER
+        )
+        self.login_client('other_test_user', 'other_testing')
+        response = self.client.post(self.archive_url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_archive_inactive_lists(self):
+        old = timezone.now() - datetime.timedelta(days=200)
+        ShoppingList.objects.update(updated_on=old)
+        Item.objects.update(updated_on=old)
+        # a list with a recently changed item stays active
+        Item.objects.create(
+            name='recent', the_list=ShoppingList.objects.get(
+                name='test_list_2')
+        )
+        output = StringIO()
+        call_command('archive_lists', '--days', '180', stdout=output)
+        self.assertIn('archived 1 lists', output.getvalue())
+        self.assertEqual(
+            list(ShoppingList.objects.filter(
+                archived_on__isnull=False).values_list('id', flat=True)),
+            [self.list_id]
+        )
+        self.assertEqual(list(archive.inactive_lists(180)), [])
@@ -0,0 +1,169 @@
+from unittest import mock
+from django.test import SimpleTestCase
+from django.urls import reverse
+from api import autocomplete, feed
+from api.models import Item
+from api.tests.base import ItemBaseTest
+
+
+class NameIndexTest(SimpleTestCase):
+    """
+    Tests for the in-memory index of the item names of a user
+    """
+
+    def setUp(self):
+        names = (
+            ['Milk'] * 3 + ['mint'] + ['Mineral water'] * 5 + ['eggs'] * 2
+            + ['milk']
+        )
+        self.index = autocomplete.NameIndex(enumerate(names))
+
+    def test_most_used_names_first(self):
+        self.assertEqual(
+            self.index.suggest('mi', 10), ['Mineral water', 'Milk', 'mint']
+        )
+        self.assertEqual(self.index.suggest('MIL', 10), ['Milk'])
+        self.assertEqual(self.index.suggest('bread', 10), [])
+
+    def test_limit(self):
+        self.assertEqual(self.index.suggest('m', 1), ['Mineral water'])
+        self.assertEqual(len(self.index.suggest('', 10)), 4)
+
+    def test_update(self):
+        self.index.suggest('m', 10)
+        # rename the 'mint' item, then delete the 'eggs' items
+        self.index.update(3, 'Mustard')
+        self.index.update(9, None)
+        self.index.update(10, None)
+        self.assertEqual(
+            self.index.suggest('m', 10), ['Mineral water', 'Milk', 'Mustard']
+        )
+        self.assertEqual(self.index.suggest('e', 10), [])
+        self.assertEqual(self.index.keys, sorted(self.index.names))
+        self.index.update(20, 'eggs')
+        self.assertEqual(self.index.suggest('e', 10), ['eggs'])
+
+
+@mock.patch('api.feed.transaction.on_commit', lambda func: func())
+class ItemNameAutocompleteTest(ItemBaseTest):
+    """
+    Tests for the item name autocomplete endpoint
+    """
+
+    def setUp(self):
+        super().setUp()
+        autocomplete.names.clear()
+        feed.feed.listening.clear()
+        # the change events are read on every request
+        patcher = mock.patch.object(autocomplete.names, 'check_interval', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.url = reverse(
+            'shop_list_api:shopping-lists-items-autocomplete',
+            kwargs={'version': 'v1'}
+        )
+        list_id = self.get_a_shopping_list_id()
+        for name in ('test item 2', 'test item 2', 'tea'):
+            Item.objects.create(name=name, the_list_id=list_id)
+        self.items_url = reverse(
+            'shop_list_api:shopping-lists-items',
+            kwargs={'version': 'v1', 'list_id': list_id}
+        )
+
+    def item_url(self, item_id):
+        return reverse(
+            'shop_list_api:shopping-lists-items-detail',
+            kwargs={'version': 'v1', 'item_id': item_id}
+        )
+
+    def test_suggestions(self):
+        self.login_client('test_user', 'testing')
+        response = self.client.get(self.url, {'q': 'te'})
+        self.assertEqual(
+            response.data, ['test item 2', 'tea', 'test item 1']
+        )
+        response = self.client.get(self.url, {'q': 'te', 'limit': 1})
+        self.assertEqual(response.data, ['test item 2'])
+
+    def test_suggestions_are_served_from_memory(self):
+        self.login_client('test_user', 'testing')
+        self.client.get(self.url, {'q': 't'})
+        # one query fetches the user and one the new change events of
+        # the user, the names are not read again
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'q': 'te'})
+        self.assertEqual(
+            response.data, ['test item 2', 'tea', 'test item 1']
+        )
+
+    def test_change_events_are_read_every_few_seconds(self):
+        autocomplete.names.check_interval = 60
+        self.login_client('test_user', 'testing')
+        self.client.get(self.url, {'q': 't'})
+        self.client.post(self.items_url, {'name': 'toast'}, format='json')
+        # only the user is fetched
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'q': 'to'})
+        self.assertEqual(response.data, [])
+        autocomplete.names.check_interval = 0
+        response = self.client.get(self.url, {'q': 'to'})
+        self.assertEqual(response.data, ['toast'])
+
+    def test_changes_of_any_process_are_applied(self):
+        self.login_client('test_user', 'testing')
+        self.client.get(self.url, {'q': 't'})
+        index = autocomplete.names.indexes[self.user.id]
+        self.client.post(self.items_url, {'name': 'toast'}, format='json')
+        response = self.client.get(self.url, {'q': 'to'})
+        self.assertEqual(response.data, ['toast'])
+        # an item created through another process, which published a
+        # change event
+        toffee = Item.objects.create(
+            name='toffee', the_list_id=self.get_a_shopping_list_id()
+        )
+        # the user, the new events and the name of the item
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {'q': 'to'})
+        self.assertEqual(response.data, ['toast', 'toffee'])
+        self.client.put(
+            self.item_url(toffee.id), {'name': 'tofu'}, format='json'
+        )
+        self.client.delete(self.item_url(self.item.id))
+        response = self.client.get(self.url, {'q': 't'})
+        self.assertEqual(
+            response.data, ['test item 2', 'tea', 'toast', 'tofu']
+        )
+        # assert the index was updated, not built again
+        self.assertIs(autocomplete.names.indexes[self.user.id], index)
+
+    def test_events_that_change_no_names_are_skipped(self):
+        self.login_client('test_user', 'testing')
+        self.client.get(self.url, {'q': 't'})
+        self.client.put(reverse(
+            'shop_list_api:shop-list-api-shopping-lists-detail',
+            kwargs={'version': 'v1', 'pk': self.get_a_shopping_list_id()}
+        ), {'name': 'renamed'}, format='json')
+        # the user and the new events, no items are read
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'q': 'te'})
+        self.assertEqual(
+            response.data, ['test item 2', 'tea', 'test item 1']
+        )
+
+    def test_names_of_shared_lists_are_suggested(self):
+        self.login_client('other_test_user', 'other_testing')
+        self.assertEqual(self.client.get(self.url, {'q': 'te'}).data, [])
+        self.login_client('test_user', 'testing')
+        self.client.post(
+            reverse('shop_list_api:shopping-lists-members', kwargs={
+                'version': 'v1', 'list_id': self.get_a_shopping_list_id()}),
+            {'username': 'other_test_user', 'role': 'viewer'}, format='json'
+        )
+        self.login_client('other_test_user', 'other_testing')
+        response = self.client.get(self.url, {'q': 'tea'})
+        self.assertEqual(response.data, ['tea'])
+
+    def test_names_of_other_users_are_not_suggested(self):
+        self.login_client('other_test_user', 'other_testing')
+        response = self.client.get(self.url, {'q': 'te'})
+        self.assertEqual(response.data, [])
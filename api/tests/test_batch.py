@@ -0,0 +1,158 @@
+from unittest import mock
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.views import status
+from api.models import ShoppingList, Item
+from api.tests.base import ItemBaseTest
+from api.views.shop_list_views import ShoppingLists
+
+
+class BatchRequestsTest(ItemBaseTest):
+    """
+    Tests for the /batch/ endpoint
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse(
+            'shop_list_api:shop-list-api-batch', kwargs={'version': 'v1'}
+        )
+
+    def batch(self, sub_requests):
+        return self.client.post(self.url, sub_requests, format='json')
+
+    def test_batch_with_anonymous_user(self):
+        response = self.batch([{'url': 'shoppinglists/'}])
+        # assert status code is 401 UNAUTHORIZED
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_batch_reads(self):
+        list_id = self.get_a_shopping_list_id()
+        self.login_client('test_user', 'testing')
+        response = self.batch([
+            {'method': 'GET', 'url': 'shoppinglists/{}/'.format(list_id)},
+            {'url': '/v1/shoppinglists/{}/items/'.format(list_id)},
+            {'url': 'users/test_user/?fields=email'},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        statuses = [sub_response['status'] for sub_response in response.data]
+        self.assertEqual(statuses, [200, 200, 200])
+        self.assertEqual(response.data[0]['body']['name'], 'test_list_1')
+        self.assertEqual(
+            response.data[1]['body'][0]['name'], 'test item 1'
+        )
+        self.assertEqual(
+            response.data[2]['body'], {'email': 'test@mail.com'}
+        )
+
+    def test_batch_authenticates_once(self):
+        list_id = self.get_a_shopping_list_id()
+        self.login_client('test_user', 'testing')
+        sub_requests = [
+            {'url': 'shoppinglists/{}/'.format(list_id)}
+        ] * 5
+        with CaptureQueriesContext(connection) as context:
+            response = self.batch(sub_requests)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # assert the user is fetched for the batch only
+        user_queries = [
+            query for query in context.captured_queries
+            if '"auth_user"."password"' in query['sql']
+        ]
+        self.assertEqual(len(user_queries), 1)
+
+    def test_batch_writes(self):
+        list_id = self.get_a_shopping_list_id()
+        self.login_client('test_user', 'testing')
+        response = self.batch([
+            {'method': 'POST', 'url': 'shoppinglists/',
+             'body': {'name': 'batch list'}},
+            {'method': 'POST', 'url': 'shoppinglists/{}/items/'.format(
+                list_id), 'body': {'name': 'batch item'}},
+            {'method': 'DELETE', 'url': 'shoppinglists/items/{}/'.format(
+                self.item.id)},
+        ])
+        statuses = [sub_response['status'] for sub_response in response.data]
+        self.assertEqual(statuses, [200, 200, 204])
+        self.assertTrue(
+            ShoppingList.objects.filter(name='batch list').exists()
+        )
+        self.assertTrue(Item.objects.filter(name='batch item').exists())
+        self.assertFalse(Item.objects.filter(id=self.item.id).exists())
+
+    def test_failed_sub_request_is_rolled_back(self):
+        list_id = self.get_a_shopping_list_id()
+        self.login_client('test_user', 'testing')
+
+        def update_and_fail(view, serializer):
+            original_perform_update(view, serializer)
+            raise RuntimeError('failed after the update')
+
+        original_perform_update = ShoppingLists.perform_update
+        with mock.patch.object(
+                ShoppingLists, 'perform_update', update_and_fail), \
+                self.assertLogs('api.batch', 'ERROR'):
+            response = self.batch([
+                {'method': 'POST', 'url': 'shoppinglists/{}/items/'.format(
+                    list_id), 'body': {'name': 'batch item'}},
+                {'method': 'PUT', 'url': 'shoppinglists/{}/'.format(
+                    list_id), 'body': {'name': 'renamed'}},
+            ])
+        statuses = [sub_response['status'] for sub_response in response.data]
+        self.assertEqual(statuses, [200, 500])
+        # assert only the changes of the failed sub-request are undone
+        self.assertTrue(Item.objects.filter(name='batch item').exists())
+        self.assertEqual(
+            ShoppingList.objects.get(id=list_id).name, 'test_list_1'
+        )
+
+    def test_sub_requests_are_scoped_to_the_user(self):
+        other_list = ShoppingList.objects.create(
+            name='other list', user=self.other_user
+        )
+        self.login_client('test_user', 'testing')
+        response = self.batch([
+            {'url': 'shoppinglists/{}/'.format(other_list.id)},
+            {'method': 'DELETE',
+             'url': 'shoppinglists/{}/'.format(other_list.id)},
+        ])
+        statuses = [sub_response['status'] for sub_response in response.data]
+        self.assertEqual(statuses, [404, 404])
+        self.assertTrue(
+            ShoppingList.objects.filter(id=other_list.id).exists()
+        )
+
+    def test_unknown_and_nested_urls(self):
+        self.login_client('test_user', 'testing')
+        response = self.batch([
+            {'url': 'nowhere/'},
+            {'url': '/api-token-auth/', 'method': 'POST'},
+            {'url': 'batch/', 'method': 'POST', 'body': []},
+        ])
+        statuses = [sub_response['status'] for sub_response in response.data]
+        self.assertEqual(statuses, [404, 404, 404])
+
+    def test_invalid_batches(self):
+        self.login_client('test_user', 'testing')
+        for sub_requests in (
+                [],
+                {'url': 'shoppinglists/'},
+                ['shoppinglists/'],
+                [{'method': 'GET'}],
+                [{'method': 'TRACE', 'url': 'shoppinglists/'}],
+                [{'url': 'shoppinglists/', 'headers': 'x'}]):
+            response = self.batch(sub_requests)
+            # assert status code is 400 BAD REQUEST
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST,
+                sub_requests
+            )
+
+    @override_settings(BATCH={'MAX_REQUESTS': 2})
+    def test_too_many_sub_requests(self):
+        self.login_client('test_user', 'testing')
+        response = self.batch([{'url': 'shoppinglists/'}] * 3)
+        # assert status code is 400 BAD REQUEST
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
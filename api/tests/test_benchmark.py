@@ -0,0 +1,101 @@
+from django.core.signals import request_finished
+from django.db import close_old_connections
+from django.test import TestCase
+from api import benchmark
+from api.models import ShoppingList, Item
+
+
+class BenchmarkTest(TestCase):
+    """
+    Tests for the load testing harness
+    """
+
+    def setUp(self):
+        # keep the test transaction open across the requests,
+        # the same way the django test client does
+        request_finished.disconnect(close_old_connections)
+
+    def tearDown(self):
+        request_finished.connect(close_old_connections)
+
+    def test_seed(self):
+        # test seeding users, lists and items
+        users = benchmark.seed(users=2, lists=3, items=4, spares=1)
+        self.assertEqual(len(users), 2)
+        self.assertTrue(users[0].user.is_superuser)
+        self.assertFalse(users[1].user.is_superuser)
+        self.assertEqual(len(users[0].list_ids), 3)
+        self.assertEqual(len(users[0].spare_list_ids), 1)
+        self.assertEqual(len(users[0].spare_item_ids), 1)
+        self.assertEqual(ShoppingList.objects.count(), 8)
+        # 4 items on every list plus a spare item per user
+        self.assertEqual(Item.objects.count(), 34)
+
+    def test_run_every_route(self):
+        # test driving every route through the WSGI app
+        results = benchmark.run(
+            users=2, lists=2, items=2, requests=2, clients=1
+        )
+        self.assertEqual(
+            [result['route'] for result in results],
+            [name for name, _ in benchmark.SCENARIOS]
+        )
+        for result in results:
+            self.assertEqual(result['errors'], 0, result['route'])
+            self.assertGreater(result['queries_per_request'], 0)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([], 95), 0.0)
+
+    def test_compare(self):
+        baseline = [{
+            'route': 'lists',
+            'req_per_sec': 100.0,
+            'p95_ms': 10.0,
+            'queries_per_request': 2.0
+        }]
+        same = [dict(baseline[0])]
+        self.assertEqual(benchmark.compare(same, baseline), [])
+        slower = [dict(baseline[0], p95_ms=20.0, req_per_sec=50.0)]
+        self.assertEqual(len(benchmark.compare(slower, baseline)), 2)
+        more_queries = [dict(baseline[0], queries_per_request=3.0)]
+        self.assertEqual(len(benchmark.compare(more_queries, baseline)), 1)
+
+    def test_serialized_application(self):
+        # test the sync serving mode handles one request at a time
+        calls = []
+
+        def application(environ, start_response):
+            calls.append(environ['PATH_INFO'])
+            start_response('200 OK', [])
+            return [b'ok']
+
+        serialized = benchmark.SerializedApplication(application)
+        body = serialized({'PATH_INFO': '/'}, lambda *args: None)
+        self.assertEqual(body, [b'ok'])
+        self.assertEqual(calls, ['/'])
+        self.assertFalse(serialized.lock.locked())
+
+    def test_compare_serving(self):
+        sync = [{'route': 'lists', 'req_per_sec': 50.0, 'p95_ms': 40.0}]
+        threaded = [{'route': 'lists', 'req_per_sec': 100.0, 'p95_ms': 20.0}]
+        rows = benchmark.compare_serving(sync, threaded)
+        self.assertEqual(rows[0]['speedup'], 2.0)
+
+    def test_call_reads_reported_queries(self):
+        # test the query count of a remote server is read from the
+        # Server-Timing header
+        def application(environ, start_response):
+            start_response('200 OK', [
+                ('Server-Timing', 'db;desc="3 queries";dur=1.000')
+            ])
+            return [b'ok']
+
+        code, _, queries = benchmark.call(
+            application, benchmark.build_environ('GET', '/')
+        )
+        self.assertEqual(code, 200)
+        self.assertEqual(queries, 3)
@@ -0,0 +1,92 @@
+from api.tests.base import BudgetBaseTest
+
+
+class QueryBudgetTest(BudgetBaseTest):
+    """
+    Tests that every route stays within its query budget
+    declared in budgets.json
+    """
+
+    def test_register_budget(self):
+        # RegisterUsers.post
+        self.assertWithinBudget('register')
+
+    def test_login_budget(self):
+        # LoginUser.post
+        self.assertWithinBudget('login')
+
+    def test_reset_password_budget(self):
+        # ResetUserPassword.put
+        self.assertWithinBudget('reset-password')
+
+    def test_logout_budget(self):
+        # LogoutUser.get
+        self.assertWithinBudget('logout')
+
+    def test_all_users_budget(self):
+        # ListAllUsers.get
+        self.assertWithinBudget('all-users')
+
+    def test_user_detail_budget(self):
+        # SingleUserDetails.get
+        self.assertWithinBudget('user-detail')
+
+    def test_user_update_budget(self):
+        # SingleUserDetails.put
+        self.assertWithinBudget('user-update')
+
+    def test_lists_budget(self):
+        # ShoppingLists.list
+        self.assertWithinBudget('lists')
+
+    def test_list_create_budget(self):
+        # ShoppingLists.create
+        self.assertWithinBudget('list-create')
+
+    def test_list_search_budget(self):
+        # SearchShoppingLists
+        self.assertWithinBudget('list-search')
+
+    def test_list_detail_budget(self):
+        # ShoppingLists.retrieve
+        self.assertWithinBudget('list-detail')
+
+    def test_list_update_budget(self):
+        # ShoppingLists.update
+        self.assertWithinBudget('list-update')
+
+    def test_list_delete_budget(self):
+        # ShoppingLists.destroy
+        self.assertWithinBudget('list-delete')
+
+    def test_all_items_budget(self):
+        # ListAllItems.get
+        self.assertWithinBudget('all-items')
+
+    def test_list_items_budget(self):
+        # ItemsListCreate.get
+        self.assertWithinBudget('list-items')
+
+    def test_item_create_budget(self):
+        # ItemsListCreate.post
+        self.assertWithinBudget('item-create')
+
+    def test_item_detail_budget(self):
+        # ItemsDetails.get
+        self.assertWithinBudget('item-detail')
+
+    def test_item_update_budget(self):
+        # ItemsDetails.put
+        self.assertWithinBudget('item-update')
+
+    def test_item_delete_budget(self):
+        # ItemsDetails.delete
+        self.assertWithinBudget('item-delete')
+
+    def test_item_search_budget(self):
+        # SearchItemByName
+        self.assertWithinBudget('item-search')
+
+    def test_batch_budget(self):
+        # BatchRequests.post
+        self.assertWithinBudget('batch')
@@ -0,0 +1,149 @@
+import gzip
+import json
+import unittest
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from api import benchmark, compression
+from api.tests.base import ItemBaseTest
+
+
+class NegotiationTest(SimpleTestCase):
+    """
+    Tests for the Accept-Encoding negotiation
+    """
+
+    def test_parse_accept_encoding(self):
+        self.assertEqual(
+            compression.parse_accept_encoding('gzip, br;q=0.5, *;q=0'),
+            {'gzip': 1.0, 'br': 0.5, '*': 0.0}
+        )
+
+    def test_negotiate(self):
+        negotiate = compression.negotiate
+        self.assertEqual(negotiate('gzip', ('br', 'gzip')), 'gzip')
+        self.assertEqual(negotiate('gzip;q=0', ('gzip',)), None)
+        self.assertEqual(negotiate('identity', ('gzip',)), None)
+        self.assertEqual(negotiate('', ('gzip',)), None)
+        self.assertEqual(negotiate('*', ('gzip',)), 'gzip')
+        # assert unknown encodings are never chosen
+        self.assertEqual(negotiate('lzma', ('lzma', 'gzip')), None)
+
+    @unittest.skipIf(compression.brotli is None, 'brotli is not installed')
+    def test_negotiate_by_quality_then_preference(self):
+        negotiate = compression.negotiate
+        self.assertEqual(negotiate('gzip, br', ('br', 'gzip')), 'br')
+        self.assertEqual(negotiate('gzip, br;q=0.5', ('br', 'gzip')), 'gzip')
+
+    def test_gzip_is_deterministic(self):
+        content = b'{"name": "item"}' * 100
+        body = compression.gzip_compress(content, 6)
+        self.assertEqual(body, compression.gzip_compress(content, 6))
+        self.assertEqual(gzip.decompress(body), content)
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = compression.CompressedCache(max_bytes=10)
+        cache.set('a', b'12345')
+        cache.set('b', b'12345')
+        cache.get('a')
+        cache.set('c', b'12345')
+        # assert b was evicted to make room for c
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), b'12345')
+        self.assertEqual(cache.size, 10)
+
+    def test_run_compression(self):
+        results = benchmark.run_compression(items=10, repeat=2)
+        self.assertEqual(
+            [result['encoding'] for result in results],
+            list(compression.CODECS)
+        )
+        for result in results:
+            self.assertLess(result['bytes'], result['content_bytes'])
+        # assert the bodies compressed by the benchmark are not kept
+        self.assertFalse(compression.cache.entries)
+
+
+@override_settings(COMPRESSION={
+    'ENABLED': True,
+    'MIN_SIZE': 200,
+    'ENCODINGS': ('br', 'zstd', 'gzip'),
+    'LEVELS': {'br': 4, 'zstd': 3, 'gzip': 6},
+    'TYPES': ('application/json',),
+    'CACHE': ('br', 'gzip')
+})
+class CompressionMiddlewareTest(ItemBaseTest):
+    """
+    Tests for the compression of the api responses
+    """
+
+    def setUp(self):
+        super().setUp()
+        compression.cache.clear()
+        self.url = reverse(
+            'shop_list_api:shopping-lists-all-items',
+            kwargs={'version': 'v1'}
+        )
+        self.login_client('test_user', 'testing')
+
+    def add_items(self, count):
+        for i in range(count):
+            self.item.pk = None
+            self.item.name = 'item {}'.format(i)
+            self.item.save()
+
+    def test_large_response_is_compressed(self):
+        self.add_items(10)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(
+            response['Content-Length'], str(len(response.content))
+        )
+        items = json.loads(gzip.decompress(response.content).decode('utf-8'))
+        self.assertEqual(len(items), 11)
+
+    def test_small_response_is_not_compressed(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(len(json.loads(response.content.decode('utf-8'))), 1)
+
+    def test_not_compressed_without_accept_encoding(self):
+        self.add_items(10)
+        response = self.client.get(self.url)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        # assert caches keep compressed and plain responses apart
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_repeated_response_is_compressed_once(self):
+        self.add_items(10)
+        first = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        second = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(first.content, second.content)
+        # assert the second response reused the compressed body
+        self.assertEqual(compression.cache.misses, 1)
+        self.assertEqual(compression.cache.hits, 1)
+
+    @unittest.skipIf(compression.brotli is None, 'brotli is not installed')
+    def test_brotli(self):
+        self.add_items(10)
+        response = self.client.get(
+            self.url, HTTP_ACCEPT_ENCODING='gzip, deflate, br'
+        )
+        self.assertEqual(response['Content-Encoding'], 'br')
+        items = json.loads(
+            compression.brotli.decompress(response.content).decode('utf-8')
+        )
+        self.assertEqual(len(items), 11)
+
+    @unittest.skipIf(compression.zstandard is None,
+                     'zstandard is not installed')
+    def test_zstd(self):
+        self.add_items(10)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='zstd')
+        self.assertEqual(response['Content-Encoding'], 'zstd')
+        # assert zstd bodies are not cached
+        self.assertEqual(compression.cache.misses, 0)
+        content = compression.zstandard.ZstdDecompressor().decompress(
+            response.content
+        )
+        self.assertEqual(len(json.loads(content.decode('utf-8'))), 11)
@@ -0,0 +1,188 @@
+from unittest import mock
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.views import status
+from api import concurrency
+from api.models import ShoppingList, Item
+from api.tests.base import ItemBaseTest
+
+
+class ItemConcurrencyTest(ItemBaseTest):
+    """
+    Tests for the ETag and If-Match headers of /shoppinglists/items/id/
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse(
+            'shop_list_api:shopping-lists-items-detail',
+            kwargs={'version': 'v1', 'item_id': self.item.id}
+        )
+        self.login_client('test_user', 'testing')
+
+    def put(self, name, **headers):
+        return self.client.put(
+            self.url, {'name': name, 'description': 'updated'},
+            format='json', **headers
+        )
+
+    def test_get_sends_the_version(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['ETag'], '"1"')
+
+    def test_update_with_the_current_version(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.put('renamed', HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['ETag'], '"2"')
+        item = Item.objects.get(id=self.item.id)
+        self.assertEqual((item.name, item.version), ('renamed', 2))
+        # assert the item is checked and written by a single UPDATE
+        statements = [
+            query['sql'] for query in context.captured_queries
+            if 'api_item' in query['sql']
+        ]
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith('UPDATE'))
+
+    def test_update_with_a_stale_version(self):
+        self.put('first edit', HTTP_IF_MATCH='"1"')
+        response = self.put('second edit', HTTP_IF_MATCH='"1"')
+        # assert status code is 412 PRECONDITION FAILED
+        self.assertEqual(
+            response.status_code, status.HTTP_412_PRECONDITION_FAILED
+        )
+        # assert the first edit is kept
+        self.assertEqual(Item.objects.get(id=self.item.id).name, 'first edit')
+        # assert a tag that is not a version never matches
+        response = self.put('third edit', HTTP_IF_MATCH='"abc"')
+        self.assertEqual(
+            response.status_code, status.HTTP_412_PRECONDITION_FAILED
+        )
+
+    def test_weak_and_wildcard_tags_match(self):
+        response = self.put('weak', HTTP_IF_MATCH='W/"1"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.put('any', HTTP_IF_MATCH='*')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Item.objects.get(id=self.item.id).version, 3)
+
+    def test_update_without_if_match(self):
+        response = self.put('renamed')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # assert the new version is sent without reading the item
+        self.assertEqual(response['ETag'], '"2"')
+        self.assertEqual(Item.objects.get(id=self.item.id).version, 2)
+
+    def test_update_matching_one_of_several_versions(self):
+        response = self.put('renamed', HTTP_IF_MATCH='"3", "1"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['ETag'], '"2"')
+
+    def test_update_on_a_database_without_returning(self):
+        with mock.patch.object(
+                concurrency, 'returns_from_update', return_value=False):
+            response = self.put('renamed', HTTP_IF_MATCH='"1"')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            # assert the version written is read back
+            self.assertEqual(response['ETag'], '"2"')
+            response = self.put('stale', HTTP_IF_MATCH='"1"')
+            self.assertEqual(
+                response.status_code, status.HTTP_412_PRECONDITION_FAILED
+            )
+            response = self.put('abc', HTTP_IF_MATCH='"abc"')
+        self.assertEqual(
+            response.status_code, status.HTTP_412_PRECONDITION_FAILED
+        )
+        self.assertEqual(Item.objects.get(id=self.item.id).name, 'renamed')
+
+    def test_item_of_another_user_is_not_found(self):
+        self.login_client('other_test_user', 'other_testing')
+        response = self.put('taken', HTTP_IF_MATCH='"1"')
+        # assert status code is 404 NOT FOUND, not 412
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ShoppingListConcurrencyTest(ItemBaseTest):
+    """
+    Tests for the ETag and If-Match headers of /shoppinglists/id/
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.list_id = self.get_a_shopping_list_id()
+        self.url = reverse(
+            'shop_list_api:shop-list-api-shopping-lists-detail',
+            kwargs={'version': 'v1', 'pk': self.list_id}
+        )
+        self.login_client('test_user', 'testing')
+
+    def put(self, name, **headers):
+        return self.client.put(
+            self.url, {'name': name}, format='json', **headers
+        )
+
+    def test_get_sends_the_version(self):
+        response = self.client.get(self.url, {'fields': 'name'})
+        self.assertEqual(response['ETag'], '"1"')
+        self.assertEqual(response.data, {'name': 'test_list_1'})
+
+    def test_update_with_the_current_version(self):
+        response = self.put('renamed', HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['version'], 2)
+        self.assertEqual(response['ETag'], '"2"')
+        self.assertEqual(ShoppingList.objects.get(id=self.list_id).version, 2)
+
+    def test_update_with_a_stale_version(self):
+        self.put('first edit', HTTP_IF_MATCH='"1"')
+        response = self.put('second edit', HTTP_IF_MATCH='"1"')
+        # assert status code is 412 PRECONDITION FAILED
+        self.assertEqual(
+            response.status_code, status.HTTP_412_PRECONDITION_FAILED
+        )
+        self.assertEqual(
+            ShoppingList.objects.get(id=self.list_id).name, 'first edit'
+        )
+
+    def test_list_changed_after_it_was_read(self):
+        # another request updates the list between the read and the write
+        original = concurrency.conditional_update
+
+        def changed_first(queryset, pk, versions, **values):
+            ShoppingList.objects.filter(pk=pk).update(version=5)
+            return original(queryset, pk, versions, **values)
+
+        with mock.patch(
+                'api.views.shop_list_views.conditional_update',
+                changed_first):
+            response = self.put('renamed')
+        self.assertEqual(
+            response.status_code, status.HTTP_412_PRECONDITION_FAILED
+        )
+        self.assertEqual(
+            ShoppingList.objects.get(id=self.list_id).name, 'test_list_1'
+        )
+
+    def test_unchanged_list_is_not_written(self):
+        response = self.put('test_list_1', HTTP_IF_MATCH='"1"')
+        self.assertEqual(response['ETag'], '"1"')
+        self.assertEqual(ShoppingList.objects.get(id=self.list_id).version, 1)
+
+
+class IfMatchTest(ItemBaseTest):
+    """
+    Tests for the If-Match parsing
+    """
+
+    def versions(self, header):
+        request = self.client.get('/').wsgi_request
+        request.META['HTTP_IF_MATCH'] = header
+        return concurrency.if_match_versions(request)
+
+    def test_if_match_versions(self):
+        self.assertEqual(self.versions('"3"'), [3])
+        self.assertEqual(self.versions('"3", W/"4"'), [3, 4])
+        self.assertIsNone(self.versions('*'))
+        self.assertEqual(self.versions('"abc"'), [])
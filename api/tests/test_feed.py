@@ -0,0 +1,291 @@
+import datetime
+import threading
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.views import status
+from api import feed
+from api.models import ChangeEvent, FeedListener, Item
+from api.tests.base import ItemBaseTest
+
+
+class ChangeFeedTest(TestCase):
+    """
+    Tests for the change feed on the change event table
+    """
+
+    def setUp(self):
+        self.user_ids = [
+            User.objects.create_user(username=name).id
+            for name in ('one', 'two')
+        ]
+        self.feed = feed.ChangeFeed(max_events=3, poll_interval=60)
+
+    def test_events_are_indexed_by_user(self):
+        one, two = self.user_ids
+        start = self.feed.changes(one, None).cursor
+        self.feed.publish([one, two], {'id': 1})
+        self.feed.publish([two], {'id': 2})
+        changes = self.feed.changes(one, start)
+        self.assertEqual(changes.events, [{'id': 1}])
+        self.assertFalse(changes.reset)
+        self.assertEqual(
+            self.feed.changes(two, start).events, [{'id': 1}, {'id': 2}]
+        )
+        # assert the returned cursor is after the events
+        self.assertEqual(self.feed.changes(one, changes.cursor).events, [])
+
+    def test_unknown_cursors_reset(self):
+        one = self.user_ids[0]
+        self.feed.publish([one], {'id': 1})
+        future = str(int(self.feed.changes(one, None).cursor) + 10)
+        for cursor in (future, 'garbage', '-1', '6807bb82e5bd-1'):
+            self.assertTrue(self.feed.changes(one, cursor).reset, cursor)
+
+    def test_missed_events_reset(self):
+        one = self.user_ids[0]
+        start = self.feed.changes(one, None).cursor
+        for event_id in range(4):
+            self.feed.publish([one], {'id': event_id})
+        # assert a client behind the events sent at once is reset
+        self.assertTrue(self.feed.changes(one, start).reset)
+
+    def test_expired_events_reset(self):
+        one, two = self.user_ids
+        self.feed.publish([two], {'id': 1})
+        start = self.feed.changes(one, None).cursor
+        self.feed.publish([one], {'id': 2})
+        ChangeEvent.objects.update(
+            created_on=timezone.now() - datetime.timedelta(days=2)
+        )
+        output = StringIO()
+        call_command('purge_change_events', stdout=output)
+        self.assertIn('deleted 2 expired events', output.getvalue())
+        # assert a client whose cursor expired is reset
+        self.assertTrue(self.feed.changes(one, start).reset)
+
+    def test_follow(self):
+        one = self.user_ids[0]
+        # assert a user followed for the first time may have missed
+        # events, the row is not written again for a while
+        self.assertTrue(self.feed.follow(one))
+        with self.assertNumQueries(0):
+            self.assertFalse(self.feed.follow(one))
+        listener = FeedListener.objects.get(user_id=one)
+        # assert a longer follow, e.g of an autocomplete index, is not
+        # shortened
+        self.assertFalse(self.feed.follow(one, 3600))
+        self.feed.listening.clear()
+        self.assertFalse(self.feed.follow(one))
+        self.assertGreater(
+            FeedListener.objects.get(user_id=one).until, listener.until
+        )
+        # assert a user no longer followed is followed again
+        FeedListener.objects.update(until=timezone.now())
+        self.feed.listening.clear()
+        self.assertTrue(self.feed.follow(one))
+        call_command('purge_change_events', stdout=StringIO())
+        self.assertTrue(FeedListener.objects.exists())
+
+    def test_wait_times_out(self):
+        one = self.user_ids[0]
+        start = self.feed.changes(one, None).cursor
+        changes = self.feed.wait(one, start, 0.01)
+        self.assertEqual(changes.events, [])
+        self.assertFalse(changes.reset)
+        self.assertFalse(self.feed.waiters)
+
+
+class ChangeFeedProcessesTest(TransactionTestCase):
+    """
+    Tests for waiting on the change feed while another thread, or
+    another process, publishes
+    """
+
+    def setUp(self):
+        self.user_id = User.objects.create_user(username='one').id
+
+    def publish_later(self, change_feed):
+        publisher = threading.Timer(
+            0.05, change_feed.publish, args=([self.user_id], {'id': 1})
+        )
+        publisher.start()
+        self.addCleanup(publisher.join)
+
+    def test_wait_wakes_on_publish(self):
+        change_feed = feed.ChangeFeed(poll_interval=60)
+        start = change_feed.changes(self.user_id, None).cursor
+        self.publish_later(change_feed)
+        changes = change_feed.wait(self.user_id, start, 5)
+        self.assertEqual(changes.events, [{'id': 1}])
+        self.assertFalse(change_feed.waiters)
+
+    def test_wait_wakes_on_events_of_other_processes(self):
+        # every process has its own feed, the cursor of one is valid
+        # on the other
+        waiting = feed.ChangeFeed(poll_interval=0.05)
+        publishing = feed.ChangeFeed(poll_interval=60)
+        start = publishing.changes(self.user_id, None).cursor
+        self.publish_later(publishing)
+        changes = waiting.wait(self.user_id, start, 5)
+        self.assertEqual(changes.events, [{'id': 1}])
+        self.assertEqual(
+            publishing.changes(self.user_id, changes.cursor).events, []
+        )
+
+
+@mock.patch('api.feed.transaction.on_commit', lambda func: func())
+class ChangesViewTest(ItemBaseTest):
+    """
+    Tests for the /changes/ endpoints
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse(
+            'shop_list_api:shop-list-api-changes', kwargs={'version': 'v1'}
+        )
+        self.list_id = self.get_a_shopping_list_id()
+        # the users followed in the previous tests were rolled back
+        feed.feed.listening.clear()
+
+    def poll(self, cursor=None):
+        params = {'timeout': 0}
+        if cursor is not None:
+            params['cursor'] = cursor
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_changes_with_anonymous_user(self):
+        response = self.client.get(self.url)
+        # assert status code is 401 UNAUTHORIZED
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_item_changes(self):
+        self.login_client('test_user', 'testing')
+        cursor = self.poll()['cursor']
+        self.client.post(
+            reverse('shop_list_api:shopping-lists-items', kwargs={
+                'version': 'v1', 'list_id': self.list_id}),
+            {'name': 'milk'}, format='json'
+        )
+        item_id = Item.objects.get(name='milk').id
+        item_url = reverse('shop_list_api:shopping-lists-items-detail',
+                           kwargs={'version': 'v1', 'item_id': item_id})
+        self.client.put(item_url, {'name': 'oat milk'}, format='json')
+        self.client.delete(item_url)
+        changes = self.poll(cursor)
+        self.assertEqual(changes['events'], [
+            {'type': 'item', 'action': 'created', 'id': item_id,
+             'list_id': self.list_id},
+            {'type': 'item', 'action': 'updated', 'id': item_id,
+             'list_id': self.list_id},
+            {'type': 'item', 'action': 'deleted', 'id': item_id,
+             'list_id': self.list_id},
+        ])
+        self.assertFalse(changes['reset'])
+        self.assertEqual(self.poll(changes['cursor'])['events'], [])
+
+    def test_item_move_changes(self):
+        self.login_client('test_user', 'testing')
+        cursor = self.poll()['cursor']
+        self.client.put(
+            reverse('shop_list_api:shopping-lists-items-position', kwargs={
+                'version': 'v1', 'item_id': self.item.id}),
+            {'after': None}, format='json'
+        )
+        self.assertEqual(self.poll(cursor)['events'], [
+            {'type': 'item', 'action': 'updated', 'id': self.item.id,
+             'list_id': self.list_id},
+        ])
+
+    def test_list_changes(self):
+        self.login_client('test_user', 'testing')
+        cursor = self.poll()['cursor']
+        list_url = reverse('shop_list_api:shop-list-api-shopping-lists-detail',
+                           kwargs={'version': 'v1', 'pk': self.list_id})
+        self.client.put(list_url, {'name': 'renamed'}, format='json')
+        self.client.delete(list_url)
+        actions = [event['action'] for event in self.poll(cursor)['events']]
+        self.assertEqual(actions, ['updated', 'deleted'])
+
+    def test_changes_of_other_users_are_not_sent(self):
+        self.login_client('other_test_user', 'other_testing')
+        cursor = self.poll()['cursor']
+        Item.objects.create(name='eggs', the_list_id=self.list_id)
+        self.assertEqual(self.poll(cursor)['events'], [])
+
+    def test_rolled_back_changes_are_not_sent(self):
+        self.login_client('test_user', 'testing')
+        cursor = self.poll()['cursor']
+        with mock.patch('api.feed.transaction.on_commit'):
+            Item.objects.create(name='eggs', the_list_id=self.list_id)
+        self.assertEqual(self.poll(cursor)['events'], [])
+
+    def test_stale_cursor_resets(self):
+        self.login_client('test_user', 'testing')
+        changes = self.poll('another-process-1')
+        self.assertTrue(changes['reset'])
+
+    def test_changes_of_users_not_followed_are_not_published(self):
+        Item.objects.create(name='eggs', the_list_id=self.list_id)
+        self.assertFalse(ChangeEvent.objects.exists())
+        self.login_client('test_user', 'testing')
+        cursor = self.poll()['cursor']
+        # assert the events are published once the user is followed
+        Item.objects.create(name='milk', the_list_id=self.list_id)
+        self.assertEqual(len(self.poll(cursor)['events']), 1)
+        # assert a client of a user no longer followed is reset, the
+        # events were not published meanwhile
+        FeedListener.objects.update(until=timezone.now())
+        feed.feed.listening.clear()
+        Item.objects.create(name='bread', the_list_id=self.list_id)
+        changes = self.poll(cursor)
+        self.assertTrue(changes['reset'])
+        self.assertFalse(self.poll(changes['cursor'])['reset'])
+
+    def test_waiting_clients_are_limited(self):
+        self.login_client('test_user', 'testing')
+        cursor = self.poll()['cursor']
+        with mock.patch.object(feed.feed, 'max_waiters', 0):
+            response = self.client.get(
+                self.url, {'cursor': cursor, 'timeout': 1}
+            )
+            self.assertEqual(
+                response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+            self.assertEqual(response['Retry-After'], '5')
+            response = self.client.get(reverse(
+                'shop_list_api:shop-list-api-changes-stream',
+                kwargs={'version': 'v1'}
+            ), HTTP_ACCEPT='text/event-stream')
+            self.assertEqual(
+                response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+            # assert reading the changes without waiting is served
+            self.assertEqual(self.poll(cursor)['events'], [])
+        self.assertEqual(feed.feed.waiting, 0)
+
+    @override_settings(FEED=dict(
+        MAX_EVENTS=100, POLL_INTERVAL=1, TTL=86400, POLL_TIMEOUT=25,
+        STREAM_DURATION=0.2, HEARTBEAT=0.05))
+    def test_event_stream(self):
+        self.login_client('test_user', 'testing')
+        cursor = self.poll()['cursor']
+        Item.objects.create(name='eggs', the_list_id=self.list_id)
+        response = self.client.get(
+            reverse('shop_list_api:shop-list-api-changes-stream',
+                    kwargs={'version': 'v1'}),
+            HTTP_ACCEPT='text/event-stream', HTTP_LAST_EVENT_ID=cursor
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('event: change\ndata: {"type": "item"', body)
+        self.assertIn(': keep-alive', body)
+        # assert the stream gave its waiting slot back
+        self.assertEqual(feed.feed.waiting, 0)
@@ -0,0 +1,135 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.views import status
+from api.tests.base import ItemBaseTest
+
+
+class FieldSelectionTest(ItemBaseTest):
+    """
+    Tests for the ?fields= query parameter of the read endpoints
+    """
+
+    def get(self, name, fields, **kwargs):
+        # get an endpoint with a field selection, return the
+        # response and the SELECT statements it ran, leaving out
+        # the one that authenticates the user
+        kwargs['version'] = 'v1'
+        url = reverse('shop_list_api:' + name, kwargs=kwargs)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, {'fields': fields})
+        selects = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT') and
+            '"auth_user"."password"' not in query['sql']
+        ]
+        return response, selects
+
+    def test_all_items(self):
+        self.login_client('test_user', 'testing')
+        response, selects = self.get(
+            'shopping-lists-all-items', 'id,bought'
+        )
+        # assert only the selected fields are served and fetched
+        self.assertEqual(
+            response.data, [{'id': self.item.id, 'bought': False}]
+        )
+        self.assertNotIn('"api_item"."name"', selects[0])
+        self.assertNotIn('"api_item"."description"', selects[0])
+
+    def test_list_items(self):
+        self.login_client('test_user', 'testing')
+        response, selects = self.get(
+            'shopping-lists-items', 'name',
+            list_id=self.get_a_shopping_list_id()
+        )
+        self.assertEqual(response.data, [{'name': 'test item 1'}])
+        self.assertNotIn('"api_item"."description"', selects[0])
+
+    def test_item_detail(self):
+        self.login_client('test_user', 'testing')
+        response, selects = self.get(
+            'shopping-lists-items-detail', 'id,created_on',
+            item_id=self.item.id
+        )
+        self.assertEqual(set(response.data), {'id', 'created_on'})
+        self.assertNotIn('"api_item"."name"', selects[0])
+
+    def test_item_search(self):
+        self.login_client('test_user', 'testing')
+        url = reverse(
+            'shop_list_api:shopping-lists-items-search',
+            kwargs={'version': 'v1'}
+        )
+        response = self.client.get(url, {'q': 'test', 'fields': 'name'})
+        self.assertEqual(response.data['results'], [{'name': 'test item 1'}])
+
+    def test_lists(self):
+        self.login_client('test_user', 'testing')
+        response, selects = self.get(
+            'shop-list-api-shopping-lists', 'name'
+        )
+        self.assertEqual(
+            response.data, [{'name': 'test_list_1'}, {'name': 'test_list_2'}]
+        )
+        self.assertNotIn('"api_shoppinglist"."description"', selects[0])
+
+    def test_list_detail(self):
+        self.login_client('test_user', 'testing')
+        response, _ = self.get(
+            'shop-list-api-shopping-lists-detail', 'id,updated_on',
+            pk=self.get_a_shopping_list_id()
+        )
+        self.assertEqual(set(response.data), {'id', 'updated_on'})
+
+    def test_list_search(self):
+        self.login_client('test_user', 'testing')
+        url = reverse(
+            'shop_list_api:shopping-lists-search',
+            kwargs={'version': 'v1'}
+        )
+        response = self.client.get(url, {'q': 'list_2', 'fields': 'id'})
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(set(response.data['results'][0]), {'id'})
+
+    def test_users(self):
+        self.login_client('test_user', 'testing')
+        response, selects = self.get(
+            'shop-list-api-all-users', 'email'
+        )
+        self.assertEqual(
+            sorted(user['email'] for user in response.data),
+            ['other_test@mail.com', 'test@mail.com']
+        )
+        self.assertEqual(set(response.data[0]), {'email'})
+        # assert the profiles are not joined when not selected
+        self.assertNotIn('api_userprofile', selects[0])
+
+    def test_user_detail(self):
+        self.login_client('test_user', 'testing')
+        response, selects = self.get(
+            'shop-list-api-user', 'first_name,description',
+            username='test_user'
+        )
+        self.assertEqual(response.data, {
+            'first_name': 'test',
+            'description': 'i am a test user'
+        })
+        # assert the profile is joined in the same query
+        self.assertEqual(len(selects), 1)
+        self.assertNotIn('"auth_user"."email"', selects[0])
+
+    def test_unknown_field(self):
+        self.login_client('test_user', 'testing')
+        response, _ = self.get('shopping-lists-all-items', 'id,password')
+        # assert status code is 400 BAD REQUEST
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('password', response.data['fields'])
+
+    def test_default_fields(self):
+        self.login_client('test_user', 'testing')
+        response, _ = self.get('shopping-lists-all-items', '')
+        # assert the item list fields are served without a selection
+        self.assertEqual(
+            set(response.data[0]), {'id', 'name', 'description', 'bought'}
+        )
@@ -0,0 +1,156 @@
+import datetime
+from unittest import mock
+from io import StringIO
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.views import status
+from api import idempotency
+from api.models import IdempotencyKey, ShoppingList, Item
+from api.tests.base import ItemBaseTest
+
+
+class IdempotencyKeyTest(ItemBaseTest):
+    """
+    Tests for the Idempotency-Key header of the create endpoints
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.lists_url = reverse(
+            'shop_list_api:shop-list-api-shopping-lists',
+            kwargs={'version': 'v1'}
+        )
+        self.items_url = reverse(
+            'shop_list_api:shopping-lists-items',
+            kwargs={'version': 'v1', 'list_id': self.get_a_shopping_list_id()}
+        )
+
+    def post(self, url, data, key):
+        return self.client.post(
+            url, data, format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retried_list_create_is_replayed(self):
+        self.login_client('test_user', 'testing')
+        first = self.post(self.lists_url, {'name': 'groceries'}, 'key-1')
+        retry = self.post(self.lists_url, {'name': 'groceries'}, 'key-1')
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(retry.status_code, status.HTTP_200_OK)
+        # assert the retry got the same response without a new list
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(
+            ShoppingList.objects.filter(name='groceries').count(), 1
+        )
+
+    def test_retried_item_create_is_replayed(self):
+        self.login_client('test_user', 'testing')
+        first = self.post(self.items_url, {'name': 'milk'}, 'key-1')
+        retry = self.post(self.items_url, {'name': 'milk'}, 'key-1')
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(Item.objects.filter(name='milk').count(), 1)
+
+    def test_requests_without_a_key_are_not_stored(self):
+        self.login_client('test_user', 'testing')
+        self.client.post(self.lists_url, {'name': 'groceries'}, format='json')
+        self.client.post(self.lists_url, {'name': 'groceries'}, format='json')
+        self.assertEqual(
+            ShoppingList.objects.filter(name='groceries').count(), 2
+        )
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_key_reused_for_another_request(self):
+        self.login_client('test_user', 'testing')
+        self.post(self.lists_url, {'name': 'groceries'}, 'key-1')
+        response = self.post(self.lists_url, {'name': 'hardware'}, 'key-1')
+        # assert status code is 422 UNPROCESSABLE ENTITY
+        self.assertEqual(
+            response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+        self.assertFalse(ShoppingList.objects.filter(name='hardware').exists())
+
+    def test_keys_are_scoped_to_the_user(self):
+        self.login_client('test_user', 'testing')
+        self.post(self.lists_url, {'name': 'groceries'}, 'key-1')
+        self.login_client('other_test_user', 'other_testing')
+        response = self.post(self.lists_url, {'name': 'groceries'}, 'key-1')
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(
+            ShoppingList.objects.filter(name='groceries').count(), 2
+        )
+
+    def test_failed_requests_are_not_stored(self):
+        self.login_client('test_user', 'testing')
+        response = self.post(self.lists_url, {'name': ''}, 'key-1')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        # assert the key can be used once the request is fixed
+        response = self.post(self.lists_url, {'name': 'groceries'}, 'key-1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_invalid_key(self):
+        self.login_client('test_user', 'testing')
+        for key in ('', 'k' * 256):
+            response = self.post(self.lists_url, {'name': 'groceries'}, key)
+            # assert status code is 400 BAD REQUEST
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST
+            )
+        self.assertFalse(
+            ShoppingList.objects.filter(name='groceries').exists()
+        )
+
+    def test_concurrent_request_is_rolled_back(self):
+        self.login_client('test_user', 'testing')
+        original_create = IdempotencyKey.objects.create
+
+        def committed_first(**kwargs):
+            # another request stored the key after this one looked it up
+            original_create(**kwargs)
+            raise IntegrityError('duplicate key')
+
+        with mock.patch.object(
+                IdempotencyKey.objects, 'create', committed_first):
+            response = self.post(
+                self.lists_url, {'name': 'groceries'}, 'key-1'
+            )
+        # assert status code is 409 CONFLICT and nothing was created
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(
+            ShoppingList.objects.filter(name='groceries').exists()
+        )
+
+    @override_settings(IDEMPOTENCY={'TTL': 60})
+    def test_expired_keys(self):
+        self.login_client('test_user', 'testing')
+        self.post(self.lists_url, {'name': 'groceries'}, 'key-1')
+        IdempotencyKey.objects.update(
+            created_on=timezone.now() - datetime.timedelta(seconds=61)
+        )
+        # assert an expired key runs the request again
+        response = self.post(self.lists_url, {'name': 'groceries'}, 'key-1')
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(
+            ShoppingList.objects.filter(name='groceries').count(), 2
+        )
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+    @override_settings(IDEMPOTENCY={'TTL': 60})
+    def test_purge_expired_keys(self):
+        self.login_client('test_user', 'testing')
+        self.post(self.lists_url, {'name': 'old'}, 'key-1')
+        IdempotencyKey.objects.update(
+            created_on=timezone.now() - datetime.timedelta(seconds=61)
+        )
+        self.post(self.lists_url, {'name': 'new'}, 'key-2')
+        output = StringIO()
+        call_command('purge_idempotency_keys', stdout=output)
+        self.assertIn('deleted 1 expired keys', output.getvalue())
+        self.assertEqual(
+            list(IdempotencyKey.objects.values_list('key', flat=True)),
+            ['key-2']
+        )
+        self.assertEqual(idempotency.purge_expired_keys(), 0)
@@ -1,5 +1,6 @@
 import json
 from rest_framework.views import status
+from api.models import Item
 from api.tests.base import ItemBaseTest
 from django.urls import reverse
 
@@ -266,4 +267,87 @@ class ItemsTest(ItemBaseTest):
         # assert data is as expected
         self.assertEqual(len(response.data['results']), 1)
         # assert status code is 200 OK
-        self.assertEqual(response.status_code, status.HTTP_200_OK)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ItemOwnershipTest(ItemBaseTest):
+    """
+    Tests that items on lists of other users can not be accessed
+    """
+
+    def item_url(self):
+        return reverse(
+            'shop_list_api:shopping-lists-items-detail',
+            kwargs={
+                'version': 'v1',
+                'item_id': self.get_a_item_id()
+            }
+        )
+
+    def list_items_url(self):
+        return reverse(
+            'shop_list_api:shopping-lists-items',
+            kwargs={
+                'version': 'v1',
+                'list_id': self.get_a_shopping_list_id()
+            }
+        )
+
+    def test_get_item_of_another_user(self):
+        self.login_client('other_test_user', 'other_testing')
+        response = self.client.get(self.item_url())
+        # assert status code is 404 NOT FOUND
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_update_item_of_another_user(self):
+        self.login_client('other_test_user', 'other_testing')
+        response = self.client.put(
+            self.item_url(),
+            data=json.dumps({'name': 'not yours'}),
+            content_type='application/json'
+        )
+        # assert status code is 404 NOT FOUND
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        # assert the item is unchanged
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.name, 'test item 1')
+
+    def test_delete_item_of_another_user(self):
+        self.login_client('other_test_user', 'other_testing')
+        response = self.client.delete(self.item_url())
+        # assert status code is 404 NOT FOUND
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        # assert the item still exists
+        self.assertTrue(Item.objects.filter(id=self.item.id).exists())
+
+    def test_get_items_on_list_of_another_user(self):
+        self.login_client('other_test_user', 'other_testing')
+        response = self.client.get(self.list_items_url())
+        # assert no items are returned
+        self.assertEqual(len(response.data), 0)
+        # assert status code is 200 OK
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_add_item_to_list_of_another_user(self):
+        self.login_client('other_test_user', 'other_testing')
+        response = self.client.post(
+            self.list_items_url(),
+            data=json.dumps({'name': 'not yours'}),
+            content_type='application/json'
+        )
+        # assert status code is 404 NOT FOUND
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        # assert no item was added
+        self.assertEqual(Item.objects.filter(name='not yours').count(), 0)
+
+    def test_ownership_check_adds_no_queries(self):
+        # the item is looked up and the membership checked in one
+        # query, the other query authenticates the user
+        self.login_client('test_user', 'testing')
+        with self.assertNumQueries(2):
+            response = self.client.get(self.item_url())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # the delete reads the members of the list to notify them
+        with self.assertNumQueries(3):
+            response = self.client.delete(self.item_url())
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
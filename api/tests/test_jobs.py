@@ -0,0 +1,146 @@
+import datetime
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from api import jobs
+from api.models import Job
+
+# calls of the test tasks
+calls = []
+
+
+@jobs.task
+def record(*args, **kwargs):
+    calls.append((args, kwargs))
+
+
+@jobs.task
+def explode():
+    raise RuntimeError('boom')
+
+
+@jobs.task
+def outlive_timeout(fail=False):
+    # another worker claims the job while it is still running
+    Job.objects.update(
+        run_after=timezone.now() - datetime.timedelta(seconds=1)
+    )
+    jobs.claim(1, 60)
+    if fail:
+        raise RuntimeError('boom')
+
+
+def not_a_task():
+    pass
+
+
+@override_settings(JOBS={
+    'VISIBILITY_TIMEOUT': 60,
+    'MAX_ATTEMPTS': 2,
+    'RETRY_DELAY': 10
+})
+class JobQueueTest(TestCase):
+    """
+    Tests for the background job queue, the worker runs in-process
+    """
+
+    def setUp(self):
+        del calls[:]
+        self.worker = jobs.Worker()
+
+    @staticmethod
+    def make_due(job):
+        # move the job to the past so that it is picked up again
+        Job.objects.filter(id=job.id).update(
+            run_after=timezone.now() - datetime.timedelta(seconds=1)
+        )
+
+    def test_enqueue(self):
+        job = jobs.enqueue(record, 1, 'two', three=3)
+        # assert the job is queued with its arguments
+        self.assertEqual(job.task, 'api.tests.test_jobs.record')
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.max_attempts, 2)
+
+    def test_enqueue_a_function_that_is_not_a_task(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue(not_a_task)
+
+    def test_worker_runs_and_deletes_jobs(self):
+        jobs.enqueue(record, 1, 'two', three=3)
+        jobs.enqueue(record, 4)
+        # assert both jobs ran in order and were deleted
+        self.assertEqual(self.worker.run_once(), 1)
+        self.assertEqual(self.worker.run_once(), 1)
+        self.assertEqual(self.worker.run_once(), 0)
+        self.assertEqual(calls, [((1, 'two'), {'three': 3}), ((4,), {})])
+        self.assertFalse(Job.objects.exists())
+
+    def test_failed_job_is_retried_then_failed(self):
+        job = jobs.enqueue(explode)
+        with self.assertLogs('api.jobs', 'ERROR'):
+            self.worker.run_once()
+        job.refresh_from_db()
+        # assert the job is queued again after the retry delay
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('boom', job.last_error)
+        self.assertEqual(self.worker.run_once(), 0)
+        self.make_due(job)
+        with self.assertLogs('api.jobs', 'ERROR'):
+            self.worker.run_once()
+        job.refresh_from_db()
+        # assert the job failed once it used up its attempts
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_running_job_is_hidden_until_visibility_timeout(self):
+        job = jobs.enqueue(record)
+        # a worker claims the job and dies before running it
+        self.assertEqual(jobs.claim(1, 60), [job.id])
+        self.assertEqual(jobs.claim(1, 60), [])
+        # assert the job comes back once the timeout expired
+        self.make_due(job)
+        self.assertEqual(jobs.claim(1, 60), [job.id])
+        self.make_due(job)
+        # assert the job failed after timing out on its last attempt
+        self.assertEqual(jobs.claim(1, 60), [])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+    def test_run_that_outlived_its_claim_leaves_the_job(self):
+        finished = jobs.enqueue(outlive_timeout)
+        self.worker.run_once()
+        finished.refresh_from_db()
+        failed = jobs.enqueue(outlive_timeout, fail=True)
+        Job.objects.filter(id=finished.id).delete()
+        with self.assertLogs('api.jobs', 'ERROR'):
+            self.worker.run_once()
+        failed.refresh_from_db()
+        for job in (finished, failed):
+            # assert the claim of the other worker was not changed
+            self.assertEqual(job.status, Job.RUNNING)
+            self.assertEqual(job.attempts, 2)
+            self.assertIsNone(job.last_error)
+
+    def test_job_of_unknown_task_is_failed(self):
+        job = Job.objects.create(
+            task='api.tests.test_jobs.not_a_task', run_after=timezone.now()
+        )
+        self.worker.run_once()
+        job.refresh_from_db()
+        # assert the job failed without retrying
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('not a task', job.last_error)
+
+    def test_run_worker_once(self):
+        jobs.enqueue(record, 1)
+        jobs.enqueue(record, 2)
+        output = StringIO()
+        call_command('run_worker', processes=0, once=True, stdout=output)
+        # assert the queued jobs ran
+        self.assertIn('ran 2 jobs', output.getvalue())
+        self.assertEqual(len(calls), 2)
@@ -0,0 +1,73 @@
+from django.urls import reverse
+from rest_framework.views import status
+from api import metrics
+from api.tests.base import ItemBaseTest
+
+
+class PerformanceMiddlewareTest(ItemBaseTest):
+    """
+    Tests for the request timings and the /metrics/ endpoint
+    """
+
+    def setUp(self):
+        super().setUp()
+        metrics.registry.clear()
+
+    def get_items(self):
+        url = reverse(
+            'shop_list_api:shopping-lists-items',
+            kwargs={
+                'version': 'v1',
+                'list_id': self.get_a_shopping_list_id(),
+            }
+        )
+        self.login_client('test_user', 'testing')
+        return self.client.get(url)
+
+    def test_server_timing_header(self):
+        # test the phases of the request are in the Server-Timing header
+        response = self.get_items()
+        header = response['Server-Timing']
+        for phase in ('app;', 'db;', 'serialize;', 'render;', 'total;'):
+            self.assertIn(phase, header)
+        self.assertIn('queries"', header)
+
+    def test_request_timings_are_aggregated(self):
+        # test the request is recorded against its view
+        self.get_items()
+        exposition = metrics.registry.exposition()
+        self.assertIn(
+            'api_request_duration_seconds_count{'
+            'view="shop_list_api:shopping-lists-items",phase="db"} 1',
+            exposition
+        )
+        self.assertIn(
+            'api_request_queries_count{'
+            'view="shop_list_api:shopping-lists-items"} 1',
+            exposition
+        )
+
+    def test_get_metrics(self):
+        # test an admin user can scrape the metrics
+        self.get_items()
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn(
+            b'# TYPE api_request_duration_seconds histogram',
+            response.content
+        )
+
+    def test_get_metrics_with_a_non_admin_user(self):
+        # test a non admin user can not scrape the metrics
+        self.login_client('other_test_user', 'other_testing')
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = metrics.Histogram((1, 5, 10))
+        for value in (0.5, 3, 7, 20):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [1, 2, 3])
+        self.assertEqual(histogram.count, 4)
+        self.assertEqual(histogram.sum, 30.5)
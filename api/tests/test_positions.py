@@ -0,0 +1,139 @@
+import random
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework.views import status
+from api import ranking
+from api.models import Item, ListMembership
+from api.tests.base import ItemBaseTest
+
+
+class RankingTest(SimpleTestCase):
+    """
+    Tests for the ranks that order the items of a list
+    """
+
+    def test_ranks_sort_between_their_bounds(self):
+        ranks = []
+        rng = random.Random(1)
+        for _ in range(2000):
+            index = rng.randint(0, len(ranks))
+            before = ranks[index - 1] if index else None
+            after = ranks[index] if index < len(ranks) else None
+            rank = ranking.rank_between(before, after)
+            self.assertTrue(before is None or before < rank)
+            self.assertTrue(after is None or rank < after)
+            self.assertFalse(rank.endswith('0'))
+            ranks.insert(index, rank)
+        self.assertLessEqual(max(map(len, ranks)), ranking.MAX_LENGTH)
+
+    def test_appended_ranks_stay_short(self):
+        rank = None
+        for _ in range(500):
+            rank = ranking.rank_between(rank, None)
+        self.assertLess(len(rank), 30)
+
+    def test_bounds_out_of_order(self):
+        with self.assertRaises(ValueError):
+            ranking.rank_between('b', 'a')
+
+    def test_spread(self):
+        for count in (0, 1, 35, 36, 1000):
+            ranks = ranking.spread(count)
+            self.assertEqual(len(set(ranks)), count)
+            self.assertEqual(ranks, sorted(ranks))
+        self.assertEqual(ranking.spread(1), ['i'])
+
+
+class ItemPositionTest(ItemBaseTest):
+    """
+    Tests for the order of the items of a list
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.list_id = self.get_a_shopping_list_id()
+        self.items_url = reverse(
+            'shop_list_api:shopping-lists-items',
+            kwargs={'version': 'v1', 'list_id': self.list_id}
+        )
+        self.login_client('test_user', 'testing')
+        for name in ('milk', 'eggs', 'bread'):
+            self.client.post(self.items_url, {'name': name}, format='json')
+        self.ids = dict(Item.objects.values_list('name', 'id'))
+
+    def names(self):
+        response = self.client.get(self.items_url)
+        return [item['name'] for item in response.data]
+
+    def move(self, name, after, **extra):
+        return self.client.put(
+            reverse('shop_list_api:shopping-lists-items-position', kwargs={
+                'version': 'v1', 'item_id': self.ids[name]}),
+            {'after': self.ids.get(after)}, format='json', **extra
+        )
+
+    def test_new_items_go_to_the_end(self):
+        self.assertEqual(
+            self.names(), ['test item 1', 'milk', 'eggs', 'bread']
+        )
+
+    def test_move_item(self):
+        response = self.move('bread', 'test item 1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.names(), ['test item 1', 'bread', 'milk', 'eggs']
+        )
+        self.move('test item 1', None)
+        self.move('milk', None)
+        self.assertEqual(
+            self.names(), ['milk', 'test item 1', 'bread', 'eggs']
+        )
+        self.move('milk', 'eggs')
+        self.assertEqual(
+            self.names(), ['test item 1', 'bread', 'eggs', 'milk']
+        )
+
+    def test_move_updates_one_row(self):
+        # one query authenticates the user, one checks the role and
+        # finds the list, one reads the neighbours and one moves it
+        with self.assertNumQueries(4):
+            self.move('bread', 'milk')
+        self.assertEqual(
+            self.names(), ['test item 1', 'milk', 'bread', 'eggs']
+        )
+
+    def test_items_sharing_a_rank_are_spread(self):
+        # items created before positions existed
+        Item.objects.update(position='')
+        self.move('test item 1', 'milk')
+        self.assertEqual(
+            self.names(), ['milk', 'test item 1', 'eggs', 'bread']
+        )
+        positions = list(Item.objects.values_list('position', flat=True))
+        self.assertEqual(len(set(positions)), 4)
+
+    def test_move_after_an_item_of_another_list(self):
+        other = Item.objects.create(
+            name='other', the_list=self.query_set.get(name='test_list_2')
+        )
+        self.ids[other.name] = other.id
+        response = self.move('milk', other.name)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_move_checks_the_version(self):
+        response = self.move('milk', None, HTTP_IF_MATCH='"7"')
+        self.assertEqual(
+            response.status_code, status.HTTP_412_PRECONDITION_FAILED
+        )
+
+    def test_viewers_cannot_move_items(self):
+        ListMembership.objects.create(
+            user=self.other_user, shopping_list_id=self.list_id,
+            role=ListMembership.VIEWER
+        )
+        self.login_client('other_test_user', 'other_testing')
+        response = self.move('milk', None)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        ListMembership.objects.filter(user=self.other_user).delete()
+        response = self.move('milk', None)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
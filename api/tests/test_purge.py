@@ -0,0 +1,155 @@
+import json
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.views import status
+from api import archive, jobs, purge
+from api.models import ArchivedItem, ShoppingList, Item, Job
+from api.tests.base import ItemBaseTest
+
+
+@override_settings(LIST_PURGE={
+    'ENABLED': True,
+    'THRESHOLD': 5,
+    'BATCH_SIZE': 2
+})
+class ListPurgeTest(ItemBaseTest):
+    """
+    Tests for the background purge of deleted shopping lists
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.the_list = self.query_set.get(name='test_list_1')
+        # the list already holds one test item
+        Item.objects.bulk_create(
+            Item(name='item {}'.format(i), the_list=self.the_list)
+            for i in range(5)
+        )
+        self.url = reverse(
+            'shop_list_api:shop-list-api-shopping-lists-detail',
+            kwargs={
+                'version': 'v1',
+                'pk': self.the_list.id
+            }
+        )
+
+    def test_large_list_is_hidden_until_purged(self):
+        self.login_client('test_user', 'testing')
+        response = self.client.delete(self.url)
+        # assert status code is 204 NO CONTENT
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        # assert the items are kept for the purge
+        self.assertEqual(
+            Item.objects.filter(the_list=self.the_list).count(), 6
+        )
+        # assert the list and its items are no longer served
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(reverse(
+            'shop_list_api:shopping-lists-items-detail',
+            kwargs={'version': 'v1', 'item_id': self.item.id}
+        ))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(reverse(
+            'shop_list_api:shopping-lists-all-items',
+            kwargs={'version': 'v1'}
+        ))
+        self.assertEqual(len(response.data), 0)
+        # assert deleting it again is not found
+        response = self.client.delete(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_purge_deletes_items_in_batches(self):
+        purge.mark_deleted(self.the_list.id, self.user)
+        with CaptureQueriesContext(connection) as context:
+            purged = purge.purge_shopping_list(self.the_list.id)
+        deletes = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith(
+                'DELETE FROM "api_item" WHERE "api_item"."id" IN')
+        ]
+        # assert 6 items were deleted 2 at a time
+        self.assertEqual(purged, 6)
+        self.assertEqual(len(deletes), 3)
+        self.assertFalse(
+            ShoppingList.objects.filter(id=self.the_list.id).exists()
+        )
+
+    def test_purge_skips_lists_that_are_not_deleted(self):
+        # assert nothing is purged
+        self.assertEqual(purge.purge_shopping_list(self.the_list.id), 0)
+        self.assertEqual(
+            Item.objects.filter(the_list=self.the_list).count(), 6
+        )
+
+    def test_small_list_is_deleted_at_once(self):
+        other_list = self.query_set.get(name='test_list_2')
+        url = reverse(
+            'shop_list_api:shop-list-api-shopping-lists-detail',
+            kwargs={'version': 'v1', 'pk': other_list.id}
+        )
+        self.login_client('test_user', 'testing')
+        response = self.client.delete(url)
+        # assert status code is 204 NO CONTENT
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(ShoppingList.objects.filter(id=other_list.id).exists())
+
+    def test_has_many_items(self):
+        self.assertTrue(purge.has_many_items(self.the_list.id, self.user, 6))
+        self.assertFalse(purge.has_many_items(self.the_list.id, self.user, 7))
+        # assert the items of other users are not counted
+        self.assertFalse(
+            purge.has_many_items(self.the_list.id, self.other_user, 1)
+        )
+
+    def test_large_archived_list_is_purged(self):
+        archive.archive_list(self.the_list.id)
+        self.assertTrue(purge.has_many_items(
+            self.the_list.id, self.user, 6, archived=True
+        ))
+        self.assertFalse(purge.has_many_items(self.the_list.id, self.user, 1))
+        self.login_client('test_user', 'testing')
+        response = self.client.delete(self.url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        # assert the archived items are kept for the purge job
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertEqual(
+            ArchivedItem.objects.filter(the_list=self.the_list).count(), 6
+        )
+        jobs.Worker().run_once()
+        self.assertFalse(ArchivedItem.objects.exists())
+        self.assertFalse(
+            ShoppingList.objects.filter(id=self.the_list.id).exists()
+        )
+
+    def test_large_list_delete_queues_a_purge_job(self):
+        self.login_client('test_user', 'testing')
+        self.client.delete(self.url)
+        job = Job.objects.get()
+        # assert the purge of the list was queued
+        self.assertEqual(job.task, 'api.purge.purge_shopping_list')
+        self.assertEqual(json.loads(job.args), [self.the_list.id])
+        # assert the worker purges the list
+        jobs.Worker().run_once()
+        self.assertFalse(Job.objects.exists())
+        self.assertFalse(
+            ShoppingList.objects.filter(id=self.the_list.id).exists()
+        )
+        self.assertFalse(Item.objects.filter(the_list=self.the_list).exists())
+
+    def test_purge_deleted_lists_command(self):
+        purge.mark_deleted(self.the_list.id, self.user)
+        output = StringIO()
+        call_command('purge_deleted_lists', stdout=output)
+        # assert the deleted list was purged
+        self.assertIn(
+            'purged list {} and its 6 items'.format(self.the_list.id),
+            output.getvalue()
+        )
+        self.assertFalse(
+            ShoppingList.objects.filter(id=self.the_list.id).exists()
+        )
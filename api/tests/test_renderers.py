@@ -0,0 +1,112 @@
+import decimal
+import io
+import json
+import unittest
+from unittest import mock
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.views import status
+from api import benchmark, parsers, renderers
+from api.renderers import msgpack
+from api.tests.base import ItemBaseTest
+
+
+class FastJSONTest(SimpleTestCase):
+    """
+    Tests for the orjson backed JSON renderer and parser
+    """
+
+    def setUp(self):
+        self.renderer = renderers.FastJSONRenderer()
+        self.payload = benchmark.item_payload(3)
+
+    def assertSameJSON(self, data, media_type='application/json'):
+        self.assertEqual(
+            self.renderer.render(data, media_type),
+            JSONRenderer().render(data, media_type)
+        )
+
+    def test_renders_like_json_renderer(self):
+        self.assertSameJSON(self.payload)
+        self.assertSameJSON({
+            'price': decimal.Decimal('1.50'),
+            'note': 'line\u2028separator \u00e9',
+            'empty': None
+        })
+
+    def test_falls_back_without_orjson(self):
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertSameJSON(self.payload)
+
+    def test_falls_back_for_indented_output(self):
+        self.assertSameJSON(self.payload, 'application/json; indent=4')
+
+    def test_falls_back_for_large_integers(self):
+        self.assertSameJSON({'big': 2 ** 70})
+
+    def test_parser(self):
+        parser = parsers.FastJSONParser()
+        body = self.renderer.render(self.payload)
+        self.assertEqual(
+            parser.parse(io.BytesIO(body)), json.loads(body.decode('utf-8'))
+        )
+        with self.assertRaises(ParseError):
+            parser.parse(io.BytesIO(b'{"name": '))
+        with self.assertRaises(ParseError):
+            parser.parse(io.BytesIO(b'{"price": NaN}'))
+
+    def test_run_codecs(self):
+        results = benchmark.run_codecs(items=10, repeat=2)
+        codecs = [result['codec'] for result in results]
+        self.assertEqual(codecs[0], 'json')
+        # assert both JSON codecs produce the same bytes
+        for result in results:
+            if result['codec'] == 'orjson':
+                self.assertEqual(result['bytes'], results[0]['bytes'])
+
+
+@unittest.skipIf(msgpack is None, 'msgpack is not installed')
+class MessagePackTest(ItemBaseTest):
+    """
+    Tests for content negotiation of application/msgpack
+    """
+
+    def test_get_items_as_msgpack(self):
+        url = reverse(
+            'shop_list_api:shopping-lists-all-items',
+            kwargs={'version': 'v1'}
+        )
+        self.login_client('test_user', 'testing')
+        json_response = self.client.get(url)
+        response = self.client.get(url, HTTP_ACCEPT='application/msgpack')
+        # assert the same data is served as MessagePack
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(
+            msgpack.unpackb(response.content, raw=False),
+            json.loads(json_response.content.decode('utf-8'))
+        )
+
+    def test_post_item_as_msgpack(self):
+        url = reverse(
+            'shop_list_api:shopping-lists-items',
+            kwargs={
+                'version': 'v1',
+                'list_id': self.get_a_shopping_list_id()
+            }
+        )
+        self.login_client('test_user', 'testing')
+        response = self.client.post(
+            url,
+            data=msgpack.packb({'name': 'packed item'}, use_bin_type=True),
+            content_type='application/msgpack'
+        )
+        # assert the item was added
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['name'], 'packed item')
+
+    def test_invalid_msgpack_body(self):
+        with self.assertRaises(ParseError):
+            parsers.MessagePackParser().parse(io.BytesIO(b'\xc1'))
@@ -0,0 +1,107 @@
+import importlib
+import json
+import sys
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import NoReverseMatch, clear_url_caches, reverse
+from rest_framework.views import status
+from config import settings_api
+from api.tests.base import AuthBaseTest
+
+
+def reload_urls():
+    # the admin urls are only mounted when its app is installed
+    importlib.reload(sys.modules[settings.ROOT_URLCONF])
+    clear_url_caches()
+
+
+@override_settings(
+    INSTALLED_APPS=settings_api.INSTALLED_APPS,
+    MIDDLEWARE=settings_api.MIDDLEWARE,
+    TEMPLATES=settings_api.TEMPLATES
+)
+class ApiOnlySettingsTest(AuthBaseTest):
+    """
+    Tests for logging in and out with the api-only settings,
+    where there are no sessions
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        reload_urls()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        reload_urls()
+
+    def test_unused_apps_and_middleware_are_dropped(self):
+        for app in settings_api.UNUSED_APPS:
+            self.assertNotIn(app, settings_api.INSTALLED_APPS)
+        for middleware in settings_api.UNUSED_MIDDLEWARE:
+            self.assertNotIn(middleware, settings_api.MIDDLEWARE)
+        self.assertIn('api', settings_api.INSTALLED_APPS)
+        self.assertIn('rest_framework', settings_api.INSTALLED_APPS)
+        # assert the admin and browsable api login are not mounted
+        for name in ('admin:index', 'rest_framework:login'):
+            with self.assertRaises(NoReverseMatch):
+                reverse(name)
+
+    def test_login_without_sessions(self):
+        # test logging in returns a token and records the login
+        url = reverse(
+            'shop_list_api:shop-list-api-login-user',
+            kwargs={'version': 'v1'}
+        )
+        response = self.client.post(
+            url,
+            data=json.dumps({
+                'username': 'test_user',
+                'password': 'testing'
+            }),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('token', response.data)
+        self.assertIsNotNone(
+            User.objects.get(username='test_user').last_login
+        )
+
+    def test_logout_without_sessions(self):
+        # test logging out with a token
+        login_url = reverse(
+            'shop_list_api:shop-list-api-login-user',
+            kwargs={'version': 'v1'}
+        )
+        response = self.client.post(
+            login_url,
+            data=json.dumps({
+                'username': 'test_user',
+                'password': 'testing'
+            }),
+            content_type='application/json'
+        )
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Bearer ' + response.data['token']
+        )
+        url = reverse(
+            'shop_list_api:shop-list-api-logout-user',
+            kwargs={'version': 'v1'}
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_obtain_token(self):
+        # test the token view, imported on its first request
+        response = self.client.post(
+            reverse('create-token'),
+            data=json.dumps({
+                'username': 'test_user',
+                'password': 'testing'
+            }),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('token', response.data)
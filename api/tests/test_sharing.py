@@ -0,0 +1,187 @@
+from unittest import mock
+from django.urls import reverse
+from rest_framework.views import status
+from api import feed
+from api.models import Item, ListMembership, ShoppingList
+from api.tests.base import ItemBaseTest
+
+
+class SharedListTest(ItemBaseTest):
+    """
+    Tests for the shopping lists shared through memberships
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.list_id = self.get_a_shopping_list_id()
+
+    def share(self, role, user=None):
+        ListMembership.objects.create(
+            user=user or self.other_user, shopping_list_id=self.list_id,
+            role=role
+        )
+
+    def url(self, name, **kwargs):
+        kwargs['version'] = 'v1'
+        return reverse('shop_list_api:' + name, kwargs=kwargs)
+
+    def list_url(self):
+        return self.url('shop-list-api-shopping-lists-detail',
+                        pk=self.list_id)
+
+    def item_url(self):
+        return self.url('shopping-lists-items-detail', item_id=self.item.id)
+
+    def members_url(self, username=None):
+        if username is None:
+            return self.url('shopping-lists-members', list_id=self.list_id)
+        return self.url('shopping-lists-members-detail',
+                        list_id=self.list_id, username=username)
+
+    def test_creator_is_owner(self):
+        self.assertEqual(
+            ListMembership.objects.get(shopping_list_id=self.list_id).role,
+            ListMembership.OWNER
+        )
+
+    def test_shared_list_is_listed_once(self):
+        self.share(ListMembership.VIEWER)
+        self.login_client('other_test_user', 'other_testing')
+        response = self.client.get(self.url('shop-list-api-shopping-lists'))
+        self.assertEqual([a['id'] for a in response.data], [self.list_id])
+        response = self.client.get(self.url('shopping-lists-all-items'))
+        self.assertEqual([i['id'] for i in response.data], [self.item.id])
+
+    def test_viewer_cannot_change_the_list(self):
+        self.share(ListMembership.VIEWER)
+        self.login_client('other_test_user', 'other_testing')
+        self.assertEqual(
+            self.client.get(self.item_url()).status_code, status.HTTP_200_OK
+        )
+        requests = (
+            self.client.put(self.list_url(), {'name': 'x'}, format='json'),
+            self.client.delete(self.list_url()),
+            self.client.post(
+                self.url('shopping-lists-items', list_id=self.list_id),
+                {'name': 'x'}, format='json'
+            ),
+            self.client.put(self.item_url(), {'name': 'x'}, format='json'),
+            self.client.delete(self.item_url()),
+        )
+        for response in requests:
+            # assert status code is 403 FORBIDDEN
+            self.assertEqual(
+                response.status_code, status.HTTP_403_FORBIDDEN
+            )
+        self.assertFalse(Item.objects.filter(name='x').exists())
+        self.assertTrue(ShoppingList.objects.filter(id=self.list_id).exists())
+
+    def test_editor_changes_items_but_does_not_delete_the_list(self):
+        self.share(ListMembership.EDITOR)
+        self.login_client('other_test_user', 'other_testing')
+        response = self.client.put(
+            self.item_url(), {'name': 'edited'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.put(
+            self.list_url(), {'name': 'renamed'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.delete(self.list_url())
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_owner_delete_removes_memberships(self):
+        self.share(ListMembership.EDITOR)
+        self.login_client('test_user', 'testing')
+        response = self.client.delete(self.list_url())
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(
+            ListMembership.objects.filter(shopping_list_id=self.list_id)
+            .exists()
+        )
+
+    def test_owner_adds_and_lists_members(self):
+        self.login_client('test_user', 'testing')
+        response = self.client.post(
+            self.members_url(),
+            {'username': 'other_test_user', 'role': 'viewer'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(self.members_url())
+        self.assertEqual(
+            [(m['username'], m['role']) for m in response.data],
+            [('test_user', 'owner'), ('other_test_user', 'viewer')]
+        )
+        # assert the role of a member is changed in place
+        self.client.post(
+            self.members_url(),
+            {'username': 'other_test_user', 'role': 'editor'}, format='json'
+        )
+        self.assertEqual(
+            ListMembership.objects.get(user=self.other_user).role,
+            ListMembership.EDITOR
+        )
+
+    def test_invalid_members(self):
+        self.login_client('test_user', 'testing')
+        for data, code in (
+                ({'username': 'nobody'}, status.HTTP_404_NOT_FOUND),
+                ({'username': 'test_user'}, status.HTTP_400_BAD_REQUEST),
+                ({'username': 'other_test_user', 'role': 'boss'},
+                 status.HTTP_400_BAD_REQUEST)):
+            response = self.client.post(self.members_url(), data,
+                                        format='json')
+            self.assertEqual(response.status_code, code, data)
+
+    def test_only_owners_add_members(self):
+        self.share(ListMembership.EDITOR)
+        self.login_client('other_test_user', 'other_testing')
+        response = self.client.post(
+            self.members_url(), {'username': 'test_user'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_members_of_other_lists_are_not_found(self):
+        self.login_client('other_test_user', 'other_testing')
+        response = self.client.get(self.members_url())
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_member_leaves_but_last_owner_does_not(self):
+        self.share(ListMembership.VIEWER)
+        self.login_client('test_user', 'testing')
+        response = self.client.delete(self.members_url('test_user'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.login_client('other_test_user', 'other_testing')
+        response = self.client.delete(self.members_url('test_user'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.delete(self.members_url('other_test_user'))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response = self.client.get(self.item_url())
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_roles_are_fetched_once_per_request(self):
+        self.login_client('test_user', 'testing')
+        # one query authenticates the user, one fetches the roles of
+        # the user on all their lists, one finds the last position
+        # and one inserts the item
+        with self.assertNumQueries(4):
+            response = self.client.post(
+                self.url('shopping-lists-items', list_id=self.list_id),
+                {'name': 'milk'}, format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @mock.patch('api.feed.transaction.on_commit', lambda func: func())
+    def test_changes_are_sent_to_all_members(self):
+        self.share(ListMembership.VIEWER)
+        # the other member follows the changes of their lists
+        feed.feed.listening.clear()
+        feed.feed.follow(self.other_user.id)
+        cursor = feed.feed.changes(self.other_user.id, None).cursor
+        self.login_client('test_user', 'testing')
+        self.client.put(self.item_url(), {'name': 'edited'}, format='json')
+        self.client.delete(self.item_url())
+        events = feed.feed.changes(self.other_user.id, cursor).events
+        self.assertEqual(
+            [event['action'] for event in events], ['updated', 'deleted']
+        )
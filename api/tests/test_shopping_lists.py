@@ -1,7 +1,10 @@
 import json
 from rest_framework.views import status
+from api.models import ShoppingList, Item
 from api.tests.base import ShoppingListBaseTest
 from django.urls import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 
 class ShoppingListsTest(ShoppingListBaseTest):
@@ -183,4 +186,117 @@ class ShoppingListsTest(ShoppingListBaseTest):
         # assert data is as expected
         self.assertEqual(len(response.data['results']), 1)
         # assert status code is 200 OK
-        self.assertEqual(response.status_code, status.HTTP_200_OK)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ShoppingListOwnershipTest(ShoppingListBaseTest):
+    """
+    Tests for the owner scoped /shoppinglists/<pk>/ endpoints
+    """
+
+    def detail_url(self):
+        return reverse(
+            'shop_list_api:shop-list-api-shopping-lists-detail',
+            kwargs={
+                'version': 'v1',
+                'pk': self.get_a_shopping_list_id()
+            }
+        )
+
+    def put_list(self, data):
+        # update the list and return the UPDATE statements issued
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.put(
+                self.detail_url(),
+                data=json.dumps(data),
+                content_type='application/json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('UPDATE')
+        ]
+
+    def test_get_list_of_another_user(self):
+        self.login_client('other_test_user', 'other_testing')
+        response = self.client.get(self.detail_url())
+        # assert status code is 404 NOT FOUND
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_update_list_of_another_user(self):
+        self.login_client('other_test_user', 'other_testing')
+        response = self.client.put(
+            self.detail_url(),
+            data=json.dumps({'name': 'not yours'}),
+            content_type='application/json'
+        )
+        # assert status code is 404 NOT FOUND
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        # assert the list is unchanged
+        self.assertTrue(self.query_set.filter(name='test_list_1').exists())
+
+    def test_delete_list_of_another_user(self):
+        self.login_client('other_test_user', 'other_testing')
+        response = self.client.delete(self.detail_url())
+        # assert status code is 404 NOT FOUND
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        # assert the list still exists
+        self.assertTrue(self.query_set.filter(name='test_list_1').exists())
+
+    def test_update_writes_changed_columns_only(self):
+        self.login_client('test_user', 'testing')
+        statements = self.put_list({
+            'name': 'test_list_1',
+            'description': 'a new description'
+        })
+        # assert a single UPDATE of the description and timestamp
+        self.assertEqual(len(statements), 1)
+        self.assertIn('"description"', statements[0])
+        self.assertIn('"updated_on"', statements[0])
+        self.assertNotIn('"name"', statements[0])
+        self.assertNotIn('"user_id"', statements[0])
+
+    def test_update_without_changes_writes_nothing(self):
+        self.login_client('test_user', 'testing')
+        statements = self.put_list({
+            'name': 'test_list_1',
+            'description': 'describe test list 1'
+        })
+        # assert no UPDATE was issued
+        self.assertEqual(statements, [])
+
+    def test_create_returns_the_new_list(self):
+        url = reverse(
+            'shop_list_api:shop-list-api-shopping-lists',
+            kwargs={
+                'version': 'v1'
+            }
+        )
+        self.login_client('test_user', 'testing')
+        response = self.client.post(
+            url,
+            data=json.dumps({'name': 'test_list_3'}),
+            content_type='application/json'
+        )
+        new_list = ShoppingList.objects.get(name='test_list_3')
+        # assert the response holds the saved list
+        self.assertEqual(response.data['id'], new_list.id)
+        self.assertIsNotNone(response.data['created_on'])
+
+    def test_delete_cascades_items_in_one_statement(self):
+        the_list = self.query_set.get(name='test_list_1')
+        Item.objects.bulk_create(
+            Item(name='item {}'.format(i), the_list=the_list)
+            for i in range(50)
+        )
+        url = self.detail_url()
+        self.login_client('test_user', 'testing')
+        # one query authenticates the user, one reads the members,
+        # then one deletes the items, one the list and one its
+        # memberships, whatever the number of items
+        with self.assertNumQueries(5):
+            response = self.client.delete(url)
+        # assert status code is 204 NO CONTENT
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Item.objects.filter(the_list_id=the_list.id).exists())
+        self.assertFalse(self.query_set.filter(id=the_list.id).exists())
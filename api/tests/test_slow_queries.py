@@ -0,0 +1,132 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.views import status
+from api import slow_queries
+from api.tests.base import ItemBaseTest
+
+
+@override_settings(SLOW_QUERY_LOG={
+    'ENABLED': True,
+    # record every query
+    'THRESHOLD_MS': 0,
+    'MAX_ENTRIES': 5,
+    'EXPLAIN': True
+})
+class SlowQueryLogTest(ItemBaseTest):
+    """
+    Tests for the slow query log and the /slow-queries/ endpoint
+    """
+
+    def setUp(self):
+        super().setUp()
+        slow_queries.log.clear()
+        self.url = reverse(
+            'shop_list_api:shop-list-api-slow-queries',
+            kwargs={'version': 'v1'}
+        )
+
+    def get_items(self):
+        url = reverse(
+            'shop_list_api:shopping-lists-items',
+            kwargs={
+                'version': 'v1',
+                'list_id': self.get_a_shopping_list_id(),
+            }
+        )
+        return self.client.get(url)
+
+    def test_slow_queries_are_recorded(self):
+        # test the query of the view is recorded with its plan
+        self.login_client('test_user', 'testing')
+        self.get_items()
+        entries = [
+            entry for entry in slow_queries.log.all()
+            if entry['view'] == 'shop_list_api:shopping-lists-items'
+        ]
+        self.assertTrue(entries)
+        entry = entries[0]
+        self.assertIn('api_item', entry['sql'])
+        self.assertNotIn(str(self.get_a_shopping_list_id()), entry['sql'])
+        self.assertEqual(len(entry['fingerprint']), 16)
+        self.assertTrue(entry['plan'])
+
+    def test_ring_buffer_is_bounded(self):
+        # test only the most recent queries are kept
+        self.login_client('test_user', 'testing')
+        for _ in range(3):
+            self.get_items()
+        self.assertEqual(len(slow_queries.log.all()), 5)
+
+    def test_plans_are_fetched_after_the_request(self):
+        # test no EXPLAIN runs while the statements of the view run
+        recorder = slow_queries.SlowQueryRecorder(0)
+        with connection.execute_wrapper(recorder):
+            list(connection.cursor().execute('SELECT id FROM api_item'))
+        self.assertEqual(slow_queries.log.all(), [])
+        self.assertEqual(len(recorder.pending), 1)
+        recorder.flush()
+        entry = slow_queries.log.all()[0]
+        self.assertEqual(entry['sql'], 'SELECT id FROM api_item')
+        self.assertTrue(entry['plan'])
+        self.assertFalse(recorder.pending)
+
+    def test_get_slow_queries(self):
+        # test an admin user can view the slow queries
+        self.login_client('test_user', 'testing')
+        self.get_items()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data)
+
+    def test_get_slow_queries_with_a_non_admin_user(self):
+        # test a non admin user can not view the slow queries
+        self.login_client('other_test_user', 'other_testing')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_clear_slow_queries(self):
+        # test an admin user can clear the slow queries
+        self.login_client('test_user', 'testing')
+        self.get_items()
+        response = self.client.delete(self.url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(slow_queries.log.all(), [])
+
+
+class NormalizeTest(TestCase):
+    """
+    Tests for the SQL fingerprints
+    """
+
+    def test_normalize_literals(self):
+        self.assertEqual(
+            slow_queries.normalize(
+                "select * from api_item where name = 'milk'  and id = 42"
+            ),
+            'select * from api_item where name = ? and id = ?'
+        )
+
+    def test_normalize_in_lists(self):
+        self.assertEqual(
+            slow_queries.normalize(
+                'SELECT id FROM api_item WHERE id IN (%s, %s, %s)'
+            ),
+            'SELECT id FROM api_item WHERE id IN (...)'
+        )
+
+    def test_same_statement_same_fingerprint(self):
+        first = slow_queries.normalize('SELECT 1 FROM t WHERE id IN (1, 2)')
+        second = slow_queries.normalize('SELECT 1 FROM t WHERE id IN (3)')
+        self.assertEqual(
+            slow_queries.fingerprint(first),
+            slow_queries.fingerprint(second)
+        )
+
+    def test_explain_only_selects(self):
+        self.assertIsNone(slow_queries.explain(
+            connection, 'DELETE FROM api_item WHERE id = %s', [1]
+        ))
+        self.assertTrue(slow_queries.explain(
+            connection, 'SELECT id FROM api_item WHERE id = %s', [1]
+        ))
@@ -0,0 +1,115 @@
+import json
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.views import status
+from api import throttling
+from api.tests.base import ItemBaseTest
+
+
+def rates(**overrides):
+    # REST_FRAMEWORK settings with some throttle rates replaced
+    rest_framework = dict(settings.REST_FRAMEWORK)
+    rest_framework['DEFAULT_THROTTLE_RATES'] = dict(
+        rest_framework['DEFAULT_THROTTLE_RATES'], **overrides
+    )
+    return rest_framework
+
+
+class TokenBucketStoreTest(SimpleTestCase):
+    """
+    Tests for the token buckets
+    """
+
+    def test_parse_rate(self):
+        self.assertEqual(throttling.parse_rate('10/minute'), (10, 10 / 60.0))
+        self.assertEqual(throttling.parse_rate('5/s'), (5, 5.0))
+
+    def test_consume(self):
+        store = throttling.TokenBucketStore()
+        self.assertEqual(store.consume('key', 2, 1.0, now=0), (True, 0.0))
+        self.assertEqual(store.consume('key', 2, 1.0, now=0), (True, 0.0))
+        # the bucket is empty, a token is added every second
+        self.assertEqual(store.consume('key', 2, 1.0, now=0.25),
+                         (False, 0.75))
+        self.assertEqual(store.consume('key', 2, 1.0, now=1), (True, 0.0))
+        # other keys have their own bucket
+        self.assertEqual(store.consume('other', 2, 1.0, now=1), (True, 0.0))
+
+    def test_evict_refilled_buckets(self):
+        store = throttling.TokenBucketStore(max_buckets=2)
+        store.consume('idle', 2, 1.0, now=0)
+        store.consume('busy', 2, 1.0, now=10)
+        store.consume('busy', 2, 1.0, now=10)
+        store.consume('new', 2, 1.0, now=10)
+        self.assertEqual(sorted(store.buckets), ['busy', 'new'])
+
+
+class ThrottlingTest(ItemBaseTest):
+    """
+    Tests for the throttled endpoints
+    """
+
+    def login(self):
+        url = reverse(
+            'shop_list_api:shop-list-api-login-user',
+            kwargs={'version': 'v1'}
+        )
+        return self.client.post(
+            url,
+            data=json.dumps({'username': 'test_user', 'password': 'wrong'}),
+            content_type='application/json'
+        )
+
+    @override_settings(REST_FRAMEWORK=rates(login='2/minute'))
+    def test_login_is_throttled(self):
+        # test the login attempts of a client are limited
+        self.assertEqual(self.login().status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.login().status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+        response = self.login()
+        self.assertEqual(response.status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '30')
+
+    @override_settings(REST_FRAMEWORK=rates(search='1/minute'))
+    def test_search_is_throttled_per_user(self):
+        url = reverse(
+            'shop_list_api:shopping-lists-items-search',
+            kwargs={'version': 'v1'}
+        ) + '?q=test'
+        self.login_client('test_user', 'testing')
+        self.assertEqual(self.client.get(url).status_code,
+                         status.HTTP_200_OK)
+        self.assertEqual(self.client.get(url).status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+        # another user has a bucket of their own
+        self.login_client('other_test_user', 'other_testing')
+        self.assertEqual(self.client.get(url).status_code,
+                         status.HTTP_200_OK)
+
+    @override_settings(REST_FRAMEWORK=rates(writes='1/minute'))
+    def test_writes_are_throttled(self):
+        url = reverse(
+            'shop_list_api:shopping-lists-items',
+            kwargs={
+                'version': 'v1',
+                'list_id': self.get_a_shopping_list_id()
+            }
+        )
+        self.login_client('test_user', 'testing')
+        data = json.dumps({'name': 'an item'})
+        self.assertEqual(
+            self.client.post(url, data=data,
+                             content_type='application/json').status_code,
+            status.HTTP_200_OK
+        )
+        self.assertEqual(
+            self.client.post(url, data=data,
+                             content_type='application/json').status_code,
+            status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        # reads are not counted as writes
+        self.assertEqual(self.client.get(url).status_code,
+                         status.HTTP_200_OK)
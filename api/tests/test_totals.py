@@ -0,0 +1,97 @@
+from decimal import Decimal
+from django.urls import reverse
+from rest_framework.views import status
+from api.models import Item, ShoppingList
+from api.tests.base import ItemBaseTest
+
+
+class ItemTotalsTest(ItemBaseTest):
+    """
+    Tests for the quantity, unit and price of items and the totals
+    of the lists
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.list_id = self.get_a_shopping_list_id()
+        Item.objects.create(
+            name='milk', the_list_id=self.list_id, quantity=2, unit='l',
+            price=Decimal('1.25')
+        )
+        Item.objects.create(
+            name='cheese', the_list_id=self.list_id,
+            quantity=Decimal('0.5'), unit='kg', price=Decimal('12.00'),
+            bought=True
+        )
+        self.login_client('test_user', 'testing')
+
+    def test_item_amounts_are_saved(self):
+        response = self.client.post(
+            reverse('shop_list_api:shopping-lists-items', kwargs={
+                'version': 'v1', 'list_id': self.list_id}),
+            {'name': 'flour', 'quantity': '1.5', 'unit': 'kg',
+             'price': '0.80'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['unit'], 'kg')
+        flour = Item.objects.get(name='flour')
+        self.assertEqual(flour.quantity, Decimal('1.5'))
+        self.assertEqual(flour.price, Decimal('0.80'))
+
+    def test_invalid_amounts(self):
+        item_url = reverse('shop_list_api:shopping-lists-items-detail',
+                           kwargs={'version': 'v1', 'item_id': self.item.id})
+        response = self.client.put(
+            item_url, {'name': 'eggs', 'quantity': 'a dozen'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('quantity', response.data)
+        # assert a replaced item gets the default amounts
+        response = self.client.put(item_url, {'name': 'eggs'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(Item.objects.get(id=self.item.id).price)
+
+    def test_list_totals(self):
+        url = reverse('shop_list_api:shop-list-api-shopping-lists',
+                      kwargs={'version': 'v1'})
+        # the totals of every list are computed in the same query
+        # that fetches the lists
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                url, {'fields': 'id,item_count,total,bought_total'}
+            )
+        totals = {a['id']: a for a in response.data}
+        self.assertEqual(totals[self.list_id]['item_count'], 3)
+        self.assertEqual(totals[self.list_id]['total'], '8.50')
+        self.assertEqual(totals[self.list_id]['bought_total'], '6.00')
+        other_id = ShoppingList.objects.get(name='test_list_2').id
+        self.assertEqual(totals[other_id]['item_count'], 0)
+        self.assertEqual(totals[other_id]['total'], '0.00')
+
+    def test_list_detail_totals(self):
+        response = self.client.get(reverse(
+            'shop_list_api:shop-list-api-shopping-lists-detail',
+            kwargs={'version': 'v1', 'pk': self.list_id}
+        ))
+        self.assertEqual(response.data['total'], '8.50')
+        self.assertEqual(response.data['name'], 'test_list_1')
+
+    def test_totals_are_not_computed_unless_selected(self):
+        response = self.client.get(reverse(
+            'shop_list_api:shop-list-api-shopping-lists',
+            kwargs={'version': 'v1'}
+        ))
+        self.assertNotIn('total', response.data[0])
+
+    def test_user_totals(self):
+        url = reverse('shop_list_api:shopping-lists-totals',
+                      kwargs={'version': 'v1'})
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.data, {
+            'item_count': 3, 'total': '8.50', 'bought_total': '6.00'
+        })
+        self.login_client('other_test_user', 'other_testing')
+        response = self.client.get(url)
+        self.assertEqual(response.data['item_count'], 0)
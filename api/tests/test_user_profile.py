@@ -2,6 +2,9 @@ import json
 from rest_framework.views import status
 from api.tests.base import AuthBaseTest
 from django.urls import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from api.utils import update_user_profile
 
 
 class UserProfileTest(AuthBaseTest):
@@ -188,3 +191,71 @@ class UserProfileTest(AuthBaseTest):
         self.assertEqual(response.data['date_joined'], serialized.data['date_joined'])
         # assert status code
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class UpdateUserProfileQueriesTest(AuthBaseTest):
+    """
+    Tests for the SQL issued by update_user_profile
+    """
+
+    def get_update_statements(self, data):
+        # run the update and return the UPDATE statements it issued
+        with CaptureQueriesContext(connection) as context:
+            self.assertTrue(update_user_profile(data=data))
+        return [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('UPDATE')
+        ]
+
+    def test_update_description_only(self):
+        # only the profile description and timestamp are written
+        statements = self.get_update_statements({
+            'username': 'test_user',
+            'description': 'a new description'
+        })
+        self.assertEqual(len(statements), 1)
+        self.assertIn('"api_userprofile"', statements[0])
+        self.assertIn('"description"', statements[0])
+        self.assertIn('"updated_on"', statements[0])
+        self.assertNotIn('"user_id"', statements[0].split('WHERE')[0])
+        self.user_profile.refresh_from_db()
+        self.assertEqual(self.user_profile.description, 'a new description')
+
+    def test_update_first_name_only(self):
+        # only the changed auth user column is written
+        statements = self.get_update_statements({
+            'username': 'test_user',
+            'first_name': 'changed'
+        })
+        self.assertEqual(len(statements), 1)
+        set_clause = statements[0].split('WHERE')[0]
+        self.assertIn('"auth_user"', set_clause)
+        self.assertIn('"first_name"', set_clause)
+        for column in ('"email"', '"last_name"', '"password"'):
+            self.assertNotIn(column, set_clause)
+
+    def test_update_with_unchanged_values(self):
+        # values that match what is stored are not written at all
+        updated_on = self.user_profile.updated_on
+        statements = self.get_update_statements({
+            'username': 'test_user',
+            'email': self.user.email,
+            'description': self.user_profile.description
+        })
+        # the user row is left alone and the profile update is
+        # conditional on the description having changed
+        self.assertEqual(len(statements), 1)
+        self.assertIn('"api_userprofile"', statements[0])
+        self.user_profile.refresh_from_db()
+        self.assertEqual(self.user_profile.updated_on, updated_on)
+
+    def test_update_password_only(self):
+        # a password reset writes only the password column
+        statements = self.get_update_statements({
+            'username': 'test_user',
+            'password': 'a-new-password'
+        })
+        self.assertEqual(len(statements), 1)
+        set_clause = statements[0].split('WHERE')[0]
+        self.assertIn('"password"', set_clause)
+        self.assertNotIn('"first_name"', set_clause)
@@ -0,0 +1,18 @@
+from django.test import SimpleTestCase
+from api import warmup
+
+
+class WarmUpTest(SimpleTestCase):
+    """
+    Tests for the caches warmed before the workers are forked
+    """
+
+    def test_warm_url_resolvers(self):
+        # the root, admin, rest_framework and api url confs
+        self.assertGreaterEqual(warmup.warm_url_resolvers(), 4)
+
+    def test_warm_serializers(self):
+        self.assertEqual(warmup.warm_serializers(), 6)
+
+    def test_warm_up(self):
+        warmup.warm_up()
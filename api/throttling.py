@@ -0,0 +1,194 @@
+import functools
+import threading
+import time
+
+from rest_framework import settings as rest_framework_settings
+from rest_framework.throttling import BaseThrottle
+
+# request throttling with in-memory token buckets, checking a request
+# costs a dict lookup and some arithmetic, the database is not used
+
+# seconds in each period of a rate such as '10/minute'
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+@functools.lru_cache(maxsize=None)
+def parse_rate(rate):
+    """
+    Parse a rate in the REST_FRAMEWORK DEFAULT_THROTTLE_RATES format
+
+    :param rate: e.g '10/minute'
+    :return: (bucket capacity, tokens added per second)
+    """
+    num, period = rate.split('/')
+    capacity = int(num)
+    return capacity, capacity / float(PERIODS[period[0]])
+
+
+class TokenBucketStore:
+    """
+    Thread safe token buckets, one per throttling key
+
+    The buckets live in the memory of the process, with several
+    server processes each one throttles the requests it serves
+    """
+
+    def __init__(self, max_buckets=100000):
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.max_buckets = max_buckets
+        # lets benchmarks switch throttling off
+        self.enabled = True
+
+    def consume(self, key, capacity, per_second, now=None):
+        """
+        Take a token from the bucket of a key
+
+        :param key: throttling key
+        :param capacity: maximum number of tokens in the bucket
+        :param per_second: tokens added to the bucket per second
+        :param now: current time in seconds, for tests
+        :return: (allowed, seconds to wait for the next token)
+        """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                if len(self.buckets) >= self.max_buckets:
+                    self.evict(now)
+                # a new bucket starts full
+                bucket = self.buckets[key] = [
+                    float(capacity), now, per_second, capacity
+                ]
+            tokens = min(
+                capacity, bucket[0] + (now - bucket[1]) * per_second
+            )
+            bucket[1] = now
+            if tokens >= 1:
+                bucket[0] = tokens - 1
+                return True, 0.0
+            bucket[0] = tokens
+            return False, (1 - tokens) / per_second
+
+    def evict(self, now):
+        """
+        Drop the buckets that have refilled, they are the same as a
+        new bucket. Called when the store is full, so the cost is
+        spread over the many requests that filled it
+        """
+        self.buckets = {
+            key: bucket for key, bucket in self.buckets.items()
+            if bucket[0] + (now - bucket[1]) * bucket[2] < bucket[3]
+        }
+        if len(self.buckets) >= self.max_buckets:
+            # every client is busy, start over rather than grow
+            self.buckets = {}
+
+    def clear(self):
+        with self.lock:
+            self.buckets = {}
+
+
+# token buckets of this process
+buckets = TokenBucketStore()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Base class of the token bucket throttles, the rate of the scope
+    is read from REST_FRAMEWORK DEFAULT_THROTTLE_RATES
+    """
+    scope = None
+    store = buckets
+
+    def __init__(self):
+        self.retry_after = None
+
+    def get_scope(self, view):
+        return self.scope
+
+    def get_key(self, request, view):
+        """
+        Return the bucket key of the request, or None to not throttle it
+        """
+        raise NotImplementedError('.get_key() must be overridden')
+
+    def client_key(self, request):
+        # the user when authenticated, the client ip otherwise
+        if request.user and request.user.is_authenticated:
+            return 'user:{}'.format(request.user.pk)
+        return 'ip:{}'.format(self.get_ident(request))
+
+    def allow_request(self, request, view):
+        if not self.store.enabled:
+            return True
+        scope = self.get_scope(view)
+        # looked up on every request so that changes to the
+        # settings, e.g override_settings, are picked up
+        rate = rest_framework_settings.api_settings \
+            .DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None:
+            return True
+        key = self.get_key(request, view)
+        if key is None:
+            return True
+        capacity, per_second = parse_rate(rate)
+        allowed, self.retry_after = self.store.consume(
+            '{}:{}'.format(scope, key), capacity, per_second
+        )
+        return allowed
+
+    def wait(self):
+        # sent back in the Retry-After header
+        return self.retry_after
+
+
+class AnonTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Throttles anonymous requests per client ip, 'anon' scope
+    """
+    scope = 'anon'
+
+    def get_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.get_ident(request)
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Throttles authenticated requests per user, 'user' scope
+    """
+    scope = 'user'
+
+    def get_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return None
+
+
+class ScopedTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Throttles the requests to views that set a throttle_scope, per
+    user or per client ip for anonymous requests
+    """
+
+    def get_scope(self, view):
+        return getattr(view, 'throttle_scope', None)
+
+    def get_key(self, request, view):
+        return self.client_key(request)
+
+
+class WriteTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Throttles the requests that change data, per user or per client
+    ip for anonymous requests, 'writes' scope
+    """
+    scope = 'writes'
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def get_key(self, request, view):
+        if request.method in self.safe_methods:
+            return None
+        return self.client_key(request)
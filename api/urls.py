@@ -7,13 +7,24 @@ from api.views.auth_views import (
     LoginUser,
     LogoutUser
 )
-from api.views.shop_list_views import ShoppingLists, SearchShoppingLists
+from api.views.shop_list_views import (
+    ShoppingLists,
+    SearchShoppingLists,
+    ShoppingListArchive,
+    ShoppingListTotals
+)
 from api.views.shop_item_views import (
     ItemsListCreate,
     ItemsDetails,
+    ItemPosition,
+    ItemNameAutocomplete,
     ListAllItems,
     SearchItemByName
 )
+from api.views.sharing_views import ListMembers, ListMemberDetails
+from api.views.metrics_views import SlowQueries
+from api.views.batch_views import BatchRequests
+from api.views.feed_views import Changes, ChangeStream
 from rest_framework.urlpatterns import format_suffix_patterns
 
 app_name = 'shop_list_api'
@@ -51,7 +62,7 @@ urlpatterns = format_suffix_patterns([
             ListAllUsers.as_view(),
             name='shop-list-api-all-users'),
 
-    re_path('^users/(?P<username>[\w.@+-]+)/$',
+    re_path(r'^users/(?P<username>[\w.@+-]+)/$',
             SingleUserDetails.as_view(),
             name='shop-list-api-user'),
 
@@ -63,10 +74,27 @@ urlpatterns = format_suffix_patterns([
             SearchShoppingLists.as_view(),
             name='shopping-lists-search'),
 
+    re_path('^shoppinglists/totals/$',
+            ShoppingListTotals.as_view(),
+            name='shopping-lists-totals'),
+
     re_path('^shoppinglists/(?P<pk>[0-9]+)/$',
             shopping_lists_detail,
             name='shop-list-api-shopping-lists-detail'),
 
+    re_path('^shoppinglists/(?P<list_id>[0-9]+)/members/$',
+            ListMembers.as_view(),
+            name='shopping-lists-members'),
+
+    re_path('^shoppinglists/(?P<list_id>[0-9]+)/members/'
+            r'(?P<username>[\w.@+-]+)/$',
+            ListMemberDetails.as_view(),
+            name='shopping-lists-members-detail'),
+
+    re_path('^shoppinglists/(?P<pk>[0-9]+)/archive/$',
+            ShoppingListArchive.as_view(),
+            name='shopping-lists-archive'),
+
     re_path('^shoppinglists/items/$',
             ListAllItems.as_view(),
             name='shopping-lists-all-items'),
@@ -79,7 +107,31 @@ urlpatterns = format_suffix_patterns([
             ItemsDetails.as_view(),
             name='shopping-lists-items-detail'),
 
+    re_path('^shoppinglists/items/(?P<item_id>[0-9]+)/position/$',
+            ItemPosition.as_view(),
+            name='shopping-lists-items-position'),
+
+    re_path('^shoppinglists/items/autocomplete/$',
+            ItemNameAutocomplete.as_view(),
+            name='shopping-lists-items-autocomplete'),
+
     re_path('^shoppinglists/items/search/$',
             SearchItemByName.as_view(),
-            name='shopping-lists-items-search')
+            name='shopping-lists-items-search'),
+
+    re_path('^slow-queries/$',
+            SlowQueries.as_view(),
+            name='shop-list-api-slow-queries'),
+
+    re_path('^batch/$',
+            BatchRequests.as_view(),
+            name='shop-list-api-batch'),
+
+    re_path('^changes/$',
+            Changes.as_view(),
+            name='shop-list-api-changes'),
+
+    re_path('^changes/stream/$',
+            ChangeStream.as_view(),
+            name='shop-list-api-changes-stream')
 ])
@@ -1,9 +1,33 @@
-from api.models import UserProfile
+import functools
+from api.models import (
+    UserProfile,
+    ShoppingList,
+    Item,
+    ArchivedItem,
+    ListMembership
+)
 from django.contrib.auth.models import User
-from api.serializers import ItemsSerializer
+from api.serializers import ItemsSerializer, CompositeUserSerializer
+from rest_framework.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
 
 # utility functions and classes
 
+# fields of a user profile that can be updated
+USER_PROFILE_FIELDS = (
+    'email',
+    'password',
+    'first_name',
+    'last_name',
+    'description'
+)
+
+# user profile fields that are not columns of the user table
+USER_PROFILE_COLUMNS = {
+    'description': 'userprofile__description'
+}
+
 
 def user_is_permitted(request, username):
     """
@@ -24,49 +48,70 @@ def user_is_permitted(request, username):
         request.user.username == username or request.user.is_superuser
 
 
-def fetch_all_user_profiles():
+def fetch_all_user_profiles(fields=None):
     """
     This function returns a query set that holds
     all user profiles
+    :param fields: names of the profile fields to fetch,
+        all fields by default
     :return:
     """
-    users_queryset = User.objects.all()
+    fields = fields or serializer_fields(CompositeUserSerializer)
     profiles_queryset = []
-    for user in users_queryset:
-        profile = UserProfile.objects.get(user=user)
-        profiles_queryset.append({
-            'first_name': user.first_name,
-            'last_name': user.last_name,
-            'email': user.email,
-            'description': profile.description,
-            'last_login': user.last_login,
-            'date_joined': user.date_joined
-        })
+    for user in user_profiles_queryset(fields):
+        profiles_queryset.append(user_profile_data(user, fields))
     return profiles_queryset
 
 
-def fetch_single_user(username):
+def fetch_single_user(username, fields=None):
     """
     This function fetches a single user profile
     :param username:
+    :param fields: names of the profile fields to fetch,
+        all fields by default
     :return: data object with user profile data
     """
+    fields = fields or serializer_fields(CompositeUserSerializer)
     try:
-        user = User.objects.get(username=username)
+        user = user_profiles_queryset(fields).get(username=username)
     except User.DoesNotExist:
         return None
-    # at this point the user exists, find user profile
-    profile = UserProfile.objects.get(user=user)
-
-    data = {
-        'first_name': user.first_name,
-        'last_name': user.last_name,
-        'email': user.email,
-        'description': profile.description,
-        'last_login': user.last_login,
-        'date_joined': user.date_joined
-    }
     # the data can be passed to a serializer
+    return user_profile_data(user, fields)
+
+
+def user_profiles_queryset(fields):
+    """
+    This function returns a query set of users that only
+    selects the columns of the given profile fields
+
+    :param fields: names of user profile fields
+    :return:
+    """
+    queryset = User.objects.only(
+        *(USER_PROFILE_COLUMNS.get(field, field) for field in fields)
+    )
+    if 'description' in fields:
+        # join the profiles in the same query instead of
+        # fetching the profile of every user separately
+        queryset = queryset.select_related('userprofile')
+    return queryset
+
+
+def user_profile_data(user, fields):
+    """
+    This function returns the given profile fields of a user
+
+    :param user: user fetched by user_profiles_queryset
+    :param fields: names of user profile fields
+    :return: dict
+    """
+    data = {}
+    for field in fields:
+        if field == 'description':
+            data[field] = user.userprofile.description
+        else:
+            data[field] = getattr(user, field)
     return data
 
 
@@ -99,57 +144,106 @@ def is_safe_to_save(data, user):
     This helper function that inspects the data in the fields
     and updates the corresponding user fields
 
+    Only fields whose value actually changes are reported so that
+    the caller can write just those columns, e.g with
+    user.save(update_fields=...)
+
     :param data:
     :param user:
-    :return: bool
+    :return: list of the names of the changed user fields
     """
-    save = False
-    if 'email' in data \
-            and data['email'] != '':
-        user.email = data['email']
-        save = True
+    changed = []
+    for field in ('email', 'first_name', 'last_name'):
+        if field in data \
+                and data[field] != '' \
+                and data[field] != getattr(user, field):
+            setattr(user, field, data[field])
+            changed.append(field)
     if 'password' in data \
             and data['password'] != '':
         user.set_password(data['password'])
-        save = True
-    if 'first_name' in data \
-            and data['first_name'] != '':
-        user.first_name = data['first_name']
-        save = True
-    if 'last_name' in data \
-            and data['last_name'] != '':
-        user.last_name = data['last_name']
-        save = True
-    return save
+        changed.append('password')
+    return changed
 
 
 def update_user_profile(data):
     """
     This function updates a user profile
+
+    Both the user and the user profile are updated in one
+    transaction and only the columns that changed are written
     :return:
     """
     try:
-        updated = False
-        # find the user to update
-        user = User.objects.get(
-            username=data['username']
-        )
-        # update user data
-        if is_safe_to_save(data, user):
-            user.save()
-            updated = True
-        # update user profile
-        profile = UserProfile.objects.get(user=user)
-        if 'description' in data \
-                and data['description'] != '':
-            profile.description = data['description']
-            profile.save()
-            updated = True
+        with transaction.atomic():
+            # find the user to update
+            user = User.objects.get(
+                username=data['username']
+            )
+            # a non empty value in any of the fields is a valid update
+            # even if it matches what is already stored
+            updated = any(
+                data.get(field, '') != ''
+                for field in USER_PROFILE_FIELDS
+            )
+            # update user data
+            changed = is_safe_to_save(data, user)
+            if changed:
+                user.save(update_fields=changed)
+            # update user profile
+            if 'description' in data \
+                    and data['description'] != '':
+                rows = UserProfile.objects.filter(user=user).exclude(
+                    description=data['description']
+                ).update(
+                    description=data['description'],
+                    updated_on=timezone.now()
+                )
+                if not rows and not UserProfile.objects.filter(
+                        user=user).exists():
+                    raise UserProfile.DoesNotExist
         return updated
     except Exception:
         return False
 
 
+@functools.lru_cache(maxsize=None)
+def serializer_fields(serializer_class):
+    """
+    This function returns the names of the fields of a
+    serializer class, in the order they are serialized
+
+    :param serializer_class:
+    :return: tuple of field names
+    """
+    return tuple(serializer_class().fields)
+
+
+def selected_fields(request, serializer_class, default=None):
+    """
+    This function returns the fields a client selected with
+    the fields query parameter, e.g ?fields=id,name so that
+    only those columns are fetched and serialized
+
+    :param request:
+    :param serializer_class: serializer of the response
+    :param default: fields returned when none are selected,
+        all fields of the serializer by default
+    :return: tuple of field names
+    """
+    available = serializer_fields(serializer_class)
+    param = request.query_params.get('fields', '')
+    requested = {field.strip() for field in param.split(',') if field.strip()}
+    if not requested:
+        return default or available
+    unknown = requested.difference(available)
+    if unknown:
+        raise ValidationError({
+            'fields': 'unknown fields: {}'.format(', '.join(sorted(unknown)))
+        })
+    return tuple(field for field in available if field in requested)
+
+
 def serialize_item(item):
     """
     This function serializes a single
@@ -162,26 +256,78 @@ def serialize_item(item):
         'id': item.id,
         'name': item.name,
         'description': item.description,
-        'bought': item.bought
+        'bought': item.bought,
+        'quantity': item.quantity,
+        'unit': item.unit,
+        'price': item.price
     })
     serializer.is_valid()
     return serializer
 
 
-def items_results_set(items):
+def item_amounts(data):
     """
-    This functions returns a results set that can be
-    serialized
+    This function validates the quantity, unit and price of an
+    item sent by a client, the missing ones get their defaults
 
-    :param items: raw query set
-    :return:
+    :param data: request data
+    :return: dict of the values, raises ValidationError
     """
-    results = []
-    for item in items:
-        results.append({
-            'id': item.id,
-            'name': item.name,
-            'description': item.description,
-            'bought': item.bought
-        })
-    return results
+    serializer = ItemsSerializer(
+        data=data, fields=('quantity', 'unit', 'price')
+    )
+    serializer.is_valid(raise_exception=True)
+    amounts = {'quantity': 1, 'unit': '', 'price': None}
+    amounts.update(serializer.validated_data)
+    return amounts
+
+
+def delete_shopping_list(list_id, user, archived=False):
+    """
+    This function deletes a shopping list the user owns, its items
+    and its memberships with one DELETE statement each. The list is
+    not loaded and the items are not collected one by one the way
+    the ORM does, so delete signals are not sent
+
+    :param list_id: id of the shopping list
+    :param user: owner of the shopping list
+    :param archived: True if the list is archived, its items are
+        then deleted from the archived items
+    :return: True if the list was deleted, False if the user
+        owns no list with that id
+    """
+    items_table = (ArchivedItem if archived else Item)._meta.db_table
+    lists_table = ShoppingList._meta.db_table
+    members_table = ListMembership._meta.db_table
+    # the lists the user owns, on the (user_id, shopping_list_id) index
+    owned = (
+        "select shopping_list_id from {} where user_id=%s "
+        "and shopping_list_id=%s and role=%s".format(members_table)
+    )
+    params = [user.id, list_id, ListMembership.OWNER]
+    # a list archived or restored meanwhile is not found, its items
+    # moved to the other table
+    state = "deleted_on is null and archived_on is {}".format(
+        "not null" if archived else "null"
+    )
+    with transaction.atomic(savepoint=False), \
+            connection.cursor() as cursor:
+        cursor.execute(
+            "delete from {} where the_list_id in "
+            "(select id from {} where id in ({}) and {})".format(
+                items_table, lists_table, owned, state),
+            params
+        )
+        cursor.execute(
+            "delete from {} where id in ({}) and {}".format(
+                lists_table, owned, state),
+            params
+        )
+        if cursor.rowcount == 0:
+            return False
+        # the foreign keys are checked when the transaction commits
+        cursor.execute(
+            "delete from {} where shopping_list_id=%s".format(members_table),
+            [list_id]
+        )
+        return True
@@ -1,3 +1,5 @@
+import functools
+
 from rest_framework.response import Response
 from rest_framework.views import APIView, status
 from rest_framework.generics import (
@@ -19,17 +21,33 @@ from api.serializers import (
 from api.utils import (
     fetch_all_user_profiles,
     fetch_single_user,
+    selected_fields,
     create_user_profile,
     update_user_profile,
     user_is_permitted,
 )
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login, logout
-from rest_framework_jwt.settings import api_settings
+from django.contrib.auth.signals import user_logged_in
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework.pagination import PageNumberPagination
 
-jwt_payload_handler = api_settings.JWT_PAYLOAD_HANDLER
-jwt_encode_handler = api_settings.JWT_ENCODE_HANDLER
+
+def jwt_token(user):
+    """
+    Generate a token for a user using drf jwt utility functions
+
+    The jwt settings are imported on the first login rather than
+    with this module, to keep them off the startup path
+
+    :param user:
+    :return: encoded token
+    """
+    from rest_framework_jwt.settings import api_settings
+
+    return api_settings.JWT_ENCODE_HANDLER(
+        api_settings.JWT_PAYLOAD_HANDLER(user)
+    )
 
 
 # API endpoint views
@@ -49,9 +67,12 @@ class ListAllUsers(APIView):
         """
         Return a list of all users.
         """
+        # ?fields= limits the columns fetched and serialized
+        fields = selected_fields(request, CompositeUserSerializer)
         serializer = CompositeUserSerializer(
-            fetch_all_user_profiles(),
-            many=True
+            fetch_all_user_profiles(fields),
+            many=True,
+            fields=fields
         )
         return Response(serializer.data)
 
@@ -64,6 +85,7 @@ class RegisterUsers(APIView):
     * non authenticated users can access it
     """
     permission_classes = (AllowAny,)
+    throttle_scope = 'register'
 
     def post(self, request, version, format='json'):
         """
@@ -128,9 +150,10 @@ class SingleUserDetails(RetrieveUpdateAPIView):
         """
         username = kwargs['username']
         if user_is_permitted(request, username):
-            data = fetch_single_user(username=username)
+            fields = selected_fields(request, CompositeUserSerializer)
+            data = fetch_single_user(username=username, fields=fields)
             if data is not None:
-                serializer = CompositeUserSerializer(data=data)
+                serializer = CompositeUserSerializer(data=data, fields=fields)
                 serializer.is_valid()
                 return Response(data=serializer.data)
             return Response(status=status.HTTP_404_NOT_FOUND)
@@ -199,6 +222,7 @@ class LoginUser(CreateAPIView):
     returns a token
     """
     permission_classes = (AllowAny,)
+    throttle_scope = 'login'
 
     queryset = User.objects.all()
 
@@ -207,19 +231,47 @@ class LoginUser(CreateAPIView):
         password = request.data.get('password', '')
         user = authenticate(request, username=username, password=password)
         if user is not None:
-            # login saves the user’s ID in the session,
-            # using Django’s session framework.
-            login(request, user)
+            if hasattr(request, 'session'):
+                # login saves the user’s ID in the session,
+                # using Django’s session framework.
+                login(request, user)
+            else:
+                # without sessions, e.g with the api-only settings,
+                # only record the login, which updates last_login
+                user_logged_in.send(
+                    sender=user.__class__, request=request, user=user
+                )
             serializer = TokenSerializer(data={
-                # using drf jwt utility functions to generate a token
-                'token': jwt_encode_handler(
-                    jwt_payload_handler(user)
-                )})
+                'token': jwt_token(user)
+            })
             serializer.is_valid()
             return Response(serializer.data)
         return Response(status=status.HTTP_401_UNAUTHORIZED)
 
 
+@functools.lru_cache(maxsize=None)
+def obtain_token_view():
+    # the token view of drf jwt and its serializers are imported on
+    # the first request for a token, not when the urls are loaded
+    from rest_framework_jwt.views import ObtainJSONWebToken
+
+    class ObtainToken(ObtainJSONWebToken):
+        """
+        View to obtain a token
+
+        * this is a public view
+        * throttled like the login view
+        """
+        throttle_scope = 'login'
+
+    return ObtainToken.as_view()
+
+
+@csrf_exempt
+def obtain_token(request, *args, **kwargs):
+    return obtain_token_view()(request, *args, **kwargs)
+
+
 class LogoutUser(ListAPIView):
     """
     View to logout a user.
@@ -233,5 +285,8 @@ class LogoutUser(ListAPIView):
     queryset = User.objects.all()
 
     def get(self, request, *args, **kwargs):
-        logout(request)
+        # jwt tokens are stateless, there is only a session to
+        # end when sessions are enabled
+        if hasattr(request, 'session'):
+            logout(request)
         return Response(status=status.HTTP_200_OK)
@@ -0,0 +1,31 @@
+from django.conf import settings
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_jwt.authentication import JSONWebTokenAuthentication
+from api import batch
+
+
+class BatchRequests(APIView):
+    """
+    View to send several api requests in one round trip
+
+    * Requires token authentication
+    * Every sub-request is still throttled and checked by its view
+    """
+    authentication_classes = (JSONWebTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, *args, **kwargs):
+        """
+        Run a list of sub-requests in order and return their responses
+
+        :param request:
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        sub_requests = batch.parse_batch(
+            request.data, settings.BATCH['MAX_REQUESTS']
+        )
+        return Response(batch.run_batch(request, sub_requests))
@@ -0,0 +1,101 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_jwt.authentication import JSONWebTokenAuthentication
+from api import feed
+from api.renderers import EventStreamRenderer, FastJSONRenderer
+
+
+class Changes(APIView):
+    """
+    View to long-poll the changes to the shopping lists and items
+    of the logged in user
+
+    * Requires token authentication
+    """
+    authentication_classes = (JSONWebTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        """
+        Return the changes after ?cursor=, waiting up to ?timeout=
+        seconds for one, without a cursor return the cursor to start
+        following the changes from. A client waits in one of the
+        FEED['MAX_WAITERS'] slots of the process, it gets a 503 with
+        Retry-After when they are all taken
+
+        :param request:
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        try:
+            timeout = float(request.query_params.get(
+                'timeout', settings.FEED['POLL_TIMEOUT']))
+        except ValueError:
+            timeout = settings.FEED['POLL_TIMEOUT']
+        timeout = max(0.0, min(timeout, settings.FEED['POLL_TIMEOUT']))
+        cursor = request.query_params.get('cursor')
+        user_id = request.user.id
+        if feed.feed.follow(user_id) and cursor is not None:
+            # the events of the user were not published for a while
+            cursor = feed.RESET_CURSOR
+        if cursor is None or timeout <= 0:
+            changes = feed.feed.changes(user_id, cursor)
+        else:
+            feed.feed.reserve()
+            try:
+                changes = feed.feed.wait(user_id, cursor, timeout)
+            finally:
+                feed.feed.release()
+        return Response({
+            'cursor': changes.cursor,
+            'events': changes.events,
+            'reset': changes.reset,
+        })
+
+
+class ChangeStream(APIView):
+    """
+    View to follow the changes to the shopping lists and items of
+    the logged in user as server-sent events
+
+    * Requires token authentication
+    """
+    authentication_classes = (JSONWebTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    renderer_classes = (EventStreamRenderer, FastJSONRenderer)
+
+    def get(self, request, *args, **kwargs):
+        """
+        Stream the change events, resuming after the Last-Event-ID
+        header or ?cursor= when given. A stream takes one of the
+        FEED['MAX_WAITERS'] slots of the process until it ends, a 503
+        with Retry-After is sent when they are all taken
+
+        :param request:
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        cursor = request.META.get('HTTP_LAST_EVENT_ID') \
+            or request.query_params.get('cursor')
+        user_id = request.user.id
+        if feed.feed.follow(user_id) and cursor is not None:
+            # the events of the user were not published for a while
+            cursor = feed.RESET_CURSOR
+        feed.feed.reserve()
+        response = StreamingHttpResponse(
+            feed.Reserved(feed.feed, feed.stream_changes(
+                user_id, cursor,
+                settings.FEED['STREAM_DURATION'],
+                settings.FEED['HEARTBEAT']
+            )),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        # tell nginx not to buffer the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
@@ -0,0 +1,60 @@
+from rest_framework.authentication import BasicAuthentication
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView, status
+from rest_framework_jwt.authentication import JSONWebTokenAuthentication
+from api import metrics, slow_queries
+from api.renderers import PrometheusRenderer
+
+
+class Metrics(APIView):
+    """
+    View to scrape the request metrics of this process
+
+    * Requires token or basic authentication
+    * Only admin users are able to access this view
+    """
+    authentication_classes = (
+        JSONWebTokenAuthentication,
+        BasicAuthentication
+    )
+    permission_classes = (IsAdminUser,)
+    renderer_classes = (PrometheusRenderer,)
+
+    def get(self, request, *args, **kwargs):
+        """
+        Return the metrics in the prometheus text format
+        """
+        return Response(
+            metrics.registry.exposition(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
+
+
+class SlowQueries(APIView):
+    """
+    View to inspect the slow query log of this process
+
+    * Requires token authentication
+    * Only admin users are able to access this view
+    """
+    authentication_classes = (JSONWebTokenAuthentication,)
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request, *args, **kwargs):
+        """
+        Return the recorded slow queries, the most recent first
+        """
+        return Response(slow_queries.log.all())
+
+    def delete(self, request, *args, **kwargs):
+        """
+        Clear the slow query log
+        """
+        slow_queries.log.clear()
+        # the statements of this request are logged after it, the
+        # log is left empty
+        recorder = getattr(request, 'slow_query_recorder', None)
+        if recorder is not None:
+            recorder.pending.clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,120 @@
+from django.contrib.auth.models import User
+from django.db.models import F
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView, status
+from rest_framework_jwt.authentication import JSONWebTokenAuthentication
+from api import feed
+from api.models import ListMembership
+from api.serializers import ListMembershipSerializer
+from api.sharing import check_role
+
+
+class ListMembers(APIView):
+    """
+    View to list and add the members of a shared shopping list
+
+    * Requires token authentication
+    * Every member can see the members, only owners add them
+    """
+    authentication_classes = (JSONWebTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        """
+        Return the members of a list the logged in user is a member of
+
+        :param request:
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        members = list(ListMembership.objects.filter(
+            shopping_list_id=kwargs['list_id'],
+            shopping_list__deleted_on__isnull=True
+        ).order_by('created_on', 'id').values(
+            'user_id', 'role', 'created_on', username=F('user__username')
+        ))
+        # the membership of the user is checked in the same query
+        if not any(m['user_id'] == request.user.id for m in members):
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        return Response(ListMembershipSerializer(members, many=True).data)
+
+    def post(self, request, *args, **kwargs):
+        """
+        Share a list with a user, or change the role of a member
+
+        :param request:
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        check_role(request, kwargs['list_id'], (ListMembership.OWNER,))
+        serializer = ListMembershipSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        username = serializer.validated_data['username']
+        if username == request.user.username:
+            # owners do not change their own role, another owner
+            # does, so that a list always keeps an owner
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        user_id = User.objects.filter(
+            username=username
+        ).values_list('id', flat=True).first()
+        if user_id is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        membership, _ = ListMembership.objects.update_or_create(
+            user_id=user_id, shopping_list_id=kwargs['list_id'],
+            defaults={'role': serializer.validated_data['role']}
+        )
+        # the member sees the list and its items from now on
+        feed.notify([user_id], 'list', 'shared', int(kwargs['list_id']))
+        return Response(ListMembershipSerializer({
+            'username': username,
+            'role': membership.role,
+            'created_on': membership.created_on
+        }).data)
+
+
+class ListMemberDetails(APIView):
+    """
+    View to remove a member from a shared shopping list
+
+    * Requires token authentication
+    * Owners remove any member, other members only leave the list
+    """
+    authentication_classes = (JSONWebTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def delete(self, request, *args, **kwargs):
+        """
+        Remove a member from a list
+
+        :param request:
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        members = {
+            username: (user_id, role)
+            for user_id, role, username in ListMembership.objects.filter(
+                shopping_list_id=kwargs['list_id'],
+                shopping_list__deleted_on__isnull=True
+            ).values_list('user_id', 'role', 'user__username')
+        }
+        own = members.get(request.user.username)
+        member = members.get(kwargs['username'])
+        if own is None or member is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        if member != own and own[1] != ListMembership.OWNER:
+            return Response(status=status.HTTP_403_FORBIDDEN)
+        owners = [m for m in members.values() if m[1] == ListMembership.OWNER]
+        if owners == [member]:
+            # the last owner deletes the list instead
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        ListMembership.objects.filter(
+            user_id=member[0], shopping_list_id=kwargs['list_id']
+        ).delete()
+        feed.notify(
+            [member[0]], 'list', 'unshared', int(kwargs['list_id'])
+        )
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -1,4 +1,5 @@
-from api.models import ShoppingList, Item
+from django.conf import settings
+from api.models import Item, ListMembership
 from rest_framework.generics import (
     ListAPIView,
     ListCreateAPIView,
@@ -6,14 +7,27 @@ from rest_framework.generics import (
 )
 from api.serializers import ItemsSerializer
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import status
 from rest_framework_jwt.authentication import JSONWebTokenAuthentication
 from api.utils import (
+    item_amounts,
     serialize_item,
-    items_results_set
+    selected_fields
 )
 from rest_framework.pagination import PageNumberPagination
+from api.idempotency import idempotent
+from api import archive, autocomplete, feed, ranking
+from api.sharing import check_member, check_role
+from api.concurrency import (
+    conditional_update,
+    etag,
+    if_match_versions
+)
+
+# item fields served by the item list endpoints by default
+ITEM_LIST_FIELDS = ('id', 'name', 'description', 'bought')
 
 
 class ListAllItems(ListAPIView):
@@ -40,19 +54,15 @@ class ListAllItems(ListAPIView):
         WHERE DATE(TableC.date)=date(now())
         """
 
-        items = Item.objects.raw(
-            "select api_item.id, api_item.name, api_item.description, "
-            "api_item.bought, api_shoppinglist.name, auth_user.first_name "
-            "from api_item "
-            "join api_shoppinglist "
-            "on api_shoppinglist.id=api_item.the_list_id "
-            "join auth_user "
-            "on auth_user.id=api_shoppinglist.user_id where auth_user.id=%s",
-            [request.user.id]
+        # ?fields= limits the columns fetched and serialized
+        fields = selected_fields(
+            request, ItemsSerializer, default=ITEM_LIST_FIELDS
         )
+        items = archive.item_values(request, fields)
         return Response(ItemsSerializer(
-            items_results_set(items),
-            many=True).data)
+            items,
+            many=True,
+            fields=fields).data)
 
 
 class ItemsListCreate(ListCreateAPIView):
@@ -64,6 +74,11 @@ class ItemsListCreate(ListCreateAPIView):
     permission_classes = (IsAuthenticated,)
     pagination_class = PageNumberPagination
 
+    def get_queryset(self):
+        # the membership check is a join in the same query, items
+        # on lists the user is not a member of are never returned
+        return Item.objects.accessible_by(self.request.user)
+
     def get(self, request, *args, **kwargs):
         """
         Return all items for the logged in user on a specific
@@ -73,15 +88,20 @@ class ItemsListCreate(ListCreateAPIView):
         :param kwargs:
         :return:
         """
-        items = Item.objects.raw(
-            "select * from api_item where "
-            "api_item.the_list_id=%s",
-            [kwargs['list_id']]
+        fields = selected_fields(
+            request, ItemsSerializer, default=ITEM_LIST_FIELDS
+        )
+        # in the order of the (the_list_id, position) index
+        items = archive.item_values(
+            request, fields, order=('position', 'id'),
+            the_list_id=kwargs['list_id']
         )
         return Response(ItemsSerializer(
-            items_results_set(items),
-            many=True).data)
+            items,
+            many=True,
+            fields=fields).data)
 
+    @idempotent
     def post(self, request, *args, **kwargs):
         """
         Create a new item on a given list
@@ -91,19 +111,21 @@ class ItemsListCreate(ListCreateAPIView):
         :param kwargs:
         :return:
         """
-        try:
-            the_list = ShoppingList.objects.get(id=kwargs['list_id'])
-            name = request.data.get('name', '')
-            if not name:  # item name is mandatory
-                return Response(status=status.HTTP_400_BAD_REQUEST)
-            item = Item.objects.create(
-                name=name,
-                description=request.data.get('description', ''),
-                the_list=the_list
-            )
-            return Response(serialize_item(item).data)
-        except ShoppingList.DoesNotExist:
-            return Response(status=status.HTTP_404_NOT_FOUND)
+        # the list is not loaded, only the role of the user on it
+        check_role(request, kwargs['list_id'], ListMembership.EDITORS)
+        name = request.data.get('name', '')
+        if not name:  # item name is mandatory
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        amounts = item_amounts(request.data)
+        # new items go to the end of the list
+        item = Item.objects.create(
+            name=name,
+            description=request.data.get('description', ''),
+            the_list_id=int(kwargs['list_id']),
+            position=ranking.last_position(kwargs['list_id']),
+            **amounts
+        )
+        return Response(serialize_item(item).data)
 
 
 class ItemsDetails(RetrieveUpdateDestroyAPIView):
@@ -111,10 +133,14 @@ class ItemsDetails(RetrieveUpdateDestroyAPIView):
     View to retrieve, update, delete an item
     """
 
-    queryset = Item.objects.all()
     authentication_classes = (JSONWebTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
 
+    def get_queryset(self):
+        # the membership check is a join in the same query, an item
+        # on a list the user is not a member of is not found
+        return Item.objects.accessible_by(self.request.user)
+
     def get(self, request, *args, **kwargs):
         """
         retrieve a specific item on a given list
@@ -124,12 +150,19 @@ class ItemsDetails(RetrieveUpdateDestroyAPIView):
         :param kwargs:
         :return:
         """
-        item_id = kwargs['item_id']
-        try:
-            item = Item.objects.get(id=item_id)
-            return Response(serialize_item(item).data)
-        except Item.DoesNotExist:
+        fields = selected_fields(
+            request, ItemsSerializer, default=('name', 'description', 'bought')
+        )
+        # the version is always fetched for the ETag
+        item = self.get_queryset().filter(
+            id=kwargs['item_id']
+        ).values('version', *fields).first()
+        if item is None:
             return Response(status=status.HTTP_404_NOT_FOUND)
+        return Response(
+            ItemsSerializer(item, fields=fields).data,
+            headers={'ETag': etag(item['version'])}
+        )
 
     def put(self, request, *args, **kwargs):
         """
@@ -140,18 +173,35 @@ class ItemsDetails(RetrieveUpdateDestroyAPIView):
         :param kwargs:
         :return:
         """
-        try:
-            item = Item.objects.get(id=kwargs['item_id'])
-            name = request.data.get('name', '')
-            if not name:
-                return Response(status=status.HTTP_400_BAD_REQUEST)
-            item.name = name
-            item.description = request.data.get('description', '')
-            item.bought = request.data.get('bought', 0)
-            item.save()
-            return Response(serialize_item(item).data)
-        except Item.DoesNotExist:
+        name = request.data.get('name', '')
+        if not name:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        item = Item(
+            id=kwargs['item_id'],
+            name=name,
+            description=request.data.get('description', ''),
+            bought=request.data.get('bought', 0),
+            **item_amounts(request.data)
+        )
+        # the whole item is replaced with a single UPDATE, checked
+        # against the versions of If-Match when it is sent
+        version = conditional_update(
+            Item.objects.accessible_by(request.user, ListMembership.EDITORS),
+            item.id, if_match_versions(request), name=item.name,
+            description=item.description, bought=item.bought,
+            quantity=item.quantity, unit=item.unit, price=item.price
+        )
+        if version is None:
+            if self.get_queryset().filter(id=item.id).exists():
+                # a viewer of the list
+                return Response(status=status.HTTP_403_FORBIDDEN)
             return Response(status=status.HTTP_404_NOT_FOUND)
+        # the UPDATE sends no post_save signal
+        feed.notify_item_members(int(item.id), 'updated')
+        # the UPDATE returned the new version
+        return Response(
+            serialize_item(item).data, headers={'ETag': etag(version)}
+        )
 
     def delete(self, request, *args, **kwargs):
         """
@@ -162,12 +212,88 @@ class ItemsDetails(RetrieveUpdateDestroyAPIView):
         :param kwargs:
         :return:
         """
-        try:
-            item = Item.objects.get(id=kwargs['item_id'])
-            item.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        except Item.DoesNotExist:
+        # the members of the list of the item, notified of the change,
+        # and the id of the list are fetched in one query, then the
+        # item is deleted with a single DELETE scoped to the lists the
+        # user edits, the item itself is not loaded
+        rows = list(ListMembership.objects.filter(
+            shopping_list__item__id=kwargs['item_id'],
+            shopping_list__deleted_on__isnull=True
+        ).values_list('user_id', 'role', 'shopping_list_id'))
+        if not rows:
             return Response(status=status.HTTP_404_NOT_FOUND)
+        list_id = rows[0][2]
+        members = {user_id: role for user_id, role, _ in rows}
+        deleted, _ = Item.objects.accessible_by(
+            request.user, ListMembership.EDITORS
+        ).filter(the_list_id=list_id, id=kwargs['item_id']).delete()
+        if not deleted:
+            # not a member, a viewer, or the item was just deleted
+            check_member(members, request.user.id, ListMembership.EDITORS)
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        feed.notify(
+            list(members), 'item', 'deleted', int(kwargs['item_id']),
+            list_id=list_id
+        )
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ItemPosition(APIView):
+    """
+    View to move an item within its list
+    """
+
+    authentication_classes = (JSONWebTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def put(self, request, *args, **kwargs):
+        """
+        Move an item after the item {"after": id}, or to the top of
+        the list with {"after": null}. Only the row of the item is
+        updated, with If-Match it is only moved if its version
+        matches
+
+        :param request:
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        item_id = int(kwargs['item_id'])
+        after_id = request.data.get('after')
+        if after_id is not None:
+            try:
+                after_id = int(after_id)
+            except (TypeError, ValueError):
+                return Response(status=status.HTTP_400_BAD_REQUEST)
+            if after_id == item_id:
+                return Response(status=status.HTTP_400_BAD_REQUEST)
+        list_id = Item.objects.accessible_by(
+            request.user, ListMembership.EDITORS
+        ).filter(id=item_id).values_list('the_list_id', flat=True).first()
+        if list_id is None:
+            if Item.objects.accessible_by(request.user).filter(
+                    id=item_id).exists():
+                # a viewer of the list
+                return Response(status=status.HTTP_403_FORBIDDEN)
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        position = ranking.position_after(list_id, item_id, after_id)
+        if position is None:
+            # the item to move after is not on the list
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        version = conditional_update(
+            Item.objects.filter(the_list_id=list_id), item_id,
+            if_match_versions(request), position=position
+        )
+        if version is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        feed.notify_members(
+            ListMembership.objects.filter(shopping_list_id=list_id),
+            'item', 'updated', item_id, list_id=list_id
+        )
+        return Response(
+            {'id': item_id, 'position': position},
+            headers={'ETag': etag(version)}
+        )
 
 
 class SearchItemByName(ListAPIView):
@@ -175,8 +301,43 @@ class SearchItemByName(ListAPIView):
     This view returns results of a search for an item by name
     """
     serializer_class = ItemsSerializer
+    throttle_scope = 'search'
 
     def get_queryset(self):
         q = self.request.query_params.get('q', None)
-        queryset = Item.objects.filter(the_list__user=self.request.user)
-        return queryset.filter(name__icontains=q).order_by('id')
+        return archive.item_values(
+            self.request, selected_fields(self.request, ItemsSerializer),
+            order=('id',), name__icontains=q
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs['fields'] = selected_fields(self.request, ItemsSerializer)
+        return super().get_serializer(*args, **kwargs)
+
+
+class ItemNameAutocomplete(APIView):
+    """
+    This view suggests item names the user used before
+    """
+    authentication_classes = (JSONWebTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        """
+        Return up to ?limit= item names starting with ?q=, the most
+        used first, from the name index of the user in memory
+
+        :param request:
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        max_limit = settings.AUTOCOMPLETE['MAX_LIMIT']
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            limit = 10
+        limit = max(1, min(limit, max_limit))
+        return Response(autocomplete.names.suggest(
+            request.user, request.query_params.get('q', ''), limit
+        ))
@@ -1,12 +1,38 @@
 from rest_framework import viewsets
-from api.serializers import ShoppingListSerializer
-from api.models import ShoppingList
+from api.serializers import ShoppingListSerializer, TotalsSerializer
+from api.models import ShoppingList, Item, ListMembership
 from rest_framework_jwt.authentication import JSONWebTokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import status
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.generics import ListAPIView
+from rest_framework.views import APIView
+from api.utils import delete_shopping_list, selected_fields
+from api import archive, feed, purge
+from api.idempotency import idempotent
+from api.concurrency import (
+    check_version,
+    conditional_update,
+    etag,
+    if_match_versions
+)
+from api.sharing import check_member, check_role, list_members
+from rest_framework.exceptions import NotFound
+from django.db import transaction
+from django.http import Http404
+from django.utils import timezone
+from django.conf import settings
+
+# list fields computed from the items of the list
+TOTAL_FIELDS = ('item_count', 'total', 'bought_total')
+
+
+def with_selected_totals(queryset, fields, include_archived=False):
+    # the items are only aggregated when a total is selected
+    if set(TOTAL_FIELDS).intersection(fields):
+        return queryset.with_totals(include_archived)
+    return queryset
 
 
 class ShoppingLists(viewsets.ModelViewSet):
@@ -14,12 +40,36 @@ class ShoppingLists(viewsets.ModelViewSet):
     Shopping Lists CRUD endpoints
     """
 
-    queryset = ShoppingList.objects.all()
     serializer_class = ShoppingListSerializer
     authentication_classes = (JSONWebTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
     pagination_class = PageNumberPagination
 
+    def get_queryset(self):
+        # lists the logged in user is a member of, the pk lookups of
+        # retrieve and update also check the membership in the same
+        # query using the (user_id, shopping_list_id) index
+        # archived lists are read with ?include_archived=1 but are
+        # not updated
+        if self.action == 'update':
+            return ShoppingList.objects.accessible_by(
+                self.request.user, ListMembership.EDITORS
+            )
+        return ShoppingList.objects.accessible_by(
+            self.request.user,
+            include_archived=archive.include_archived(self.request)
+        )
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            # a viewer of the list is told it may not change it
+            check_role(
+                self.request, self.kwargs['pk'], ListMembership.EDITORS
+            )
+            raise
+
     def list(self, request, *args, **kwargs):
         """
         get all shopping lists as per user logged in
@@ -29,16 +79,40 @@ class ShoppingLists(viewsets.ModelViewSet):
         :param kwargs:
         :return:
         """
-        lists = self.queryset.filter(user=request.user)
-        results = []
-        for a_list in lists:
-            results.append({
-                'id': a_list.id,
-                'name': a_list.name,
-                'description': a_list.description
-            })
-        return Response(ShoppingListSerializer(results, many=True).data)
+        # ?fields= limits the columns fetched and serialized
+        fields = selected_fields(
+            request, ShoppingListSerializer,
+            default=('id', 'name', 'description')
+        )
+        lists = with_selected_totals(
+            self.get_queryset(), fields, archive.include_archived(request)
+        ).values(*fields)
+        return Response(
+            ShoppingListSerializer(lists, many=True, fields=fields).data
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        get a shopping list of the user logged in
+
+        :param request:
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        fields = selected_fields(request, ShoppingListSerializer)
+        # the version is always fetched for the ETag
+        a_list = with_selected_totals(
+            self.get_queryset(), fields, archive.include_archived(request)
+        ).filter(pk=kwargs['pk']).values('version', *fields).first()
+        if a_list is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        return Response(
+            ShoppingListSerializer(a_list, fields=fields).data,
+            headers={'ETag': etag(a_list['version'])}
+        )
 
+    @idempotent
     def create(self, request, *args, **kwargs):
         """
         Adds a new shopping list
@@ -52,29 +126,195 @@ class ShoppingLists(viewsets.ModelViewSet):
         if not name:  # shopping list name is mandatory
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
-        new_list = ShoppingList.objects.create(
-            name=name,
-            description=request.data.get('description', ''),
-            user=request.user
-        )
-        serializer = ShoppingListSerializer(
-            data={
-                'name': new_list.name,
-                'description': new_list.description
-            })
-        serializer.is_valid()
+        # the list is created with the owner membership of the user
+        with transaction.atomic(savepoint=False):
+            new_list = ShoppingList.objects.create(
+                name=name,
+                description=request.data.get('description', ''),
+                user=request.user
+            )
         return Response(
-            data=serializer.data
+            data=ShoppingListSerializer(new_list).data
         )
 
+    def update(self, request, *args, **kwargs):
+        """
+        Update a shopping list, with If-Match the list is only
+        updated if its version is one of the listed versions
+
+        :param request:
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        response = super().update(request, *args, **kwargs)
+        response['ETag'] = etag(response.data['version'])
+        return response
+
+    def perform_update(self, serializer):
+        """
+        Save the fields that changed with a single UPDATE of those
+        columns, nothing is written when no field changed. The
+        UPDATE only matches the version that was read, so a list
+        changed by another request since is not overwritten
+
+        :param serializer:
+        :return:
+        """
+        instance = serializer.instance
+        check_version(instance.version, if_match_versions(self.request))
+        changed = {
+            field: value
+            for field, value in serializer.validated_data.items()
+            if getattr(instance, field) != value
+        }
+        if not changed:
+            return
+        changed['updated_on'] = timezone.now()
+        # the role was checked when the list was read
+        version = conditional_update(
+            ShoppingList.objects.filter(deleted_on__isnull=True),
+            instance.pk, [instance.version], **changed
+        )
+        if version is None:
+            raise NotFound
+        for field, value in changed.items():
+            setattr(instance, field, value)
+        instance.version = version
+        # the UPDATE sends no post_save signal
+        feed.notify_members(
+            ListMembership.objects.filter(shopping_list_id=instance.pk),
+            'list', 'updated', instance.pk
+        )
+
+    def destroy(self, request, *args, **kwargs):
+        """
+        Delete a shopping list and its items, only an owner of the
+        list can delete it
+
+        :param request:
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        # the members are notified of the deletion, they are
+        # fetched with the role of the user before it, and whether
+        # the items of the list are archived
+        rows = list(ListMembership.objects.filter(
+            shopping_list_id=kwargs['pk'],
+            shopping_list__deleted_on__isnull=True
+        ).values_list('user_id', 'role', 'shopping_list__archived_on'))
+        members = {user_id: role for user_id, role, _ in rows}
+        check_member(members, request.user.id, (ListMembership.OWNER,))
+        archived = rows[0][2] is not None
+        list_purge = settings.LIST_PURGE
+        if list_purge['ENABLED'] and purge.has_many_items(
+                kwargs['pk'], request.user, list_purge['THRESHOLD'],
+                archived=archived):
+            # do not keep the request waiting for the items
+            deleted = purge.delete_large_shopping_list(
+                kwargs['pk'], request.user
+            )
+        else:
+            deleted = delete_shopping_list(
+                kwargs['pk'], request.user, archived=archived
+            )
+        if not deleted:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        feed.notify(list(members), 'list', 'deleted', int(kwargs['pk']))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 
 class SearchShoppingLists(ListAPIView):
     """
     Search for a shopping list with a given name
     """
     serializer_class = ShoppingListSerializer
+    throttle_scope = 'search'
 
     def get_queryset(self):
         q = self.request.query_params.get('q', None)
-        queryset = ShoppingList.objects.filter(user=self.request.user)
-        return queryset.filter(name__icontains=q).order_by('id')
+        fields = selected_fields(self.request, ShoppingListSerializer)
+        include_archived = archive.include_archived(self.request)
+        queryset = with_selected_totals(
+            ShoppingList.objects.accessible_by(
+                self.request.user, include_archived=include_archived
+            ), fields, include_archived
+        )
+        return queryset.filter(name__icontains=q).order_by('id').values(
+            *fields
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs['fields'] = selected_fields(
+            self.request, ShoppingListSerializer
+        )
+        return super().get_serializer(*args, **kwargs)
+
+
+class ShoppingListArchive(APIView):
+    """
+    Archive a shopping list, or restore it
+    """
+    authentication_classes = (JSONWebTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def check_editor(self, request, list_id):
+        # the archived lists are members too
+        members = list_members(shopping_list_id=list_id)
+        check_member(members, request.user.id, ListMembership.EDITORS)
+        return members
+
+    def post(self, request, *args, **kwargs):
+        """
+        Archive a shopping list, its items are moved out of the
+        active items
+
+        :param request:
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        members = self.check_editor(request, kwargs['pk'])
+        if not archive.archive_list(kwargs['pk']):
+            # the list is already archived
+            return Response(status=status.HTTP_409_CONFLICT)
+        feed.notify(list(members), 'list', 'archived', int(kwargs['pk']))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def delete(self, request, *args, **kwargs):
+        """
+        Restore an archived shopping list and its items
+
+        :param request:
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        members = self.check_editor(request, kwargs['pk'])
+        if not archive.unarchive_list(kwargs['pk']):
+            # the list is not archived
+            return Response(status=status.HTTP_409_CONFLICT)
+        feed.notify(list(members), 'list', 'restored', int(kwargs['pk']))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ShoppingListTotals(APIView):
+    """
+    Number and cost of the items on all the lists of a user
+    """
+    authentication_classes = (JSONWebTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        """
+        Return the totals of the logged in user, summed by the
+        database in a single aggregate query
+
+        :param request:
+        :param args:
+        :param kwargs:
+        :return:
+        """
+        totals = Item.objects.accessible_by(request.user).totals()
+        return Response(TotalsSerializer(totals).data)
@@ -0,0 +1,67 @@
+import inspect
+
+from django.apps import apps
+from django.db import connections
+from django.urls import get_resolver, URLResolver
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+from api import serializers
+
+# work done once before the server forks its workers so that every
+# worker shares it copy-on-write instead of repeating it
+
+
+def warm_url_resolvers(resolver=None):
+    """
+    Populate the reverse lookup tables of the url resolvers,
+    including the ones of included and namespaced url confs
+
+    :param resolver: resolver to start from, the root one by default
+    :return: number of resolvers populated
+    """
+    resolver = resolver or get_resolver()
+    # the reverse dict is built lazily on the first reverse()
+    resolver.reverse_dict
+    count = 1
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            count += warm_url_resolvers(pattern)
+    return count
+
+
+def warm_models():
+    """
+    Fill the field caches of the model options
+    """
+    for model in apps.get_models():
+        model._meta.get_fields()
+        model._meta.concrete_fields
+
+
+def warm_serializers():
+    """
+    Build the fields of every api serializer once, this imports the
+    field classes and fills the model field caches they rely on
+
+    :return: number of serializers warmed
+    """
+    count = 0
+    for _, serializer_class in inspect.getmembers(serializers,
+                                                  inspect.isclass):
+        if issubclass(serializer_class, BaseSerializer) \
+                and serializer_class.__module__ == serializers.__name__ \
+                and not issubclass(serializer_class, ListSerializer):
+            serializer_class().fields
+            count += 1
+    return count
+
+
+def warm_up():
+    """
+    Warm the caches that do not depend on a request
+    """
+    warm_url_resolvers()
+    warm_models()
+    warm_serializers()
+    # never share database connections with forked workers
+    connections.close_all()
@@ -0,0 +1,61 @@
+"""
+Gunicorn settings for the production server
+
+usage:
+    gunicorn config.wsgi --config config/gunicorn_conf.py
+
+Every setting can be overridden with an environment variable.
+For more information on these settings, see
+http://docs.gunicorn.org/en/stable/settings.html
+"""
+
+import gc
+import multiprocessing
+import os
+
+bind = '0.0.0.0:' + os.getenv('PORT', '8000')
+
+# threaded workers, a request waiting on the database holds a thread
+# instead of a whole process. The usual 2 x cores + 1 processes, each
+# with a few threads
+worker_class = 'gthread'
+workers = int(os.getenv(
+    'WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+# clients that wait for changes hold a thread each, at most half of
+# them wait at a time (FEED_MAX_WAITERS), see the feed settings
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+# load django once in the master process, the forked workers share
+# its memory copy-on-write and start serving straight away
+preload_app = True
+
+# recycle workers to contain memory growth, the jitter keeps them
+# from all restarting at the same time
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+errorlog = '-'
+
+
+def when_ready(server):
+    """
+    Called in the master once the app is loaded, before the
+    workers are forked
+    """
+    from api.warmup import warm_up
+    warm_up()
+    # keep the objects created so far out of the garbage collector
+    # so that collecting does not touch and copy the shared pages
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    """
+    Called in a worker right after it is forked
+    """
+    from api.feed import feed
+    # the change feed poller of a worker is its own
+    feed.after_fork()
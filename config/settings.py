@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/2.0/ref/settings/
 
 import os
 import datetime
+import importlib.util
 import dj_database_url
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
@@ -48,6 +49,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # keep first so that the timings cover the other middleware
+    'api.middleware.PerformanceMiddleware',
+    'api.middleware.SlowQueryMiddleware',
+    # before CommonMiddleware which sets the Content-Length
+    'api.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,10 +86,13 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/2.0/ref/settings/#databases
+# the engine and name can be overridden, e.g to run the benchmarks
+# locally against SQLite
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql_psycopg2',
-        'NAME': 'drf_shop_list',
+        'ENGINE': os.getenv(
+            'DB_ENGINE', 'django.db.backends.postgresql_psycopg2'),
+        'NAME': os.getenv('DB_NAME', 'drf_shop_list'),
         'USER': os.getenv('DB_USER'),
         'PASSWORD': os.getenv('DB_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
@@ -118,16 +127,49 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.BasicAuthentication',
     ],
 
-    # remove the default browsable interface
+    # remove the default browsable interface, JSON is rendered and
+    # parsed with orjson when it is installed
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'api.renderers.FastJSONRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
 
     # Pagination settings
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 50
+    'PAGE_SIZE': 50,
+
+    # Throttling settings, in-memory token buckets per process.
+    # Views pick a scoped rate by setting throttle_scope
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.AnonTokenBucketThrottle',
+        'api.throttling.UserTokenBucketThrottle',
+        'api.throttling.ScopedTokenBucketThrottle',
+        'api.throttling.WriteTokenBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': '100/minute',
+        'user': '1000/minute',
+        # password hashing makes these expensive
+        'login': '10/minute',
+        'register': '5/minute',
+        # item and list searches scan the tables
+        'search': '60/minute',
+        'writes': '120/minute',
+    },
 }
 
+# clients can send and accept application/msgpack when the optional
+# msgpack package is installed
+if importlib.util.find_spec('msgpack') is not None:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append(
+        'api.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].append(
+        'api.parsers.MessagePackParser')
+
 
 # JWT settings
 JWT_AUTH = {
@@ -165,6 +207,153 @@ JWT_AUTH = {
     'JWT_AUTH_COOKIE': None,
 }
 
+# Logging
+# https://docs.djangoproject.com/en/2.0/topics/logging/
+# set PERFORMANCE_LOG_LEVEL=INFO to log the timings of every request
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.performance': {
+            'handlers': ['console'],
+            'level': os.getenv('PERFORMANCE_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+# Slow query log
+# set SLOW_QUERY_LOG=1 to record the statements slower than the
+# threshold, they are served to admin users by the slow queries endpoint
+SLOW_QUERY_LOG = {
+    'ENABLED': os.getenv('SLOW_QUERY_LOG', '').lower() in ('1', 'true', 'yes'),
+    'THRESHOLD_MS': float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 100)),
+    # number of slow queries kept in memory
+    'MAX_ENTRIES': 100,
+    # capture the query plan of slow SELECT statements
+    'EXPLAIN': True,
+}
+
+# Response compression
+# responses are compressed with the best encoding the client accepts,
+# br and zstd need the optional brotli and zstandard packages
+COMPRESSION = {
+    'ENABLED': True,
+    # smaller responses are sent as they are, compressing them
+    # costs more time than it saves on the wire
+    'MIN_SIZE': int(os.getenv('COMPRESSION_MIN_SIZE', 1024)),
+    # encodings in the order they are preferred
+    'ENCODINGS': ('br', 'zstd', 'gzip'),
+    'LEVELS': {'br': 4, 'zstd': 3, 'gzip': 6},
+    # content types that are compressed
+    'TYPES': ('application/json', 'application/msgpack', 'text/'),
+    # cache the bodies of repeated responses compressed with these
+    # encodings, zstd compresses faster than the cache key is hashed
+    'CACHE': ('br', 'gzip'),
+}
+
+# Batch requests
+# clients send several api requests in one round trip to /vN/batch/
+BATCH = {
+    # maximum number of sub-requests in a batch
+    'MAX_REQUESTS': int(os.getenv('BATCH_MAX_REQUESTS', 20)),
+}
+
+# Idempotency keys
+# creates sent with an Idempotency-Key header are run once, the
+# response is replayed to retries with the same key
+IDEMPOTENCY = {
+    # seconds a key is kept, purge the expired keys with
+    # python manage.py purge_idempotency_keys
+    'TTL': int(os.getenv('IDEMPOTENCY_KEY_TTL', 86400)),
+}
+
+# Change feed
+# clients follow the changes to their lists at /vN/changes/ with a
+# long-poll or a server-sent events stream, the events are stored in
+# the change event table shared by all the server processes
+FEED = {
+    # most events sent after a cursor, a client that falls further
+    # behind fetches its lists again
+    'MAX_EVENTS': 100,
+    # seconds between the checks of every process for the events
+    # published by the other processes, while clients wait
+    'POLL_INTERVAL': float(os.getenv('FEED_POLL_INTERVAL', 1)),
+    # seconds events are kept, purge the expired events with
+    # python manage.py purge_change_events
+    'TTL': int(os.getenv('FEED_EVENT_TTL', 86400)),
+    # longest long-poll, in seconds
+    'POLL_TIMEOUT': int(os.getenv('FEED_POLL_TIMEOUT', 25)),
+    # seconds an event stream stays open before the client reconnects
+    'STREAM_DURATION': int(os.getenv('FEED_STREAM_DURATION', 300)),
+    # seconds between keep-alive comments on an event stream
+    'HEARTBEAT': 15,
+    # clients waiting in a process at a time, long-polls and streams,
+    # each holds a server thread, half of the gunicorn threads by
+    # default so that the other requests keep the rest. The next ones
+    # get a 503 with Retry-After
+    'MAX_WAITERS': int(os.getenv('FEED_MAX_WAITERS') or max(
+        1, int(os.getenv('GUNICORN_THREADS', 4)) // 2)),
+    # seconds a client is asked to wait before it tries again
+    'RETRY_AFTER': int(os.getenv('FEED_RETRY_AFTER', 5)),
+    # the events of a user are only published while their changes are
+    # followed, for at least these seconds after a request to the feed
+    'LISTEN_TTL': int(os.getenv('FEED_LISTEN_TTL', 600)),
+}
+
+# Item name autocomplete
+# suggestions are served from an index of the item names of each
+# user, kept in the memory of each process and built again once the
+# change events show that a list of the user changed
+AUTOCOMPLETE = {
+    # users whose index is kept
+    'MAX_USERS': 10000,
+    # seconds an index is used at most before it is built again
+    'TTL': int(os.getenv('AUTOCOMPLETE_TTL', 3600)),
+    # seconds between two reads of the change events of a user, the
+    # names changed meanwhile are suggested after this delay at most
+    'CHECK_INTERVAL': float(os.getenv('AUTOCOMPLETE_CHECK_INTERVAL', 5)),
+    # most suggestions returned
+    'MAX_LIMIT': 20,
+}
+
+# Background jobs
+# queued in the database and run by python manage.py run_worker
+JOBS = {
+    # seconds a running job is hidden from the other workers, a job
+    # whose worker died is picked up again once it expires
+    'VISIBILITY_TIMEOUT': int(os.getenv('JOBS_VISIBILITY_TIMEOUT', 300)),
+    # number of times a job is started before it is failed
+    'MAX_ATTEMPTS': 3,
+    # seconds before the first retry, doubled for every retry
+    'RETRY_DELAY': 10,
+}
+
+# Background purge of deleted shopping lists
+# set LIST_PURGE_THRESHOLD to delete lists holding at least that many
+# items in the background, the list disappears at once and its items
+# are deleted in batches by a background job
+LIST_PURGE = {
+    # off when the threshold is unset or 0
+    'ENABLED': int(os.getenv('LIST_PURGE_THRESHOLD') or 0) > 0,
+    'THRESHOLD': int(os.getenv('LIST_PURGE_THRESHOLD') or 10000),
+    # number of items deleted per statement
+    'BATCH_SIZE': 1000,
+}
+
+# Archived lists
+# python manage.py archive_lists archives the lists that were not
+# changed for AFTER_DAYS days, their items are moved out of the item
+# table until the list is restored
+ARCHIVE = {
+    'AFTER_DAYS': int(os.getenv('ARCHIVE_AFTER_DAYS', 180)),
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/2.0/ref/settings/#auth-password-validators
 
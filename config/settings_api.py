@@ -0,0 +1,44 @@
+"""
+API-only settings for config project.
+
+The API serves JSON to clients authenticating with JWT, so the admin,
+sessions, messages, static files and templates are not needed. Dropping
+them and their middleware makes the process start and serve its first
+request faster, which matters for serverless and scale-to-zero
+deployments.
+
+usage:
+    DJANGO_SETTINGS_MODULE=config.settings_api gunicorn config.wsgi
+"""
+
+from config.settings import *  # noqa: F401,F403
+from config.settings import INSTALLED_APPS, MIDDLEWARE
+
+# apps only used by the admin and the browsable api
+UNUSED_APPS = (
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+)
+
+# middleware for sessions, cookies and html pages
+UNUSED_MIDDLEWARE = (
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    # depends on the session middleware, the api authenticates
+    # requests itself with the REST_FRAMEWORK authentication classes
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+)
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in UNUSED_APPS]
+
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE
+    if middleware not in UNUSED_MIDDLEWARE
+]
+
+# no html is rendered
+TEMPLATES = []
@@ -13,25 +13,38 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
+from django.apps import apps
 from django.urls import path, include, re_path
-from rest_framework_jwt.views import obtain_jwt_token
+from api.views.auth_views import obtain_token
+from api.views.metrics_views import Metrics
 
-urlpatterns = [
-    path('admin/', admin.site.urls),
+urlpatterns = []
 
-    path(
+# the admin and the browsable api login are left out of the
+# api-only settings, see config/settings_api.py
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+
+    urlpatterns.append(path('admin/', admin.site.urls))
+
+if apps.is_installed('django.contrib.sessions'):
+    urlpatterns.append(path(
         'api-auth/',
         include(
             'rest_framework.urls',
             namespace='rest_framework'
         )
-    ),
+    ))
 
+urlpatterns += [
     re_path('^api-token-auth/',
-            obtain_jwt_token,
+            obtain_token,
             name='create-token'),
 
+    re_path('^metrics/$',
+            Metrics.as_view(),
+            name='metrics'),
+
     re_path('(?P<version>(v1|v2))/',
             include(
                 'api.urls',